@@ -1,8 +1,18 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import requests
 from datetime import datetime, timedelta
 import io
+from core.anomaly import RateAnomalyDetector, rate_alerts, ANOMALY_WINDOW_DAYS, STATUS_ALERT
+from core.catalog import catalog_version, files_version
+from core.declustering import DEFAULT_DECLUSTER_METHOD
+from core.omori import OmoriModel, omori_integral, OMORI_MIN_MAG, OMORI_MIN_EVENTS, FORECAST_DAYS
+from core.places import REFERENCE_CITIES
+from core.regions import assign_provinces
+from core.spatial_index import build_grid_index, query_radius, query_nearest
+from core.swarms import detect_swarms, SWARM_EPS_KM, SWARM_EPS_DAYS, SWARM_MIN_EVENTS
+from ui.declustering import declustering_toggle, get_decluster_labels
 
 # ===========================
 # PAGE CONFIG
@@ -94,23 +104,23 @@ st.markdown("""
 # LOAD DATA - EXCEL + BMKG COMBINED
 # ===========================
 
+EXCEL_FILES = [
+    "data/DataGempaAgustus2025.xlsx",
+    "data/DataGempaDesember2025.xlsx",
+    "data/DataGempaJuni2025.xlsx",
+    "data/DataGempaNovember2025.xlsx",
+    "data/DataGempaOktober2025.xlsx",
+    "data/DataGempaSeptember2025.xlsx"
+]
+
 @st.cache_data
-def load_data_excel():
-    """Load data dari 6 file Excel (Aug-Dec 2025)"""
+def load_data_excel(version):
+    """Load data dari 6 file Excel (Aug-Dec 2025); version (files_version) membuat cache dimuat ulang saat file berubah"""
     try:
         print("Loading data dari Excel (Aug-Dec 2025)...")
         
-        files = [
-            "data/DataGempaAgustus2025.xlsx",
-            "data/DataGempaDesember2025.xlsx",
-            "data/DataGempaJuni2025.xlsx",
-            "data/DataGempaNovember2025.xlsx",
-            "data/DataGempaOktober2025.xlsx",
-            "data/DataGempaSeptember2025.xlsx"
-        ]
-        
         dfs = []
-        for file in files:
+        for file in EXCEL_FILES:
             try:
                 df_temp = pd.read_excel(file, header=1)
                 dfs.append(df_temp)
@@ -240,6 +250,7 @@ def process_data(df):
     df["magnitudo"] = pd.to_numeric(df["magnitudo"], errors='coerce').round(2)
     df["kedalaman_km"] = pd.to_numeric(df["kedalaman_km"], errors='coerce').round(2)
     df['lokasi'] = df['lokasi'].fillna('Unknown').astype(str).str.strip()
+    df['provinsi'] = assign_provinces(df['latitude'], df['longitude'])
     
     # Format waktu
     df["waktu"] = pd.to_datetime(df["waktu"], utc=True)
@@ -269,11 +280,11 @@ def process_data(df):
     return df
 
 
-def load_data():
+def load_data(excel_version):
     """Load data combined: Excel (Aug-Dec 2025) + BMKG (1 Jan - hari ini)"""
     
     # Load Excel
-    df_excel = load_data_excel()
+    df_excel = load_data_excel(excel_version)
     
     # Load BMKG (dengan cache 1 jam)
     df_bmkg = load_data_bmkg()
@@ -306,12 +317,39 @@ def load_data():
 
 
 # Load data
-df, data_source, is_combined = load_data()
+excel_version = files_version(EXCEL_FILES)
+df, data_source, is_combined = load_data(excel_version)
 
 if df is None or df.empty:
     st.error("❌ Gagal memuat data gempa")
     st.stop()
 
+# ===========================
+# ENGINE KATALOG (CACHE PER VERSI)
+# ===========================
+@st.cache_resource(max_entries=5)
+def get_event_index(version, _df):
+    """Spatial index seluruh katalog, dibangun sekali per versi katalog"""
+    return build_grid_index(_df['latitude'], _df['longitude'])
+
+
+@st.cache_resource(max_entries=10)
+def get_swarms(version, eps_km, eps_days, min_events, _df):
+    """Swarm/sekuens gempa (ST-DBSCAN) seluruh katalog, per versi katalog & parameter"""
+    return detect_swarms(_df, eps_km, eps_days, min_events)
+
+
+@st.cache_resource
+def get_anomaly_detector(decluster_spec):
+    """Detektor anomali laju gempa per provinsi (penuh / declustered), di-update inkremental saat snapshot BMKG berubah"""
+    return RateAnomalyDetector()
+
+
+@st.cache_resource
+def get_omori_model():
+    """Fit Omori-Utsu per mainshock M≥5, di-cache per mainshock id dan di-fit ulang hanya jika sekuensnya berubah"""
+    return OmoriModel()
+
 # ===========================
 # HEADER
 # ===========================
@@ -332,6 +370,25 @@ else:
 
 st.markdown('<p class="header-subtitle">Data dari Badan Meteorologi, Klimatologi, dan Geofisika (BMKG) + Historical Excel</p>', unsafe_allow_html=True)
 
+# Katalog penuh tetap disimpan untuk analisis aftershock
+df_catalog = df
+
+# Toggle declustered: buang foreshock & aftershock (label dari cache per versi katalog)
+df, decluster_spec = declustering_toggle(df)
+
+# Alert anomali laju seismisitas: provinsi dengan lonjakan jumlah gempa dibanding baseline-nya.
+# Versi data historis sama seperti di halaman risk (file Excel, + versi katalog jika declustered)
+static_token = excel_version if decluster_spec is None else (excel_version, catalog_version(df))
+anomaly_alerts = rate_alerts(get_anomaly_detector(decluster_spec).sync(df, static_token).evaluate())
+if not anomaly_alerts.empty:
+    alert_lines = [
+        f"{row.status} **{row.wilayah}**: {row.recent_count} gempa dalam {ANOMALY_WINDOW_DAYS} hari terakhir "
+        f"(normal ±{row.expected:.1f}, z = {row.z_score:.1f})"
+        for row in anomaly_alerts.itertuples()
+    ]
+    alert_box = st.error if (anomaly_alerts['status'] == STATUS_ALERT).any() else st.warning
+    alert_box("📈 **Peningkatan Aktivitas Seismik Terdeteksi**\n\n" + "\n".join(f"- {line}" for line in alert_lines))
+
 # ===========================
 # SIDEBAR
 # ===========================
@@ -341,7 +398,7 @@ with st.sidebar:
     
     menu = st.radio(
         "Pilih menu pencarian:",
-        ["🏘️ Cari Wilayah", "📊 Cari Magnitudo", "📅 Cari Tanggal", "🔧 Kombinasi Filter"],
+        ["🏘️ Cari Wilayah", "📊 Cari Magnitudo", "📅 Cari Tanggal", "📍 Cari Radius", "🔧 Kombinasi Filter", "🌀 Swarm & Sekuens", "📉 Aftershock (Omori)"],
         index=0
     )
     
@@ -798,7 +855,122 @@ elif menu == "📅 Cari Tanggal":
                     )
 
 # ===========================
-# MENU 4: KOMBINASI FILTER
+# MENU 4: CARI RADIUS / TERDEKAT
+# ===========================
+elif menu == "📍 Cari Radius":
+    st.markdown('<p class="result-title">Pencarian Berdasarkan Jarak dari Titik</p>', unsafe_allow_html=True)
+    
+    if df.empty:
+        st.error("❌ Data tidak tersedia")
+    else:
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown("**TITIK PUSAT**")
+            point_type = st.radio("Tipe:", ["Kota", "Koordinat"], horizontal=True, key="radius_point_type", label_visibility="collapsed")
+            
+            if point_type == "Kota":
+                selected_city = st.selectbox("Pilih Kota:", list(REFERENCE_CITIES), key="radius_city", label_visibility="collapsed")
+                center_lat, center_lon = REFERENCE_CITIES[selected_city]
+                center_label = selected_city
+            else:
+                col_lat, col_lon = st.columns(2)
+                with col_lat:
+                    center_lat = st.number_input("Latitude:", min_value=-90.0, max_value=90.0, value=-6.2088, step=0.1, format="%.4f", key="radius_lat")
+                with col_lon:
+                    center_lon = st.number_input("Longitude:", min_value=-180.0, max_value=180.0, value=106.8456, step=0.1, format="%.4f", key="radius_lon")
+                center_label = f"{center_lat:.4f}, {center_lon:.4f}"
+        
+        with col2:
+            st.markdown("**MODE PENCARIAN**")
+            search_mode = st.radio("Mode:", ["Dalam Radius", "Terdekat"], horizontal=True, key="radius_mode", label_visibility="collapsed")
+        
+        with col3:
+            if search_mode == "Dalam Radius":
+                st.markdown("**RADIUS (KM)**")
+                radius_km = st.number_input("Radius (km):", min_value=1.0, max_value=2000.0, value=50.0, step=10.0, key="radius_km", label_visibility="collapsed")
+            else:
+                st.markdown("**JUMLAH GEMPA**")
+                k_nearest = st.number_input("Jumlah:", min_value=1, max_value=500, value=10, step=1, key="radius_k", label_visibility="collapsed")
+        
+        st.markdown("---")
+        
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            search_button = st.button("🔍 Cari", key="radius_button", use_container_width=True)
+        
+        if search_button:
+            event_index = get_event_index(catalog_version(df), df)
+            
+            if search_mode == "Dalam Radius":
+                positions, distances = query_radius(event_index, center_lat, center_lon, radius_km)
+                search_info = f"dalam radius {radius_km:.0f} km dari {center_label}"
+            else:
+                positions, distances = query_nearest(event_index, center_lat, center_lon, k_nearest)
+                search_info = f"terdekat dari {center_label}"
+            
+            df_filtered = df.iloc[positions].copy()
+            df_filtered['jarak_km'] = distances
+            
+            if len(df_filtered) == 0:
+                st.error(f"❌ Tidak ada gempa {search_info}")
+            else:
+                st.success(f"✅ Ditemukan {len(df_filtered)} gempa {search_info}")
+                
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{len(df_filtered)}</div>
+                        <div class="metric-label">Total Gempa</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col2:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{df_filtered['jarak_km'].min():.1f} km</div>
+                        <div class="metric-label">Jarak Terdekat</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col3:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{df_filtered['magnitudo'].max():.2f}</div>
+                        <div class="metric-label">Magnitudo Maksimal</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                with col4:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{df_filtered['kedalaman_km'].mean():.1f} km</div>
+                        <div class="metric-label">Kedalaman Rata-rata</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                st.markdown("---")
+                
+                st.subheader("📋 Data Gempa (urut dari yang terdekat)")
+                display_df = df_filtered[["waktu_display", "jarak_km", "magnitudo", "kategori_magnitudo", "kedalaman_km", "latitude", "longitude", "lokasi"]].copy()
+                display_df['jarak_km'] = display_df['jarak_km'].round(1)
+                display_df.columns = ["Waktu", "Jarak (km)", "Magnitudo", "Kategori Mag", "Kedalaman (km)", "Latitude", "Longitude", "Lokasi"]
+                
+                st.dataframe(display_df, use_container_width=True, height=400)
+                
+                csv = display_df.to_csv(index=False)
+                st.download_button(
+                    label="📥 Download CSV",
+                    data=csv,
+                    file_name=f"gempa_radius_{center_label.replace(' ', '_').replace(',', '')}.csv",
+                    mime="text/csv",
+                    key="download_radius"
+                )
+
+# ===========================
+# MENU 5: KOMBINASI FILTER
 # ===========================
 elif menu == "🔧 Kombinasi Filter":
     st.markdown('<p class="result-title">Pencarian dengan Kombinasi Filter</p>', unsafe_allow_html=True)
@@ -937,6 +1109,201 @@ elif menu == "🔧 Kombinasi Filter":
                     key="download_all_kombi"
                 )
 
+# ===========================
+# MENU 6: SWARM & SEKUENS GEMPA
+# ===========================
+elif menu == "🌀 Swarm & Sekuens":
+    st.markdown('<p class="result-title">Deteksi Swarm & Sekuens Gempa (ST-DBSCAN)</p>', unsafe_allow_html=True)
+    
+    if df.empty:
+        st.error("❌ Data tidak tersedia")
+    else:
+        st.info("💡 Swarm = kumpulan gempa yang saling berdekatan dalam ruang & waktu. "
+                "Sekuens mainshock-aftershock = swarm dengan satu gempa jauh lebih besar (≥ 1 magnitudo) dari gempa lainnya.")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown("**JARAK TETANGGA (KM)**")
+            eps_km = st.number_input("Jarak (km):", min_value=1.0, max_value=200.0, value=SWARM_EPS_KM, step=5.0, key="swarm_eps_km", label_visibility="collapsed")
+        with col2:
+            st.markdown("**SELANG WAKTU (HARI)**")
+            eps_days = st.number_input("Waktu (hari):", min_value=0.1, max_value=30.0, value=SWARM_EPS_DAYS, step=0.5, key="swarm_eps_days", label_visibility="collapsed")
+        with col3:
+            st.markdown("**MINIMAL GEMPA**")
+            min_events = st.number_input("Minimal gempa:", min_value=3, max_value=200, value=SWARM_MIN_EVENTS, step=1, key="swarm_min_events", label_visibility="collapsed")
+        
+        swarm_labels, swarms = get_swarms(catalog_version(df), eps_km, eps_days, int(min_events), df)
+        
+        if swarms.empty:
+            st.warning("⚠️ Tidak ada swarm yang terdeteksi dengan parameter ini")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{len(swarms)}</div>
+                    <div class="metric-label">Swarm Terdeteksi</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{(swarms['jenis'] != "Swarm").sum()}</div>
+                    <div class="metric-label">Sekuens Mainshock-Aftershock</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col3:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{int(swarms['count'].sum()):,}</div>
+                    <div class="metric-label">Gempa dalam Swarm</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col4:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{swarms['mag_max'].max():.2f}</div>
+                    <div class="metric-label">Magnitudo Puncak</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            st.markdown("---")
+            
+            st.subheader("📋 Daftar Swarm (urut dari jumlah gempa terbanyak)")
+            display_df = swarms[["swarm_id", "jenis", "lokasi_dominan", "start", "end", "duration_hours", "count", "mag_max", "mag_mean", "radius_km", "latitude", "longitude"]].copy()
+            display_df['start'] = display_df['start'].dt.strftime("%Y-%m-%d %H:%M")
+            display_df['end'] = display_df['end'].dt.strftime("%Y-%m-%d %H:%M")
+            display_df = display_df.round({'duration_hours': 1, 'mag_max': 2, 'mag_mean': 2, 'radius_km': 1, 'latitude': 4, 'longitude': 4})
+            display_df.columns = ["ID", "Jenis", "Lokasi Dominan", "Mulai", "Selesai", "Durasi (jam)", "Jumlah Gempa", "Mag Puncak", "Mag Rata-rata", "Radius (km)", "Latitude", "Longitude"]
+            
+            st.dataframe(display_df, use_container_width=True, height=400, hide_index=True)
+            
+            csv = display_df.to_csv(index=False)
+            st.download_button(
+                label="📥 Download CSV",
+                data=csv,
+                file_name="swarm_gempa.csv",
+                mime="text/csv",
+                key="download_swarm"
+            )
+            
+            # Detail gempa anggota satu swarm
+            selected_swarm = st.selectbox(
+                "Lihat gempa dalam swarm:",
+                swarms['swarm_id'].tolist(),
+                format_func=lambda swarm_id: f"#{swarm_id} · {swarms.loc[swarm_id - 1, 'lokasi_dominan']} ({swarms.loc[swarm_id - 1, 'count']} gempa)",
+                key="swarm_detail"
+            )
+            df_swarm = df[swarm_labels == selected_swarm].sort_values("waktu")
+            swarm_events = df_swarm[["waktu_display", "magnitudo", "kategori_magnitudo", "kedalaman_km", "latitude", "longitude", "lokasi"]].copy()
+            swarm_events.columns = ["Waktu", "Magnitudo", "Kategori Mag", "Kedalaman (km)", "Latitude", "Longitude", "Lokasi"]
+            st.dataframe(swarm_events, use_container_width=True, height=300, hide_index=True)
+
+# ===========================
+# MENU 7: PELURUHAN AFTERSHOCK (OMORI-UTSU)
+# ===========================
+elif menu == "📉 Aftershock (Omori)":
+    st.markdown('<p class="result-title">Peluruhan Aftershock (Omori-Utsu)</p>', unsafe_allow_html=True)
+    
+    if df_catalog.empty:
+        st.error("❌ Data tidak tersedia")
+    else:
+        st.info(f"💡 Laju aftershock n(t) = K / (t + c)^p. Aftershock diambil dari jendela jarak & waktu Gardner-Knopoff setiap mainshock M≥{OMORI_MIN_MAG:g} "
+                "(katalog penuh, tanpa declustering); K, c, p di-fit dengan maximum likelihood.")
+        
+        catalog_labels = get_decluster_labels(catalog_version(df_catalog), DEFAULT_DECLUSTER_METHOD, df_catalog)
+        omori_model = get_omori_model()
+        omori_table = omori_model.sync(df_catalog, catalog_labels)
+        
+        if omori_table.empty:
+            st.warning(f"⚠️ Tidak ada mainshock M≥{OMORI_MIN_MAG:g} di katalog")
+        else:
+            selected_mainshock = st.selectbox(
+                "Pilih gempa besar (mainshock):",
+                omori_table.index.tolist(),
+                format_func=lambda mainshock_id: (
+                    f"M{omori_table.loc[mainshock_id, 'magnitudo']:.2f} · {omori_table.loc[mainshock_id, 'lokasi']} "
+                    f"({omori_table.loc[mainshock_id, 'waktu'].strftime('%d-%m-%Y %H:%M')} UTC)"
+                ),
+                key="omori_mainshock"
+            )
+            mainshock = omori_table.loc[selected_mainshock]
+            times, t_end = omori_model.sequence(selected_mainshock)
+            fitted = not np.isnan(mainshock['K'])
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{int(mainshock['n_aftershocks']):,}</div>
+                    <div class="metric-label">Aftershock ({mainshock['window_km']:.0f} km, {t_end:.0f} hari)</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{f"{mainshock['p']:.2f}" if fitted else "-"}</div>
+                    <div class="metric-label">p (Laju Peluruhan)</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col3:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{f"{mainshock['next_forecast']:.1f}" if fitted else "-"}</div>
+                    <div class="metric-label">Ekspektasi {FORECAST_DAYS} Hari ke Depan</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col4:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{f"{mainshock['remaining']:.1f}" if fitted else "-"}</div>
+                    <div class="metric-label">Sisa Aftershock (s/d {mainshock['window_days']:.0f} hari)</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            if not fitted:
+                st.warning(f"⚠️ Aftershock terlalu sedikit untuk fit Omori-Utsu (minimal {OMORI_MIN_EVENTS} gempa)")
+            else:
+                st.caption(f"K = {mainshock['K']:.3g} · c = {mainshock['c']:.3g} hari · p = {mainshock['p']:.3f} · "
+                           f"diamati {mainshock['elapsed_days']:.0f} hari sejak mainshock")
+                
+                # Jumlah kumulatif aftershock: observasi vs model Omori-Utsu
+                curve_days = np.linspace(0, t_end, 200)
+                cumulative = pd.DataFrame({
+                    'Observasi': np.searchsorted(times, curve_days, side='right'),
+                    'Model Omori-Utsu': mainshock['K'] * omori_integral(mainshock['c'], mainshock['p'], 0.0, curve_days)
+                }, index=pd.Index(curve_days.round(2), name='Hari sejak mainshock'))
+                st.line_chart(cumulative, height=320)
+            
+            st.markdown("---")
+            
+            st.subheader(f"📋 Fit Omori-Utsu Semua Mainshock M≥{OMORI_MIN_MAG:g}")
+            display_df = omori_table.reset_index(drop=True)
+            display_df['waktu'] = display_df['waktu'].dt.strftime("%Y-%m-%d %H:%M")
+            display_df = display_df[["waktu", "magnitudo", "lokasi", "n_aftershocks", "K", "c", "p", "next_forecast", "remaining", "elapsed_days", "window_km", "window_days"]]
+            display_df = display_df.round({'magnitudo': 2, 'K': 3, 'c': 4, 'p': 3, 'next_forecast': 1, 'remaining': 1, 'elapsed_days': 1, 'window_km': 1, 'window_days': 0})
+            display_df.columns = ["Waktu (UTC)", "Magnitudo", "Lokasi", "Aftershock", "K", "c (hari)", "p",
+                                  f"Ekspektasi {FORECAST_DAYS} Hari", "Sisa Aftershock", "Hari Sejak Mainshock", "Radius Jendela (km)", "Durasi Jendela (hari)"]
+            
+            st.dataframe(display_df, use_container_width=True, height=400, hide_index=True)
+            
+            csv = display_df.to_csv(index=False)
+            st.download_button(
+                label="📥 Download CSV",
+                data=csv,
+                file_name="omori_aftershock.csv",
+                mime="text/csv",
+                key="download_omori"
+            )
+
 # ===========================
 # FOOTER
 # ===========================
@@ -0,0 +1,147 @@
+"""Benchmark risk score: loop per lokasi (lama) vs groupby vs update inkremental
+
+Jalankan dari root repo:
+    python -m benchmarks.bench_risk_scores
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.risk import compute_risk_scores, RiskAggregates
+
+# (jumlah gempa, jumlah lokasi); loop lama dilewati untuk ukuran terbesar
+INCREMENTAL_BATCH = 15
+BMKG_SNAPSHOT = 200
+SIZES = [(10_000, 50), (100_000, 1_000), (100_000, 10_000), (1_000_000, 20_000)]
+LOOP_MAX_WORK = 2e9
+
+
+def make_catalog(n_events, n_locations, seed=0):
+    """Katalog sintetis dengan kolom yang sama seperti hasil process_data"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'lokasi': pd.Series(rng.integers(0, n_locations, n_events)).map(lambda i: f"Lokasi {i:05d}"),
+        'magnitudo': (1.5 + rng.exponential(0.9, n_events)).round(2),
+        'kedalaman_km': rng.gamma(1.5, 40, n_events).round(2),
+        'latitude': rng.uniform(-11, 6, n_events).round(4),
+        'longitude': rng.uniform(95, 141, n_events).round(4),
+        'source': np.where(rng.random(n_events) < 0.7, 'Excel (Historical)', 'BMKG Real-time'),
+        'waktu': pd.Timestamp('2025-01-01', tz='UTC') + pd.to_timedelta(np.arange(n_events), unit='s')
+    })
+
+
+def legacy_risk_scores(df_data):
+    """Implementasi lama (loop per lokasi), untuk pembanding hasil & waktu"""
+    risk_scores = []
+
+    for lokasi in df_data['lokasi'].unique():
+        df_lokasi = df_data[df_data['lokasi'] == lokasi]
+
+        total_gempa = len(df_lokasi)
+        mag_mean = df_lokasi['magnitudo'].mean()
+        mag_max = df_lokasi['magnitudo'].max()
+        high_mag_count = len(df_lokasi[df_lokasi['magnitudo'] >= 5])
+        kedalaman_mean = df_lokasi['kedalaman_km'].mean()
+        kedalaman_min = df_lokasi['kedalaman_km'].min()
+
+        source_breakdown = df_lokasi['source'].value_counts().to_dict()
+        excel_count = source_breakdown.get('Excel (Historical)', 0)
+        bmkg_count = source_breakdown.get('BMKG Real-time', 0)
+
+        frequency_score = min(total_gempa / 100, 10)
+        intensity_score = mag_mean if not pd.isna(mag_mean) else 0
+        high_mag_score = min(high_mag_count / 10, 10)
+
+        risk_score = (frequency_score * 0.35) + (intensity_score * 0.4) + (high_mag_score * 0.25)
+        risk_score = min(risk_score, 10)
+
+        if risk_score >= 8:
+            risk_level, risk_color = "🔴 VERY HIGH", "very-high"
+        elif risk_score >= 6:
+            risk_level, risk_color = "🟠 HIGH", "high"
+        elif risk_score >= 4:
+            risk_level, risk_color = "🟡 MEDIUM", "medium"
+        elif risk_score >= 2:
+            risk_level, risk_color = "🟢 LOW", "low"
+        else:
+            risk_level, risk_color = "🔵 VERY LOW", "very-low"
+
+        risk_scores.append({
+            'lokasi': lokasi,
+            'total_gempa': total_gempa,
+            'excel_count': excel_count,
+            'bmkg_count': bmkg_count,
+            'mag_mean': mag_mean,
+            'mag_max': mag_max,
+            'high_mag_count': high_mag_count,
+            'kedalaman_mean': kedalaman_mean,
+            'kedalaman_min': kedalaman_min,
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'risk_color': risk_color,
+            'lat_mean': df_lokasi['latitude'].mean(),
+            'lon_mean': df_lokasi['longitude'].mean()
+        })
+
+    risk_df = pd.DataFrame(risk_scores).sort_values('risk_score', ascending=False).reset_index(drop=True)
+    risk_df['rank'] = range(1, len(risk_df) + 1)
+
+    return risk_df
+
+
+def assert_same_scores(old, new):
+    """Hasil lama & baru sama per lokasi, dan urutan skor sama
+
+    Rata-rata groupby memakai penjumlahan terkompensasi, sehingga mag_mean dan
+    risk_score bisa berbeda ~1 ulp; lokasi dengan skor (hampir) sama boleh
+    bertukar peringkat, seperti pada sort_values lama yang juga tidak stabil.
+    """
+    pd.testing.assert_frame_equal(
+        old.drop(columns='rank').set_index('lokasi').sort_index(),
+        new[old.columns].drop(columns='rank').set_index('lokasi').sort_index(),
+        check_exact=False, rtol=1e-12, atol=0
+    )
+    np.testing.assert_allclose(old['risk_score'], new['risk_score'], rtol=1e-12, atol=0)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    print(f"{'gempa':>10} {'lokasi':>8} {'groupby':>10} {'loop':>10} {'speedup':>8}  hasil")
+    for n_events, n_locations in SIZES:
+        df = make_catalog(n_events, n_locations)
+        new, t_new = timed(compute_risk_scores, df)
+
+        if n_events * n_locations > LOOP_MAX_WORK:
+            print(f"{n_events:>10,} {n_locations:>8,} {t_new:>9.3f}s {'-':>10} {'-':>8}  (loop dilewati)")
+            continue
+
+        old, t_old = timed(legacy_risk_scores, df)
+        assert_same_scores(old, new)
+        print(f"{n_events:>10,} {n_locations:>8,} {t_new:>9.3f}s {t_old:>9.2f}s {t_old / t_new:>7.0f}x  sama")
+
+
+def main_incremental():
+    """Sync RiskAggregates saat snapshot BMKG bertambah INCREMENTAL_BATCH gempa"""
+    print(f"\n{'gempa':>10} {'lokasi':>8} {'groupby':>10} {'sync':>10}  (+{INCREMENTAL_BATCH} gempa BMKG)")
+    for n_events, n_locations in SIZES:
+        df = make_catalog(n_events, n_locations)
+        # Seperti di aplikasi: katalog historis besar + snapshot BMKG kecil
+        df['source'] = np.where(np.arange(n_events) < n_events - BMKG_SNAPSHOT, 'Excel (Historical)', 'BMKG Real-time')
+        aggregates = RiskAggregates()
+        aggregates.sync(df.iloc[:-INCREMENTAL_BATCH], "excel-v1")
+
+        new, t_sync = timed(aggregates.sync, df, "excel-v1")
+        old, t_full = timed(compute_risk_scores, df)
+        assert_same_scores(old, new)
+        print(f"{n_events:>10,} {n_locations:>8,} {t_full:>9.3f}s {t_sync:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
+    main_incremental()
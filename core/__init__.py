@@ -0,0 +1 @@
+"""Modul bersama (engine data & visualisasi) untuk halaman-halaman aplikasi gempa"""
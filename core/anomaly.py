@@ -0,0 +1,178 @@
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from core.risk import event_keys, STATIC_SOURCE
+
+# ===========================
+# DETEKSI ANOMALI LAJU SEISMISITAS (STREAMING)
+# ===========================
+# Jumlah gempa harian per wilayah disimpan sebagai counter (wilayah, hari).
+# Setiap batch BMKG hanya menambah/mengurangi counter untuk gempa yang baru
+# masuk atau keluar dari snapshot (O(batch)). Evaluasi membandingkan jumlah
+# ANOMALY_WINDOW_DAYS hari terakhir dengan baseline laju Poisson wilayah itu
+# (z-score) dan menjalankan CUSUM Poisson satu sisi pada CUSUM_DAYS hari
+# terakhir; biayanya sebanding jumlah wilayah x hari jendela, bukan katalog.
+ANOMALY_WINDOW_DAYS = 7
+ANOMALY_Z_ALERT = 3.0
+ANOMALY_Z_WATCH = 2.0
+ANOMALY_MIN_EVENTS = 5
+
+# CUSUM Poisson untuk mendeteksi laju naik menjadi CUSUM_RATE_RATIO x baseline
+CUSUM_DAYS = 30
+CUSUM_RATE_RATIO = 2.0
+CUSUM_THRESHOLD = 5.0
+
+STATUS_ALERT = "🔴 Anomali"
+STATUS_WATCH = "🟠 Waspada"
+STATUS_NORMAL = "🟢 Normal"
+
+ANOMALY_COLUMNS = [
+    "wilayah", "recent_count", "expected", "baseline_rate", "rate_ratio",
+    "z_score", "cusum", "status"
+]
+
+
+def _event_days(df_events):
+    """Nomor hari (UTC, sejak epoch) setiap gempa"""
+    waktu = pd.to_datetime(df_events['waktu'], utc=True)
+    return (waktu.dt.floor('D') - pd.Timestamp(0, tz='UTC')).dt.days.to_numpy(dtype=np.int64)
+
+
+class RateAnomalyDetector:
+    """Baseline laju gempa per wilayah yang disinkronkan inkremental dengan katalog
+
+    Data Excel (historis) dihitung sekali. Untuk data real-time, setiap sync()
+    hanya memproses gempa yang baru masuk dan yang sudah keluar dari snapshot
+    BMKG, sama seperti core.risk.RiskAggregates.
+    """
+
+    def __init__(self, region_col='provinsi'):
+        self.region_col = region_col
+        self.daily = Counter()          # (wilayah, hari) -> jumlah gempa
+        self.totals = Counter()         # wilayah -> jumlah gempa
+        self.static_version = None
+        self.keys = pd.Index([], dtype=np.uint64)
+        self.last_added = 0
+        self.last_removed = 0
+        self._cells = pd.Series(dtype=object)   # key gempa real-time -> (wilayah, hari)
+        self._lock = threading.Lock()
+
+    def _add(self, regions, days, sign):
+        cells = pd.Series(1, index=pd.MultiIndex.from_arrays([regions, days])).groupby(level=[0, 1]).size()
+        for (region, day), count in cells.items():
+            self.daily[(region, day)] += sign * count
+            self.totals[region] += sign * count
+            if self.daily[(region, day)] <= 0:
+                del self.daily[(region, day)]
+
+    def sync(self, df_events, static_version):
+        """Update counter dengan isi katalog terbaru (hanya gempa baru/keluar yang diproses)
+
+        Args:
+            static_version: versi data historis dari loader, sama seperti RiskAggregates.sync
+        """
+        with self._lock:
+            is_static = (df_events['source'] == STATIC_SOURCE).to_numpy()
+            if static_version != self.static_version:
+                # Data historis berubah: bangun ulang dari awal
+                self.daily, self.totals = Counter(), Counter()
+                df_static = df_events[is_static]
+                if len(df_static):
+                    self._add(df_static[self.region_col].astype(str).to_numpy(), _event_days(df_static), 1)
+                self.static_version = static_version
+                self.keys = pd.Index([], dtype=np.uint64)
+                self._cells = pd.Series(dtype=object)
+
+            df_live = df_events[~is_static]
+            keys = event_keys(df_live)
+            is_new = ~keys.isin(self.keys)
+            removed = self.keys.difference(keys)
+            self.last_added, self.last_removed = int(is_new.sum()), len(removed)
+
+            if self.last_removed:
+                gone = self._cells.loc[removed]
+                self._add(np.array([cell[0] for cell in gone]), np.array([cell[1] for cell in gone]), -1)
+            if self.last_added:
+                df_new = df_live[is_new]
+                regions = df_new[self.region_col].astype(str).to_numpy()
+                days = _event_days(df_new)
+                self._add(regions, days, 1)
+                new_cells = pd.Series(list(zip(regions, days)), index=keys[is_new], dtype=object)
+                self._cells = pd.concat([self._cells.drop(index=removed), new_cells])
+            elif self.last_removed:
+                self._cells = self._cells.drop(index=removed)
+
+            self.keys = keys
+            return self
+
+    def evaluate(self, window_days=ANOMALY_WINDOW_DAYS, end_day=None):
+        """Status laju gempa setiap wilayah pada jendela window_days hari terakhir
+
+        Args:
+            end_day: hari terakhir jendela (nomor hari UTC); default hari gempa terbaru
+
+        Returns:
+            DataFrame ANOMALY_COLUMNS, diurutkan dari z-score tertinggi
+        """
+        with self._lock:
+            if not self.daily:
+                return pd.DataFrame(columns=ANOMALY_COLUMNS)
+            days = np.array([day for _, day in self.daily])
+            first_day, last_day = int(days.min()), int(days.max())
+            end_day = last_day if end_day is None else int(end_day)
+
+            window = np.arange(end_day - window_days + 1, end_day + 1)
+            cusum_days = np.arange(end_day - CUSUM_DAYS + 1, end_day + 1)
+            regions = sorted(self.totals)
+
+            recent = np.array([sum(self.daily.get((r, d), 0) for d in window) for r in regions], dtype=float)
+            after_end = np.array([
+                sum(count for (region, day), count in self.daily.items() if region == r and day > end_day)
+                for r in regions
+            ], dtype=float) if end_day < last_day else np.zeros(len(regions))
+            series = np.array([[self.daily.get((r, d), 0) for d in cusum_days] for r in regions], dtype=float)
+            totals = np.array([self.totals[r] for r in regions], dtype=float)
+
+        # Baseline: laju harian sebelum jendela (minimal satu hari pengamatan)
+        baseline_days = max(end_day - window_days - first_day + 1, 1)
+        baseline_rate = np.maximum(totals - recent - after_end, 0) / baseline_days
+        expected = baseline_rate * window_days
+
+        # Poisson z-score; baseline nol memakai laju minimum 1 gempa per periode baseline
+        floor = window_days / baseline_days
+        z_score = (recent - expected) / np.sqrt(np.maximum(expected, floor))
+
+        # CUSUM Poisson satu sisi (laju naik menjadi CUSUM_RATE_RATIO x baseline)
+        rate = np.maximum(baseline_rate, 1 / baseline_days)
+        k = rate * (CUSUM_RATE_RATIO - 1) / np.log(CUSUM_RATE_RATIO)
+        cusum = np.zeros(len(regions))
+        for day in range(series.shape[1]):
+            cusum = np.maximum(0, cusum + series[:, day] - k)
+
+        enough = recent >= ANOMALY_MIN_EVENTS
+        status = np.where(
+            enough & (z_score >= ANOMALY_Z_ALERT), STATUS_ALERT,
+            np.where(enough & ((z_score >= ANOMALY_Z_WATCH) | (cusum >= CUSUM_THRESHOLD)), STATUS_WATCH, STATUS_NORMAL)
+        )
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate_ratio = np.where(expected > 0, recent / expected, np.inf)
+
+        return pd.DataFrame({
+            'wilayah': regions,
+            'recent_count': recent.astype(int),
+            'expected': expected,
+            'baseline_rate': baseline_rate,
+            'rate_ratio': rate_ratio,
+            'z_score': z_score,
+            'cusum': cusum,
+            'status': status
+        }).sort_values('z_score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def rate_alerts(anomalies):
+    """Baris wilayah berstatus anomali / waspada saja"""
+    return anomalies[anomalies['status'] != STATUS_NORMAL]
@@ -0,0 +1,318 @@
+import numpy as np
+import pandas as pd
+
+# ===========================
+# BINNING GRID (LAT/LON)
+# ===========================
+DEFAULT_CELL_DEG = 0.05
+
+
+def seismic_energy(mag):
+    """Energi seismik (Joule) dari magnitudo: log10 E = 1.5 M + 4.8 (Gutenberg-Richter)"""
+    return 10 ** (1.5 * np.asarray(mag, dtype=float) + 4.8)
+
+
+def grid_bin(lat, lon, weights=None, cell_deg=DEFAULT_CELL_DEG):
+    """Agregasi titik ke sel grid cell_deg x cell_deg derajat
+
+    Returns:
+        DataFrame[latitude, longitude, count, weight] dengan koordinat pusat sel,
+        satu baris per sel yang berisi minimal satu titik
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    weights = np.ones(len(lat)) if weights is None else np.asarray(weights, dtype=float)
+
+    valid = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(weights)
+    lat, lon, weights = lat[valid], lon[valid], weights[valid]
+
+    n_cols = int(np.ceil(360 / cell_deg))
+    rows = np.floor((lat + 90) / cell_deg).astype(np.int64)
+    cols = np.floor((lon + 180) / cell_deg).astype(np.int64)
+
+    cells, inverse = np.unique(rows * n_cols + cols, return_inverse=True)
+
+    return pd.DataFrame({
+        'latitude': (cells // n_cols + 0.5) * cell_deg - 90,
+        'longitude': (cells % n_cols + 0.5) * cell_deg - 180,
+        'count': np.bincount(inverse, minlength=len(cells)),
+        'weight': np.bincount(inverse, weights=weights, minlength=len(cells))
+    })
+
+
+def heatmap_grid(df_events, weighting="magnitudo", cell_deg=DEFAULT_CELL_DEG):
+    """Grid berbobot untuk HeatMap
+
+    weighting:
+        "magnitudo" - jumlah magnitudo/10 per sel (setara bobot per titik sebelumnya)
+        "energi"    - jumlah energi seismik per sel
+
+    Bobot kedua mode dinormalisasi ke [0, 1] terhadap sel terberat, karena
+    leaflet.heat memakai max=1; tanpa normalisasi sel padat langsung jenuh.
+    """
+    mag = df_events['magnitudo'].to_numpy(dtype=float)
+
+    if weighting == "energi":
+        weights = seismic_energy(mag)
+    else:
+        weights = mag / 10
+
+    grid = grid_bin(df_events['latitude'], df_events['longitude'], weights, cell_deg)
+
+    if not grid.empty:
+        grid['weight'] = grid['weight'] / grid['weight'].max()
+
+    return grid
+
+
+# ===========================
+# BINNING GEOHASH (MULTI-RESOLUSI)
+# ===========================
+# Sel geohash presisi p adalah prefix dari sel presisi p+1, sehingga kode
+# integer presisi kasar didapat dengan menggeser kode presisi halus 5 bit.
+GEOHASH_BASE32 = np.frombuffer(b"0123456789bcdefghjkmnpqrstuvwxyz", dtype=np.uint8)
+GEOHASH_PRECISIONS = (2, 3, 4, 5)
+
+# Perkiraan ukuran sel (lebar x tinggi) di ekuator, untuk label UI
+GEOHASH_CELL_SIZE = {
+    2: "1.250 x 625 km",
+    3: "156 x 156 km",
+    4: "39 x 20 km",
+    5: "4.9 x 4.9 km",
+    6: "1.2 x 0.6 km",
+}
+
+GEOHASH_COLUMNS = [
+    "geohash", "latitude", "longitude", "south", "west", "north", "east",
+    "count", "mag_max", "depth_mean", "energy_sum", "lokasi_dominan"
+]
+
+
+def _geohash_bits(precision):
+    """Jumlah bit (longitude, latitude) untuk presisi geohash tertentu"""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def geohash_encode(lat, lon, precision):
+    """Kode geohash integer (5 bit per karakter) untuk setiap titik"""
+    lon_bits, lat_bits = _geohash_bits(precision)
+    lat = np.clip(np.asarray(lat, dtype=float), -90.0, 90.0)
+    lon = np.clip(np.asarray(lon, dtype=float), -180.0, 180.0)
+
+    lat_int = np.minimum(((lat + 90) / 180 * 2 ** lat_bits).astype(np.int64), 2 ** lat_bits - 1)
+    lon_int = np.minimum(((lon + 180) / 360 * 2 ** lon_bits).astype(np.int64), 2 ** lon_bits - 1)
+
+    # Interleave bit: longitude di posisi genap (dari MSB), latitude di posisi ganjil
+    code = np.zeros(len(lat), dtype=np.int64)
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (lon_int >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_int >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    return code
+
+
+def geohash_bounds(code, precision):
+    """Bounding box (south, west, north, east) dari kode geohash integer"""
+    lon_bits, lat_bits = _geohash_bits(precision)
+    code = np.asarray(code, dtype=np.int64)
+
+    lat_int = np.zeros(len(code), dtype=np.int64)
+    lon_int = np.zeros(len(code), dtype=np.int64)
+    for i in range(5 * precision):
+        bit = (code >> (5 * precision - 1 - i)) & 1
+        if i % 2 == 0:
+            lon_int = (lon_int << 1) | bit
+        else:
+            lat_int = (lat_int << 1) | bit
+
+    lat_step = 180.0 / 2 ** lat_bits
+    lon_step = 360.0 / 2 ** lon_bits
+    south = lat_int * lat_step - 90
+    west = lon_int * lon_step - 180
+    return south, west, south + lat_step, west + lon_step
+
+
+def geohash_to_string(code, precision):
+    """Kode geohash integer -> string base32 (mis. 'qqgu')"""
+    code = np.asarray(code, dtype=np.int64)
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    chars = GEOHASH_BASE32[(code[:, None] >> shifts) & 31]
+    return chars.view(f"S{precision}").ravel().astype(str)
+
+
+def geohash_bin(df_events, precision, codes=None):
+    """Statistik per sel geohash: jumlah, magnitudo maks, kedalaman rata-rata, energi
+
+    Args:
+        codes: opsional, kode geohash tiap gempa pada presisi ini
+               (mis. hasil geser dari presisi yang lebih halus)
+
+    Returns:
+        DataFrame dengan kolom GEOHASH_COLUMNS, satu baris per sel berisi gempa
+    """
+    lat = df_events['latitude'].to_numpy(dtype=float)
+    lon = df_events['longitude'].to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+
+    if not valid.any():
+        return pd.DataFrame(columns=GEOHASH_COLUMNS)
+
+    if codes is None:
+        codes = geohash_encode(lat[valid], lon[valid], precision)
+    else:
+        codes = np.asarray(codes)[valid]
+
+    mag = df_events['magnitudo'].to_numpy(dtype=float)[valid]
+    depth = df_events['kedalaman_km'].to_numpy(dtype=float)[valid]
+    lokasi = df_events['lokasi'].to_numpy()[valid]
+
+    cells, inverse = np.unique(codes, return_inverse=True)
+    n_cells = len(cells)
+
+    count = np.bincount(inverse, minlength=n_cells)
+    mag_max = np.full(n_cells, -np.inf)
+    np.maximum.at(mag_max, inverse, np.nan_to_num(mag, nan=-np.inf))
+
+    depth_valid = np.isfinite(depth)
+    depth_count = np.bincount(inverse[depth_valid], minlength=n_cells)
+    depth_sum = np.bincount(inverse[depth_valid], weights=depth[depth_valid], minlength=n_cells)
+
+    energy_sum = np.bincount(inverse, weights=np.nan_to_num(seismic_energy(mag)), minlength=n_cells)
+
+    # Lokasi (label BMKG) yang paling sering muncul di setiap sel
+    lokasi_codes, lokasi_labels = pd.factorize(lokasi)
+    n_labels = len(lokasi_labels) + 1
+    pairs, pair_count = np.unique(inverse * n_labels + lokasi_codes + 1, return_counts=True)
+    order = np.lexsort((-pair_count, pairs // n_labels))
+    pairs = pairs[order]
+    first = np.r_[True, pairs[1:] // n_labels != pairs[:-1] // n_labels]
+    dominant = pairs[first] % n_labels - 1
+    lokasi_dominan = np.where(dominant >= 0, np.asarray(lokasi_labels, dtype=object)[dominant], None)
+
+    south, west, north, east = geohash_bounds(cells, precision)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        depth_mean = depth_sum / depth_count
+
+    return pd.DataFrame({
+        'geohash': geohash_to_string(cells, precision),
+        'latitude': (south + north) / 2,
+        'longitude': (west + east) / 2,
+        'south': south,
+        'west': west,
+        'north': north,
+        'east': east,
+        'count': count,
+        'mag_max': np.where(np.isinf(mag_max), np.nan, mag_max),
+        'depth_mean': depth_mean,
+        'energy_sum': energy_sum,
+        'lokasi_dominan': lokasi_dominan
+    })
+
+
+def build_geohash_levels(df_events, precisions=GEOHASH_PRECISIONS):
+    """Statistik sel geohash untuk beberapa presisi sekaligus
+
+    Geohash hanya dihitung sekali pada presisi paling halus; presisi yang
+    lebih kasar memakai prefix (geser bit) dari kode tersebut.
+
+    Returns:
+        dict {precision: DataFrame hasil geohash_bin}
+    """
+    finest = max(precisions)
+    lat = df_events['latitude'].to_numpy(dtype=float)
+    lon = df_events['longitude'].to_numpy(dtype=float)
+    codes = geohash_encode(np.nan_to_num(lat), np.nan_to_num(lon), finest)
+
+    return {
+        precision: geohash_bin(df_events, precision, codes >> (5 * (finest - precision)))
+        for precision in precisions
+    }
+
+
+def cells_to_geojson(cells):
+    """FeatureCollection poligon sel (id = geohash) untuk peta choropleth"""
+    features = [
+        {
+            'type': 'Feature',
+            'id': geohash,
+            'properties': {'geohash': geohash},
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]]
+            }
+        }
+        for geohash, s, w, n, e in zip(
+            cells['geohash'], cells['south'].tolist(), cells['west'].tolist(),
+            cells['north'].tolist(), cells['east'].tolist()
+        )
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+# ===========================
+# DOWNSAMPLING SCATTER (KEDALAMAN vs MAGNITUDO)
+# ===========================
+# Di atas SCATTER_POINT_BUDGET titik, gempa biasa disampling per sel grid 2D
+# (kuota sebanding jumlah gempa di sel, minimal satu per sel) sehingga bentuk
+# sebaran tetap terjaga. Gempa ekstrem (magnitudo besar / sangat dalam) selalu
+# ditampilkan apa adanya.
+SCATTER_POINT_BUDGET = 5000
+SCATTER_BINS = 48
+EXTREME_MAG = 5.0
+EXTREME_DEPTH_KM = 300
+
+
+def scatter_extremes(mag, depth):
+    """Mask gempa ekstrem yang tidak boleh ikut disampling"""
+    mag = np.asarray(mag, dtype=float)
+    depth = np.asarray(depth, dtype=float)
+    return (mag >= EXTREME_MAG) | (depth >= EXTREME_DEPTH_KM)
+
+
+def decimate_scatter(x, y, keep, budget=SCATTER_POINT_BUDGET, bins=SCATTER_BINS, seed=0):
+    """Pilih sekitar budget titik scatter dengan sampling stratifikasi per sel grid 2D
+
+    Args:
+        keep: mask titik yang selalu dipertahankan (mis. hasil scatter_extremes)
+
+    Returns:
+        (index titik terpilih, bobot = jumlah gempa yang diwakili tiap titik)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.asarray(keep, dtype=bool)
+
+    if len(x) <= budget:
+        return np.arange(len(x)), np.ones(len(x))
+
+    rest = np.flatnonzero(~keep)
+    fraction = max(budget - keep.sum(), 0) / max(len(rest), 1)
+
+    # Sel grid 2D di rentang data (NaN masuk sel tersendiri)
+    def bin_codes(values):
+        finite = np.isfinite(values)
+        low, high = (values[finite].min(), values[finite].max()) if finite.any() else (0.0, 0.0)
+        scaled = (np.nan_to_num(values, nan=low) - low) / ((high - low) or 1.0)
+        return np.where(finite, np.minimum((scaled * bins).astype(np.int64), bins - 1), bins)
+
+    cells = bin_codes(x[rest]) * (bins + 1) + bin_codes(y[rest])
+    cell_ids, inverse, cell_count = np.unique(cells, return_inverse=True, return_counts=True)
+    quota = np.maximum(np.round(cell_count * fraction), 1).astype(np.int64)
+
+    # Urutan acak (deterministik) di dalam sel; ambil quota titik pertama tiap sel
+    priority = np.random.default_rng(seed).random(len(rest))
+    order = np.lexsort((priority, inverse))
+    starts = np.r_[0, np.cumsum(cell_count)[:-1]]
+    rank = np.empty(len(rest), dtype=np.int64)
+    rank[order] = np.arange(len(rest)) - np.repeat(starts, cell_count)
+    sampled = rank < quota[inverse]
+
+    index = np.concatenate([np.flatnonzero(keep), rest[sampled]])
+    weight = np.concatenate([np.ones(keep.sum()), (cell_count / quota)[inverse[sampled]]])
+    order = np.argsort(index, kind='stable')
+    return index[order], weight[order]
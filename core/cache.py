@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU dengan batas total ukuran (byte) dan jumlah entri
+
+    Dipakai untuk artefak hasil render (script peta, spesifikasi figure) yang
+    di-key dengan versi katalog + spesifikasi filter. Entri yang paling lama
+    tidak dipakai dibuang lebih dulu saat batas terlampaui.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, size):
+        """Simpan value dengan ukuran `size` byte (entri lebih besar dari batas tidak disimpan)"""
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def get_or_create(self, key, build, sizeof=len):
+        """Ambil dari cache, atau bangun dengan build() lalu simpan"""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
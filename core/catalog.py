@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+
+# Kolom yang mengidentifikasi satu kejadian gempa
+KEY_COLUMNS = ["waktu", "latitude", "longitude", "magnitudo"]
+
+
+def catalog_version(df):
+    """Versi katalog gempa (berubah setiap ada gempa baru / data berubah)
+
+    Dipakai sebagai key cache untuk semua hasil precompute per katalog.
+    Hash dijumlahkan sehingga tidak bergantung pada urutan baris.
+    """
+    if df is None or df.empty:
+        return "empty"
+
+    hashed = pd.util.hash_pandas_object(df[KEY_COLUMNS], index=False)
+    checksum = int(hashed.sum()) & 0xFFFFFFFFFFFFFFFF
+    return f"{len(df)}-{checksum:016x}"
+
+
+def files_version(paths):
+    """Versi sekumpulan file data (path, waktu modifikasi, ukuran); file yang tidak ada dilewati
+
+    Cukup stat file, tanpa membaca isinya, sehingga murah dipanggil setiap
+    rerun. Dipakai sebagai key cache loader Excel dan versi data historis
+    untuk sync inkremental.
+    """
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(stamps) or "empty"
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from core.spatial_index import build_grid_index, query_bbox
+
+# ===========================
+# KONFIGURASI CLUSTERING
+# ===========================
+TILE_SIZE = 256        # ukuran tile Leaflet (pixel)
+CLUSTER_RADIUS = 60    # radius cluster di layar (pixel)
+MIN_ZOOM = 0
+MAX_ZOOM = 16          # di atas zoom ini semua gempa ditampilkan sebagai titik
+
+CLUSTER_COLUMNS = ["latitude", "longitude", "count", "mag_max", "point_id"]
+
+
+def project_mercator(lat, lon):
+    """Proyeksi lat/lon ke koordinat Web Mercator ternormalisasi [0, 1)"""
+    lat = np.clip(np.asarray(lat, dtype=float), -85.0511, 85.0511)
+    lon = np.asarray(lon, dtype=float)
+    sin_lat = np.sin(np.radians(lat))
+    x = lon / 360.0 + 0.5
+    y = 0.5 - 0.25 * np.log((1 + sin_lat) / (1 - sin_lat)) / np.pi
+    return x, y
+
+
+def unproject_mercator(x, y):
+    """Kebalikan dari project_mercator"""
+    lon = (np.asarray(x, dtype=float) - 0.5) * 360.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=float)))))
+    return lat, lon
+
+
+def _cell_size(zoom, radius=CLUSTER_RADIUS):
+    """Ukuran sel grid (unit dunia Mercator) pada zoom tertentu"""
+    return radius / (TILE_SIZE * 2.0 ** zoom)
+
+
+def build_cluster_levels(df_events, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=CLUSTER_RADIUS):
+    """Precompute cluster hierarkis (gaya supercluster) untuk setiap level zoom
+
+    Sel grid pada zoom z adalah gabungan tepat 2x2 sel pada zoom z+1, sehingga
+    cluster level z dibentuk dari cluster level z+1 (bukan dari titik mentah).
+
+    Returns:
+        dict {zoom: DataFrame[latitude, longitude, count, mag_max, point_id]}
+        point_id = index baris di df_events untuk cluster berisi 1 gempa, selain itu -1
+    """
+    if df_events is None or df_events.empty:
+        empty = pd.DataFrame(columns=CLUSTER_COLUMNS)
+        return {z: empty for z in range(min_zoom, max_zoom + 1)}
+
+    x, y = project_mercator(df_events['latitude'].to_numpy(), df_events['longitude'].to_numpy())
+    mag = df_events['magnitudo'].to_numpy(dtype=float)
+
+    # Abaikan koordinat tidak valid, point_id tetap mengacu ke posisi baris asli
+    valid = np.isfinite(x) & np.isfinite(y)
+    positions = np.flatnonzero(valid)
+    x, y, mag = x[valid], y[valid], mag[valid]
+
+    # Sel grid paling halus (max_zoom) untuk setiap gempa
+    cell = _cell_size(max_zoom, radius)
+    cell_x = np.floor(x / cell).astype(np.int64)
+    cell_y = np.floor(y / cell).astype(np.int64)
+
+    # State awal: setiap gempa adalah cluster sendiri
+    count = np.ones(len(x), dtype=np.int64)
+    sum_x, sum_y = x.copy(), y.copy()
+    mag_max = np.nan_to_num(mag, nan=-np.inf)
+    point_id = positions.astype(np.int64)
+
+    levels = {}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        if zoom < max_zoom:
+            cell_x >>= 1
+            cell_y >>= 1
+
+        key = (cell_x << 32) | cell_y
+        key_unique, inverse = np.unique(key, return_inverse=True)
+        n_cluster = len(key_unique)
+
+        new_count = np.bincount(inverse, weights=count, minlength=n_cluster).astype(np.int64)
+        new_sum_x = np.bincount(inverse, weights=sum_x, minlength=n_cluster)
+        new_sum_y = np.bincount(inverse, weights=sum_y, minlength=n_cluster)
+        new_mag_max = np.full(n_cluster, -np.inf)
+        np.maximum.at(new_mag_max, inverse, mag_max)
+
+        new_point_id = np.full(n_cluster, -1, dtype=np.int64)
+        single = new_count[inverse] == 1
+        new_point_id[inverse[single]] = point_id[single]
+
+        # Representasi sel induk untuk level berikutnya
+        first = np.zeros(n_cluster, dtype=np.int64)
+        first[inverse] = np.arange(len(inverse))
+        cell_x, cell_y = cell_x[first], cell_y[first]
+
+        count, sum_x, sum_y, mag_max, point_id = new_count, new_sum_x, new_sum_y, new_mag_max, new_point_id
+
+        lat_c, lon_c = unproject_mercator(sum_x / count, sum_y / count)
+        levels[zoom] = pd.DataFrame({
+            'latitude': lat_c,
+            'longitude': lon_c,
+            'count': count,
+            'mag_max': np.where(np.isinf(mag_max), np.nan, mag_max),
+            'point_id': point_id
+        })
+
+    return levels
+
+
+def index_cluster_levels(levels):
+    """Grid index untuk centroid cluster di setiap level zoom"""
+    return {
+        zoom: build_grid_index(clusters['latitude'], clusters['longitude'])
+        for zoom, clusters in levels.items()
+    }
+
+
+def get_visible_clusters(levels, zoom, bounds=None, level_indexes=None):
+    """Cluster & titik yang tampil pada zoom (dan bounding box) saat ini
+
+    Args:
+        levels: hasil build_cluster_levels
+        zoom: level zoom peta (akan di-clamp ke rentang level yang tersedia)
+        bounds: opsional (south, west, north, east) dalam derajat
+        level_indexes: opsional, hasil index_cluster_levels untuk query viewport
+    """
+    zoom_levels = sorted(levels)
+    zoom = int(np.clip(int(zoom), zoom_levels[0], zoom_levels[-1]))
+    clusters = levels[zoom]
+
+    if bounds is None or clusters.empty:
+        return clusters
+
+    if level_indexes is not None:
+        return clusters.iloc[query_bbox(level_indexes[zoom], *bounds)]
+
+    south, west, north, east = bounds
+    mask = (
+        (clusters['latitude'] >= south) & (clusters['latitude'] <= north) &
+        (clusters['longitude'] >= west) & (clusters['longitude'] <= east)
+    )
+    return clusters[mask]
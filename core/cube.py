@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# ===========================
+# OLAP CUBE (KATALOG GEMPA)
+# ===========================
+# Satu sel cube = kombinasi bulan x provinsi x lokasi x sumber x kategori
+# magnitudo x kategori kedalaman x jam (UTC). Hanya sel yang berisi gempa yang
+# disimpan (sparse, format koordinat), masing-masing dengan jumlah & agregat
+# magnitudo/kedalaman. Chart dan kartu metrik adalah irisan (mask) dari sel ini
+# yang dijumlahkan dengan bincount, tanpa menyentuh baris gempa mentah.
+MAG_CATEGORIES = ["1-2 (Kecil)", "3-4 (Ringan)", "4-5 (Menengah)", "5+ (Besar)"]
+MAG_EDGES = [3, 4, 5]
+DEPTH_CATEGORIES = ["Dangkal (<70 km)", "Menengah (70-300 km)", "Dalam (>300 km)"]
+DEPTH_EDGES = [70, 300]
+
+CUBE_DIMENSIONS = ['bulan', 'provinsi', 'lokasi', 'source', 'mag_kategori', 'depth_kategori', 'jam']
+CUBE_MEASURES = ['count', 'mag_sum', 'depth_sum', 'depth_count']
+
+
+def build_cube(df_events):
+    """Bangun cube dari katalog hasil process_data (kolom bulan, bulan_sort, provinsi, ...)
+
+    Returns:
+        dict berisi label tiap dimensi, koordinat sel per dimensi, dan measure
+        per sel (CUBE_MEASURES + mag_max)
+    """
+    month_codes, month_keys = pd.factorize(df_events['bulan_sort'], sort=True)
+    month_names = df_events.groupby('bulan_sort')['bulan'].first()
+
+    province_codes, provinces = pd.factorize(df_events['provinsi'].astype(str), sort=True)
+    lokasi_codes, lokasi = pd.factorize(df_events['lokasi'])
+    source_codes, sources = pd.factorize(df_events['source'])
+
+    mag = df_events['magnitudo'].to_numpy(dtype=float)
+    depth = df_events['kedalaman_km'].to_numpy(dtype=float)
+    hour = pd.to_datetime(df_events['waktu']).dt.hour.to_numpy()
+
+    labels = {
+        'bulan': pd.Index(month_names.reindex(month_keys).to_numpy()),
+        'provinsi': pd.Index(provinces),
+        'lokasi': pd.Index(lokasi),
+        'source': pd.Index(sources),
+        'mag_kategori': pd.Index(MAG_CATEGORIES),
+        'depth_kategori': pd.Index(DEPTH_CATEGORIES),
+        'jam': pd.RangeIndex(24)
+    }
+    event_coords = [
+        month_codes, province_codes, lokasi_codes, source_codes,
+        np.digitize(mag, MAG_EDGES), np.digitize(depth, DEPTH_EDGES), hour
+    ]
+    shape = tuple(len(labels[dim]) for dim in CUBE_DIMENSIONS)
+
+    cells, inverse = np.unique(np.ravel_multi_index(event_coords, shape), return_inverse=True)
+    n_cells = len(cells)
+
+    depth_valid = ~np.isnan(depth)
+    mag_max = np.full(n_cells, -np.inf)
+    np.maximum.at(mag_max, inverse, np.nan_to_num(mag, nan=-np.inf))
+
+    return {
+        'labels': labels,
+        'coords': dict(zip(CUBE_DIMENSIONS, (c.astype(np.int32) for c in np.unravel_index(cells, shape)))),
+        'count': np.bincount(inverse, minlength=n_cells).astype(float),
+        'mag_sum': np.bincount(inverse, weights=np.nan_to_num(mag), minlength=n_cells),
+        'mag_max': mag_max,
+        'depth_sum': np.bincount(inverse, weights=np.nan_to_num(depth), minlength=n_cells),
+        'depth_count': np.bincount(inverse, weights=depth_valid, minlength=n_cells)
+    }
+
+
+def cube_mask(cube, **filters):
+    """Mask sel cube untuk filter dimensi=label; None atau "Semua" berarti tanpa filter"""
+    mask = np.ones(len(cube['count']), dtype=bool)
+    for dim, value in filters.items():
+        if value is None or value == "Semua":
+            continue
+        position = cube['labels'][dim].get_indexer([value])[0]
+        mask &= cube['coords'][dim] == position
+    return mask
+
+
+def cube_marginal(cube, mask, dims, measure='count'):
+    """Total measure per kombinasi dims untuk sel di mask
+
+    Returns:
+        ndarray dense dengan satu sumbu per dimensi di dims (urutan label cube)
+    """
+    shape = tuple(len(cube['labels'][dim]) for dim in dims)
+    weights = cube[measure][mask]
+    flat = np.ravel_multi_index([cube['coords'][dim][mask] for dim in dims], shape)
+    return np.bincount(flat, weights=weights, minlength=int(np.prod(shape))).reshape(shape)
+
+
+def cube_series(cube, mask, dim, measure='count'):
+    """cube_marginal satu dimensi sebagai Series (index = label), hanya yang tidak nol"""
+    totals = pd.Series(cube_marginal(cube, mask, [dim], measure), index=cube['labels'][dim])
+    return totals[totals > 0]
+
+
+def cube_summary(cube, mask):
+    """Ringkasan untuk kartu metrik: jumlah, magnitudo maks/rata-rata, kedalaman rata-rata, M>=5"""
+    count = cube['count'][mask].sum()
+    depth_count = cube['depth_count'][mask].sum()
+    high_mag = cube['count'][mask & (cube['coords']['mag_kategori'] == len(MAG_EDGES))].sum()
+
+    return {
+        'count': int(count),
+        'mag_max': cube['mag_max'][mask].max() if count else np.nan,
+        'mag_mean': cube['mag_sum'][mask].sum() / count if count else np.nan,
+        'depth_mean': cube['depth_sum'][mask].sum() / depth_count if depth_count else np.nan,
+        'high_mag_count': int(high_mag)
+    }
+
+
+def lokasi_hour_matrix(cube, mask):
+    """Matriks jumlah gempa lokasi x jam (0-23) untuk sel di mask
+
+    Returns:
+        DataFrame (index = lokasi, kolom = jam) hanya untuk lokasi yang berisi
+        gempa, diurutkan dari lokasi dengan gempa terbanyak
+    """
+    matrix = cube_marginal(cube, mask, ['lokasi', 'jam']).astype(np.int64)
+    totals = matrix.sum(axis=1)
+    order = np.argsort(-totals, kind='stable')
+    order = order[totals[order] > 0]
+    return pd.DataFrame(matrix[order], index=cube['labels']['lokasi'][order], columns=cube['labels']['jam'])
+
+
+def peak_hours(matrix):
+    """Jam dengan gempa terbanyak per baris matriks lokasi x jam (jam terkecil jika seri)"""
+    return pd.Series(matrix.columns[np.argmax(matrix.to_numpy(), axis=1)], index=matrix.index, name='jam_terbanyak')
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from core.spatial_index import build_grid_index, query_radius, haversine_km
+
+# ===========================
+# DECLUSTERING KATALOG (MAINSHOCK / FORESHOCK / AFTERSHOCK)
+# ===========================
+# Katalog diurutkan berdasarkan waktu sehingga jendela waktu sebuah gempa
+# adalah satu rentang kontigu (searchsorted). Jika rentang itu terlalu besar
+# (jendela gempa besar), kandidat diambil dari spatial index lebih dulu lalu
+# disaring waktunya. Setiap gempa hanya memeriksa kandidat di jendelanya,
+# bukan seluruh katalog.
+DECLUSTER_METHODS = ("Gardner-Knopoff", "Reasenberg")
+DEFAULT_DECLUSTER_METHOD = "Gardner-Knopoff"
+
+ROLE_MAINSHOCK = "mainshock"
+ROLE_FORESHOCK = "foreshock"
+ROLE_AFTERSHOCK = "aftershock"
+
+DECLUSTER_COLUMNS = ["cluster_id", "role", "cluster_size"]
+
+# Rentang waktu di atas jumlah ini dicari lewat spatial index lebih dulu
+TIME_SLICE_LIMIT = 2000
+
+# Parameter standar Reasenberg (1985)
+REASENBERG_PARAMS = {
+    'rfact': 10,        # faktor radius interaksi
+    'tau_min': 1.0,     # hari
+    'tau_max': 10.0,    # hari
+    'p': 0.95,          # probabilitas mendeteksi gempa berikutnya
+    'xk': 0.5,
+    'xmeff': 1.5,       # magnitudo efektif batas bawah
+    'r_max_km': 200.0   # batas atas radius interaksi (km)
+}
+
+
+def gardner_knopoff_window(mag):
+    """Jendela Gardner-Knopoff (1974): (jarak km, waktu hari) per magnitudo"""
+    mag = np.asarray(mag, dtype=float)
+    distance_km = 10 ** (0.1238 * mag + 0.983)
+    time_days = np.where(mag >= 6.5, 10 ** (0.032 * mag + 2.7389), 10 ** (0.5409 * mag - 0.547))
+    return distance_km, time_days
+
+
+def _event_arrays(df_events):
+    """Waktu (hari), lat, lon, magnitudo katalog terurut waktu + urutan ke baris asli"""
+    waktu = pd.to_datetime(df_events['waktu'], utc=True)
+    days = ((waktu - waktu.min()) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+    order = np.argsort(days, kind='stable')
+
+    lat = df_events['latitude'].to_numpy(dtype=float)[order]
+    lon = df_events['longitude'].to_numpy(dtype=float)[order]
+    mag = np.nan_to_num(df_events['magnitudo'].to_numpy(dtype=float)[order], nan=0.0)
+    return days[order], lat, lon, mag, order
+
+
+def _window_candidates(days, lat, lon, index, i, t_start, t_end, radius_km):
+    """Posisi (terurut waktu) dalam jendela [t_start, t_end] dan radius_km dari gempa i"""
+    lo = np.searchsorted(days, t_start, side='left')
+    hi = np.searchsorted(days, t_end, side='right')
+
+    if hi - lo > TIME_SLICE_LIMIT:
+        candidates, _ = query_radius(index, lat[i], lon[i], radius_km)
+        return np.sort(candidates[(candidates >= lo) & (candidates < hi)])
+
+    candidates = np.arange(lo, hi)
+    distances = haversine_km(lat[i], lon[i], lat[candidates], lon[candidates])
+    return candidates[distances <= radius_km]
+
+
+def gardner_knopoff(days, lat, lon, mag, index):
+    """Declustering jendela Gardner-Knopoff pada katalog terurut waktu
+
+    Gempa diproses dari magnitudo terbesar; setiap gempa yang belum masuk
+    cluster menjadi mainshock dan mengambil semua gempa yang belum ber-cluster
+    di jendela jarak & waktunya (sebelum = foreshock, sesudah = aftershock).
+
+    Returns:
+        (cluster_id, mainshock) per gempa (urutan waktu)
+    """
+    n = len(days)
+    cluster = np.full(n, -1, dtype=np.int64)
+    distance_km, time_days = gardner_knopoff_window(mag)
+
+    for i in np.lexsort((days, -mag)):
+        if cluster[i] >= 0:
+            continue
+        cluster[i] = i
+        members = _window_candidates(days, lat, lon, index, i, days[i] - time_days[i], days[i] + time_days[i], distance_km[i])
+        members = members[cluster[members] < 0]
+        cluster[members] = i
+
+    return cluster, cluster == np.arange(n)
+
+
+def reasenberg(days, lat, lon, mag, index, params=REASENBERG_PARAMS):
+    """Declustering Reasenberg (1985) dengan radius interaksi & look-ahead dinamis
+
+    Gempa diproses berurutan waktu. Gempa berikutnya yang berada dalam waktu
+    look-ahead tau dan radius interaksi dari gempa saat ini digabung ke cluster
+    yang sama (union-find). Mainshock = gempa terbesar di setiap cluster.
+
+    Returns:
+        (cluster_id, mainshock) per gempa (urutan waktu)
+    """
+    n = len(days)
+    parent = np.arange(n)
+    big = np.arange(n)            # gempa terbesar per root cluster
+    clustered = np.zeros(n, dtype=bool)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a == b:
+            return
+        # Root baru adalah cluster dengan gempa terbesar
+        if mag[big[b]] > mag[big[a]]:
+            a, b = b, a
+        parent[b] = a
+
+    r_main = 0.011 * 10 ** (0.4 * mag)
+    log_miss = -np.log(1 - params['p'])
+
+    for i in range(n):
+        root = find(i)
+        largest = big[root]
+
+        if clustered[i]:
+            delta_m = (1 - params['xk']) * mag[largest] - params['xmeff']
+            elapsed = max(days[i] - days[largest], 0.0)
+            tau = log_miss * elapsed / 10 ** ((delta_m - 1) * 2 / 3)
+            tau = min(max(tau, params['tau_min']), params['tau_max'])
+        else:
+            tau = params['tau_min']
+
+        radius_km = min(max(params['rfact'] * r_main[largest], r_main[i]), params['r_max_km'])
+        linked = _window_candidates(days, lat, lon, index, i, days[i], days[i] + tau, radius_km)
+        linked = linked[linked > i]
+
+        if len(linked):
+            clustered[i] = True
+            clustered[linked] = True
+            for j in linked:
+                union(i, j)
+
+    roots = np.array([find(i) for i in range(n)])
+    # Mainshock = gempa terbesar (paling awal jika seri) di setiap cluster
+    order = np.lexsort((np.arange(n), -mag, roots))
+    first = np.r_[True, roots[order][1:] != roots[order][:-1]]
+    mainshock = np.zeros(n, dtype=bool)
+    mainshock[order[first]] = True
+    return roots, mainshock
+
+
+def decluster(df_events, method=DEFAULT_DECLUSTER_METHOD):
+    """Label mainshock / foreshock / aftershock untuk setiap gempa
+
+    Returns:
+        DataFrame dengan kolom DECLUSTER_COLUMNS, index sama dengan df_events.
+        cluster_id berurutan mengikuti waktu mainshock; gempa tunggal adalah
+        mainshock dengan cluster_size 1.
+    """
+    if df_events is None or df_events.empty:
+        return pd.DataFrame(columns=DECLUSTER_COLUMNS)
+
+    days, lat, lon, mag, order = _event_arrays(df_events)
+    index = build_grid_index(lat, lon)
+
+    if method == "Reasenberg":
+        cluster, mainshock = reasenberg(days, lat, lon, mag, index)
+    else:
+        cluster, mainshock = gardner_knopoff(days, lat, lon, mag, index)
+
+    # Waktu mainshock setiap cluster menentukan foreshock (sebelum) / aftershock (sesudah)
+    cluster_codes, cluster_size = np.unique(cluster, return_inverse=True, return_counts=True)[1:]
+    main_position = np.zeros(len(cluster_size), dtype=np.int64)
+    main_position[cluster_codes[mainshock]] = np.flatnonzero(mainshock)
+
+    main_time = days[main_position][cluster_codes]
+    role = np.where(mainshock, ROLE_MAINSHOCK, np.where(days < main_time, ROLE_FORESHOCK, ROLE_AFTERSHOCK))
+    role[~mainshock & (days == main_time) & (np.arange(len(days)) < main_position[cluster_codes])] = ROLE_FORESHOCK
+
+    # Nomor cluster berurutan menurut waktu mainshock
+    cluster_rank = np.empty(len(cluster_size), dtype=np.int64)
+    cluster_rank[np.argsort(main_position, kind='stable')] = np.arange(len(cluster_size))
+
+    # Kembalikan ke urutan baris asli katalog
+    rows = np.empty(len(order), dtype=np.int64)
+    rows[order] = np.arange(len(order))
+
+    return pd.DataFrame({
+        'cluster_id': cluster_rank[cluster_codes][rows],
+        'role': role[rows],
+        'cluster_size': cluster_size[cluster_codes][rows]
+    }, index=df_events.index)
+
+
+def mainshock_mask(labels):
+    """Mask baris katalog yang tersisa setelah declustering (mainshock saja)"""
+    return (labels['role'] == ROLE_MAINSHOCK).to_numpy()
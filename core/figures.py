@@ -0,0 +1,51 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# ===========================
+# CACHE FIGURE PLOTLY
+# ===========================
+# Figure dibangun sekali per (id chart, hash agregat, tema), diserialisasi
+# sekali ke spesifikasi JSON ringkas (array numpy sebagai typed array base64)
+# dan spesifikasi itu yang disimpan di core.cache.LRUCache. Ukuran entri =
+# panjang spesifikasi, yaitu ukuran yang benar-benar dikirim ke browser, dan
+# halaman merender langsung dari spesifikasi (ui.charts.plotly_chart_spec)
+# tanpa serialisasi ulang setiap rerun.
+FIGURE_TEMPLATE = 'plotly_white'
+
+
+def aggregate_hash(*parts):
+    """Hash isi agregat (Series/DataFrame/ndarray/nilai biasa) untuk key cache figure"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.Series, pd.DataFrame, pd.Index)):
+            digest.update(pd.util.hash_pandas_object(part, index=not isinstance(part, pd.Index)).to_numpy().tobytes())
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(repr((part.dtype.str, part.shape)).encode())
+            digest.update(np.ascontiguousarray(part).tobytes() if part.dtype != object else repr(part.tolist()).encode())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+def figure_spec(fig):
+    """Spesifikasi JSON ringkas figure + tinggi layout-nya (untuk ui.charts.plotly_chart_spec)"""
+    return {'spec': pio.to_json(fig, validate=False), 'height': fig.layout.height}
+
+
+def cached_figure(cache, chart_id, aggregates, theme, build):
+    """Spesifikasi figure dari cache (core.cache.LRUCache), dibangun dengan build() jika agregat/tema berubah
+
+    Args:
+        aggregates: tuple data yang menentukan isi figure (di-hash dengan aggregate_hash)
+        theme: tema tampilan (template plotly + tema Streamlit aktif)
+
+    Returns:
+        dict hasil figure_spec
+    """
+    key = (chart_id, aggregate_hash(*aggregates), theme)
+    return cache.get_or_create(key, lambda: figure_spec(build()), sizeof=lambda figure: len(figure['spec']))
@@ -0,0 +1,265 @@
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ===========================
+# GUTENBERG-RICHTER (b-VALUE, MLE)
+# ===========================
+# log10 N(>=M) = a - b M. b-value diestimasi dengan maximum likelihood
+# Aki-Utsu pada magnitudo yang dibulatkan ke MAG_BIN; Mc (magnitude of
+# completeness) dengan metode maximum curvature + koreksi MC_CORRECTION.
+MAG_BIN = 0.1
+MC_CORRECTION = 0.2
+MIN_EVENTS = 50          # minimal gempa di atas Mc agar b-value dianggap stabil
+N_BOOTSTRAP = 200
+CONFIDENCE = 0.95
+PARALLEL_MIN_REGIONS = 16
+PARALLEL_MIN_EVENTS = 200_000   # di bawah ini overhead spawn process lebih mahal dari komputasinya
+BOOTSTRAP_CHUNK = 2_000_000   # maksimal elemen sampel bootstrap per batch (memori)
+
+GR_COLUMNS = [
+    'lokasi', 'gr_events', 'mc', 'mc_events', 'b_value', 'b_ci_low', 'b_ci_high', 'a_value'
+]
+
+
+def _fit_rows(samples, min_events=MIN_EVENTS):
+    """Mc & b-value untuk setiap baris sampel (indeks bin magnitudo integer)
+
+    Returns:
+        (mc_bin, n_complete, b_value) per baris; b_value NaN jika gempa di atas
+        Mc kurang dari min_events
+    """
+    n_rows = samples.shape[0]
+    low = samples.min()
+    offset = samples - low
+    n_bins = int(offset.max()) + 1
+
+    # Histogram frekuensi-magnitudo setiap baris sekaligus (bin baris digeser)
+    flat = (np.arange(n_rows)[:, None] * n_bins + offset).ravel()
+    counts = np.bincount(flat, minlength=n_rows * n_bins).reshape(n_rows, n_bins)
+    mc_bin = counts.argmax(axis=1) + low + int(round(MC_CORRECTION / MAG_BIN))
+
+    complete = samples >= mc_bin[:, None]
+    n_complete = complete.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_bin = np.where(complete, samples, 0).sum(axis=1) / n_complete
+        b_value = np.log10(np.e) / ((mean_bin - mc_bin + 0.5) * MAG_BIN)
+
+    b_value = np.where(n_complete >= min_events, b_value, np.nan)
+    return mc_bin, n_complete, b_value
+
+
+def estimate_b_value(mags, n_boot=N_BOOTSTRAP, min_events=MIN_EVENTS, confidence=CONFIDENCE, seed=0):
+    """Mc, b-value, a-value & interval kepercayaan bootstrap untuk satu wilayah
+
+    Bootstrap dilakukan sekaligus sebagai matriks (n_boot x n) dan Mc
+    diestimasi ulang di setiap sampel, sehingga ketidakpastian Mc ikut masuk
+    ke interval b-value.
+
+    Returns:
+        dict dengan kunci GR_COLUMNS (tanpa 'lokasi')
+    """
+    mags = np.asarray(mags, dtype=float)
+    mags = mags[np.isfinite(mags)]
+    result = {
+        'gr_events': len(mags), 'mc': np.nan, 'mc_events': 0,
+        'b_value': np.nan, 'b_ci_low': np.nan, 'b_ci_high': np.nan, 'a_value': np.nan
+    }
+    if len(mags) < min_events:
+        return result
+
+    # Diurutkan agar hasil (termasuk bootstrap) hanya bergantung pada histogram magnitudo
+    bins = np.sort(np.round(mags / MAG_BIN).astype(np.int64))
+    mc_bin, n_complete, b_value = (values[0] for values in _fit_rows(bins[None, :], min_events))
+    mc = mc_bin * MAG_BIN
+    result.update(mc=mc, mc_events=int(n_complete))
+    if np.isnan(b_value):
+        return result
+
+    result.update(b_value=b_value, a_value=np.log10(n_complete) + b_value * mc)
+    if n_boot <= 0:
+        return result
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, BOOTSTRAP_CHUNK // len(bins))
+    boot_b = np.concatenate([
+        _fit_rows(bins[rng.integers(0, len(bins), size=(min(batch, n_boot - start), len(bins)))], min_events)[2]
+        for start in range(0, n_boot, batch)
+    ])
+
+    tail = (1 - confidence) / 2 * 100
+    if np.isfinite(boot_b).any():
+        result['b_ci_low'], result['b_ci_high'] = np.nanpercentile(boot_b, [tail, 100 - tail])
+
+    return result
+
+
+def _estimate_batch(batch, n_boot, min_events, confidence, seed):
+    """Worker process pool: estimasi untuk sekumpulan (label wilayah, magnitudo)"""
+    return [
+        (label, estimate_b_value(mags, n_boot, min_events, confidence, seed=[seed, zlib.crc32(str(label).encode())]))
+        for label, mags in batch
+    ]
+
+
+def fit_regions(groups, n_boot=N_BOOTSTRAP, min_events=MIN_EVENTS, confidence=CONFIDENCE,
+                max_workers=None, seed=0):
+    """Estimasi G-R untuk banyak wilayah sekaligus
+
+    Wilayah dengan gempa cukup dibagi ke beberapa batch dan dijalankan di
+    process pool (spawn, aman untuk server yang multi-thread) bila wilayah &
+    gempanya banyak; seed bootstrap diturunkan dari label wilayah sehingga
+    hasilnya sama dengan eksekusi serial.
+
+    Args:
+        groups: dict {label: array magnitudo}
+        max_workers: jumlah process; default os.cpu_count(), 1 = serial
+
+    Returns:
+        dict {label: dict hasil estimate_b_value}
+    """
+    tasks = [(label, mags) for label, mags in groups.items() if len(mags) >= min_events]
+    max_workers = max_workers or os.cpu_count() or 1
+    parallel = len(tasks) >= PARALLEL_MIN_REGIONS and sum(len(mags) for _, mags in tasks) >= PARALLEL_MIN_EVENTS
+
+    if max_workers > 1 and parallel:
+        # Wilayah terbesar lebih dulu, dibagi round-robin agar beban worker seimbang
+        tasks.sort(key=lambda task: -len(task[1]))
+        batches = [tasks[i::max_workers] for i in range(max_workers)]
+        with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            done = pool.map(_estimate_batch, batches, *([arg] * len(batches) for arg in (n_boot, min_events, confidence, seed)))
+            estimates = dict(item for batch in done for item in batch)
+    else:
+        estimates = dict(_estimate_batch(tasks, n_boot, min_events, confidence, seed))
+
+    return {
+        label: estimates[label] if label in estimates else estimate_b_value(mags, 0, min_events)
+        for label, mags in groups.items()
+    }
+
+
+def magnitude_histograms(df_data, units=None):
+    """Histogram magnitudo (bin MAG_BIN) per unit: DataFrame index = unit, kolom = indeks bin"""
+    units = df_data['lokasi'].to_numpy() if units is None else np.asarray(units, dtype=object)
+    mags = df_data['magnitudo'].to_numpy(dtype=float)
+    valid = ~pd.isna(units) & np.isfinite(mags)
+
+    codes, labels = pd.factorize(units[valid])
+    bins = np.round(mags[valid] / MAG_BIN).astype(np.int64)
+    if not len(labels):
+        return pd.DataFrame(dtype=np.int64)
+
+    low, n_bins = bins.min(), bins.max() - bins.min() + 1
+    counts = np.bincount(codes * n_bins + (bins - low), minlength=len(labels) * n_bins)
+    return pd.DataFrame(
+        counts.reshape(len(labels), n_bins),
+        index=pd.Index(labels, name='lokasi'),
+        columns=np.arange(low, low + n_bins)
+    )
+
+
+def _histogram_magnitudes(histograms):
+    """dict {label: magnitudo terurut} dari baris histogram"""
+    bin_mags = histograms.columns.to_numpy() * MAG_BIN
+    return {label: np.repeat(bin_mags, counts) for label, counts in zip(histograms.index, histograms.to_numpy())}
+
+
+def _fits_table(fits, labels):
+    return pd.DataFrame([{'lokasi': label, **fits[label]} for label in labels], columns=GR_COLUMNS)
+
+
+def gutenberg_richter_table(df_data, units=None, n_boot=N_BOOTSTRAP, min_events=MIN_EVENTS,
+                            confidence=CONFIDENCE, max_workers=None, seed=0):
+    """b-value per unit (lokasi / sel grid) untuk seluruh katalog
+
+    Args:
+        units: opsional, unit skor setiap gempa (default kolom 'lokasi')
+
+    Returns:
+        DataFrame kolom GR_COLUMNS, satu baris per unit
+    """
+    histograms = magnitude_histograms(df_data, units)
+    fits = fit_regions(_histogram_magnitudes(histograms), n_boot, min_events, confidence, max_workers, seed)
+    return _fits_table(fits, histograms.index)
+
+
+# ===========================
+# PROBABILITAS TERLAMPAUI (POISSON)
+# ===========================
+EXCEEDANCE_MAGNITUDES = (5.0, 6.0)
+EXCEEDANCE_HORIZONS_DAYS = (30, 365)
+
+
+def exceedance_column(magnitude, horizon_days):
+    """Nama kolom probabilitas, mis. 'p_m5_30d'"""
+    return f"p_m{magnitude:g}_{horizon_days}d"
+
+
+def exceedance_probabilities(gr_table, span_days, magnitudes=EXCEEDANCE_MAGNITUDES,
+                             horizons_days=EXCEEDANCE_HORIZONS_DAYS):
+    """Peluang minimal satu gempa >= M dalam T hari ke depan untuk semua wilayah
+
+    Laju dari fit G-R: N(>=M) = 10^(a - bM) kejadian selama span_days hari
+    katalog, sehingga P = 1 - exp(-N(>=M) * T / span_days) (proses Poisson).
+    Dihitung sekaligus sebagai array wilayah x magnitudo x horizon.
+
+    Returns:
+        DataFrame index sama dengan gr_table, satu kolom per (M, T)
+    """
+    a = gr_table['a_value'].to_numpy(dtype=float)[:, None, None]
+    b = gr_table['b_value'].to_numpy(dtype=float)[:, None, None]
+    mags = np.asarray(magnitudes, dtype=float)[None, :, None]
+    horizons = np.asarray(horizons_days, dtype=float)[None, None, :]
+
+    daily_rate = 10 ** (a - b * mags) / max(float(span_days), 1.0)
+    probability = -np.expm1(-daily_rate * horizons)
+
+    columns = [exceedance_column(m, t) for m in magnitudes for t in horizons_days]
+    return pd.DataFrame(probability.reshape(len(gr_table), -1), index=gr_table.index, columns=columns)
+
+
+class GutenbergRichterModel:
+    """Fit G-R per unit yang disinkronkan secara inkremental dengan katalog
+
+    Fit hanya bergantung pada histogram magnitudo setiap unit, sehingga saat
+    gempa BMKG baru masuk hanya unit yang histogramnya berubah yang di-fit
+    ulang; probabilitas semua wilayah lalu dihitung ulang secara vektor.
+    """
+
+    def __init__(self, n_boot=N_BOOTSTRAP, min_events=MIN_EVENTS, confidence=CONFIDENCE, max_workers=None):
+        self.params = (n_boot, min_events, confidence, max_workers)
+        self.histograms = pd.DataFrame(dtype=np.int64)
+        self.fits = {}
+        self.last_refit = 0
+        self._table = pd.DataFrame(columns=GR_COLUMNS).set_index('lokasi')
+        self._lock = threading.Lock()
+
+    def sync(self, df_data, units=None):
+        """Update fit dengan isi katalog terbaru, return tabel GR_COLUMNS (index = lokasi)"""
+        with self._lock:
+            histograms = magnitude_histograms(df_data, units)
+
+            previous = self.histograms.reindex(index=histograms.index, columns=histograms.columns, fill_value=0)
+            changed = (previous.to_numpy() != histograms.to_numpy()).any(axis=1)
+            changed |= ~histograms.index.isin(self.histograms.index)
+            # Bin di luar rentang histogram baru (mis. gempa lama keluar dari snapshot)
+            if len(self.histograms.columns.difference(histograms.columns)):
+                outside = self.histograms.columns.difference(histograms.columns)
+                stale = self.histograms[outside].sum(axis=1).reindex(histograms.index, fill_value=0) > 0
+                changed |= stale.to_numpy()
+
+            self.last_refit = int(changed.sum())
+            if self.last_refit or len(histograms) != len(self.histograms):
+                refit = fit_regions(_histogram_magnitudes(histograms[changed]), *self.params)
+                self.fits = {label: self.fits[label] for label in histograms.index[~changed]}
+                self.fits.update(refit)
+                self._table = _fits_table(self.fits, histograms.index).set_index('lokasi')
+
+            self.histograms = histograms
+            return self._table
@@ -0,0 +1,308 @@
+import numpy as np
+import folium
+from folium import JsCode
+from folium.elements import JSCSSMixin
+from folium.template import Template
+
+# ===========================
+# STYLING MAGNITUDO (VEKTOR)
+# ===========================
+MAG_BINS = [3, 4, 5]
+MAG_COLORS = np.array(["green", "yellow", "orange", "red"])
+
+
+def magnitude_colors(mag):
+    """Warna marker per gempa: < 3 hijau, 3-4 kuning, 4-5 oranye, >= 5 merah"""
+    return MAG_COLORS[np.digitize(np.asarray(mag, dtype=float), MAG_BINS)]
+
+
+def magnitude_radius(mag):
+    """Radius CircleMarker (pixel) berdasarkan magnitudo"""
+    return 5 + np.asarray(mag, dtype=float) * 0.5
+
+
+# Popup & style dibuat di browser dari properties GeoJSON
+_EVENT_ON_EACH_FEATURE = JsCode("""
+function(feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.color, fillColor: p.color});
+    layer.setRadius(p.radius);
+    layer.bindPopup(
+        '<b>Gempa Bumi</b><br>' +
+        'Waktu: ' + p.waktu + '<br>' +
+        'Magnitudo: <b>' + p.magnitudo + '</b><br>' +
+        'Kedalaman: ' + p.kedalaman + ' km<br>' +
+        'Lokasi: <b>' + p.lokasi + '</b>',
+        {maxWidth: 250}
+    );
+}
+""")
+
+
+def events_to_geojson(df_events):
+    """Konversi DataFrame gempa menjadi satu FeatureCollection (styling dihitung dari array)"""
+    mag = df_events['magnitudo'].to_numpy(dtype=float)
+    coords = np.column_stack([
+        df_events['longitude'].to_numpy(dtype=float),
+        df_events['latitude'].to_numpy(dtype=float)
+    ]).tolist()
+
+    colors = magnitude_colors(mag).tolist()
+    radii = np.round(magnitude_radius(mag), 2).tolist()
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": coord},
+            "properties": {
+                "waktu": waktu,
+                "magnitudo": m,
+                "kedalaman": depth,
+                "lokasi": lokasi,
+                "color": color,
+                "radius": radius
+            }
+        }
+        for coord, waktu, m, depth, lokasi, color, radius in zip(
+            coords,
+            df_events['waktu_display'].tolist(),
+            mag.tolist(),
+            df_events['kedalaman_km'].tolist(),
+            df_events['lokasi'].tolist(),
+            colors,
+            radii
+        )
+    ]
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+def build_event_layer(df_events, name="Gempa"):
+    """Satu layer GeoJSON untuk semua gempa (pengganti CircleMarker per baris)"""
+    return folium.GeoJson(
+        events_to_geojson(df_events),
+        name=name,
+        marker=folium.CircleMarker(
+            radius=5,
+            fill=True,
+            fill_opacity=0.7,
+            weight=2
+        ),
+        on_each_feature=_EVENT_ON_EACH_FEATURE
+    )
+
+
+_CLUSTER_ON_EACH_FEATURE = JsCode("""
+function(feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.color, fillColor: p.color});
+    layer.setRadius(p.radius);
+    layer.bindTooltip(String(p.count), {permanent: true, direction: 'center', className: 'cluster-label'});
+    layer.bindPopup(
+        '<b>Cluster Gempa</b><br>' +
+        'Jumlah: <b>' + p.count + '</b> gempa<br>' +
+        'Magnitudo Max: <b>' + p.mag_max + '</b>',
+        {maxWidth: 250}
+    );
+}
+""")
+
+
+def clusters_to_geojson(clusters):
+    """FeatureCollection untuk cluster (count > 1) dengan jumlah & magnitudo maksimal"""
+    count = clusters['count'].to_numpy(dtype=np.int64)
+    mag_max = clusters['mag_max'].to_numpy(dtype=float)
+    coords = np.column_stack([
+        clusters['longitude'].to_numpy(dtype=float),
+        clusters['latitude'].to_numpy(dtype=float)
+    ]).tolist()
+
+    colors = magnitude_colors(mag_max).tolist()
+    radii = np.round(10 + 3 * np.log2(count), 2).tolist()
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": coord},
+            "properties": {"count": n, "mag_max": m, "color": color, "radius": radius}
+        }
+        for coord, n, m, color, radius in zip(
+            coords, count.tolist(), np.round(mag_max, 2).tolist(), colors, radii
+        )
+    ]
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+def build_cluster_layer(clusters, df_events, name="Gempa"):
+    """Layer cluster untuk zoom saat ini: bubble cluster + titik gempa tunggal
+
+    Args:
+        clusters: hasil core.clustering.get_visible_clusters
+        df_events: DataFrame sumber cluster (point_id = posisi baris)
+    """
+    group = folium.FeatureGroup(name=name)
+
+    is_point = clusters['point_id'].to_numpy() >= 0
+    df_points = df_events.iloc[clusters['point_id'].to_numpy()[is_point]]
+    df_clusters = clusters[~is_point]
+
+    if not df_clusters.empty:
+        folium.GeoJson(
+            clusters_to_geojson(df_clusters),
+            marker=folium.CircleMarker(radius=10, fill=True, fill_opacity=0.6, weight=2),
+            on_each_feature=_CLUSTER_ON_EACH_FEATURE
+        ).add_to(group)
+
+    if not df_points.empty:
+        build_event_layer(df_points).add_to(group)
+
+    return group
+
+
+# ===========================
+# LAYER SWARM / SEKUENS GEMPA
+# ===========================
+SWARM_COLORS = {"Swarm": "#6f42c1", "Sekuens Mainshock-Aftershock": "#dc3545"}
+
+_SWARM_ON_EACH_FEATURE = JsCode("""
+function(feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.color, fillColor: p.color});
+    layer.setRadius(p.radius_m);
+    layer.bindTooltip('Swarm #' + p.swarm_id + ' (' + p.count + ' gempa)');
+    layer.bindPopup(
+        '<b>' + p.jenis + ' #' + p.swarm_id + '</b><br>' +
+        'Lokasi: <b>' + p.lokasi + '</b><br>' +
+        'Jumlah: <b>' + p.count + '</b> gempa<br>' +
+        'Magnitudo Max: <b>' + p.mag_max + '</b><br>' +
+        'Mulai: ' + p.start + '<br>' +
+        'Durasi: ' + p.duration + ' jam<br>' +
+        'Radius: ' + p.radius_km + ' km',
+        {maxWidth: 280}
+    );
+}
+""")
+
+
+def swarms_to_geojson(swarms):
+    """FeatureCollection lingkaran swarm (pusat, radius sebaran, statistik) dari core.swarms.detect_swarms"""
+    coords = np.column_stack([
+        swarms['longitude'].to_numpy(dtype=float),
+        swarms['latitude'].to_numpy(dtype=float)
+    ]).tolist()
+    radius_km = swarms['radius_km'].to_numpy(dtype=float)
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": coord},
+            "properties": {
+                "swarm_id": swarm_id,
+                "jenis": jenis,
+                "lokasi": lokasi,
+                "count": count,
+                "mag_max": mag_max,
+                "start": start,
+                "duration": duration,
+                "radius_km": r_km,
+                "radius_m": r_m,
+                "color": SWARM_COLORS.get(jenis, "#6f42c1")
+            }
+        }
+        for coord, swarm_id, jenis, lokasi, count, mag_max, start, duration, r_km, r_m in zip(
+            coords,
+            swarms['swarm_id'].tolist(),
+            swarms['jenis'].tolist(),
+            swarms['lokasi_dominan'].tolist(),
+            swarms['count'].tolist(),
+            swarms['mag_max'].round(2).tolist(),
+            swarms['start'].dt.strftime("%Y-%m-%d %H:%M").tolist(),
+            swarms['duration_hours'].round(1).tolist(),
+            np.round(radius_km, 1).tolist(),
+            (np.maximum(radius_km, 5.0) * 1000).round().tolist()
+        )
+    ]
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+def build_swarm_layer(swarms, name="Swarm"):
+    """Layer lingkaran swarm/sekuens gempa (radius = sebaran gempa dari pusat swarm)"""
+    group = folium.FeatureGroup(name=name)
+    if not swarms.empty:
+        folium.GeoJson(
+            swarms_to_geojson(swarms),
+            marker=folium.Circle(radius=5000, fill=True, fill_opacity=0.15, weight=2, dash_array="6 4"),
+            on_each_feature=_SWARM_ON_EACH_FEATURE
+        ).add_to(group)
+    return group
+
+
+# ===========================
+# LAYER PRE-RENDER (UNTUK CACHE)
+# ===========================
+_PARENT_PLACEHOLDER = "__layer_parent__"
+
+
+class PrerenderedLayer(JSCSSMixin):
+    """Layer yang script Leaflet-nya sudah di-render sebelumnya
+
+    Script disimpan sebagai string dengan placeholder nama parent, sehingga
+    bisa dipasang ulang ke FeatureGroup mana pun tanpa membangun/serialisasi
+    ulang GeoJSON atau data heatmap.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this.script_for_parent() }}
+        {% endmacro %}
+    """)
+
+    def __init__(self, artifact):
+        super().__init__()
+        self._name = "PrerenderedLayer"
+        self.script, self.default_js, self.default_css = artifact
+
+    def script_for_parent(self):
+        return self.script.replace(_PARENT_PLACEHOLDER, self._parent.get_name())
+
+
+def prerender_layer(layer):
+    """Render script Leaflet sebuah layer sekali
+
+    Returns:
+        tuple (script, default_js, default_css) untuk PrerenderedLayer
+    """
+    placeholder_map = folium.Map(tiles=None)
+    holder = folium.FeatureGroup().add_to(placeholder_map)
+    layer.add_to(holder)
+    layer.render()
+
+    figure = placeholder_map.get_root()
+    script = figure.script.render().replace(holder.get_name(), _PARENT_PLACEHOLDER)
+
+    default_js, default_css = [], []
+    for element in _walk(layer):
+        if isinstance(element, JSCSSMixin):
+            default_js.extend(element.default_js)
+            default_css.extend(element.default_css)
+
+    return script, list(dict.fromkeys(default_js)), list(dict.fromkeys(default_css))
+
+
+def _walk(element):
+    yield element
+    for child in element._children.values():
+        yield from _walk(child)
+
+
+def artifact_size(artifact):
+    """Perkiraan ukuran artefak layer (byte) untuk batas memori cache"""
+    return len(artifact[0])
+
+
+def cached_layer(cache, key, build):
+    """Layer dari cache artefak (core.cache.LRUCache), dibangun dengan build() jika belum ada"""
+    artifact = cache.get_or_create(key, lambda: prerender_layer(build()), sizeof=artifact_size)
+    return PrerenderedLayer(artifact)
@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.declustering import gardner_knopoff_window, ROLE_MAINSHOCK
+from core.risk import event_keys
+from core.spatial_index import build_grid_index, query_radius
+
+# ===========================
+# PELURUHAN AFTERSHOCK (OMORI-UTSU, MLE)
+# ===========================
+# Laju aftershock n(t) = K / (t + c)^p, t = hari sejak mainshock. Aftershock
+# diambil dari jendela Gardner-Knopoff mainshock: kandidat jarak dari spatial
+# index, lalu disaring rentang waktunya (searchsorted pada katalog terurut).
+# K punya solusi tertutup (K = N / integral), sehingga log-likelihood profil
+# (c, p) dievaluasi sekaligus pada grid numpy lalu grid dipersempit di sekitar
+# maksimumnya beberapa kali.
+OMORI_MIN_MAG = 5.0
+OMORI_MIN_EVENTS = 10        # minimal aftershock agar fit dianggap stabil
+FORECAST_DAYS = 30
+
+# Grid awal (log10 c dalam hari, p) dan jumlah iterasi penyempitan grid
+C_LOG10_RANGE = (-4.0, 0.5)
+P_RANGE = (0.3, 2.5)
+GRID_SIZE = 41
+GRID_REFINEMENTS = 4
+
+PARALLEL_MIN_SEQUENCES = 16
+PARALLEL_MIN_EVENTS = 50_000    # di bawah ini overhead spawn process lebih mahal dari komputasinya
+
+OMORI_COLUMNS = [
+    "mainshock_id", "waktu", "magnitudo", "lokasi", "latitude", "longitude",
+    "window_km", "window_days", "elapsed_days", "n_aftershocks", "K", "c", "p",
+    "remaining", "next_forecast"
+]
+
+
+def omori_integral(c, p, t_start, t_end):
+    """Integral (t + c)^-p dari t_start sampai t_end (t_end boleh np.inf bila p > 1), mendukung broadcasting"""
+    c, p, t_end = (np.asarray(v, dtype=float) for v in (c, p, t_end))
+    q = 1 - p
+    near_one = np.abs(q) < 1e-9
+    safe_q = np.where(near_one, 1.0, q)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # (t + c)^q -> 0 untuk t tak hingga bila p > 1
+        end_power = np.where(np.isinf(t_end) & (q < 0), 0.0, (t_end + c) ** safe_q)
+        power = (end_power - (t_start + c) ** safe_q) / safe_q
+        log = np.log((t_end + c) / (t_start + c))
+    return np.where(near_one, log, power)
+
+
+def fit_omori(times, t_end, t_start=0.0, min_events=OMORI_MIN_EVENTS):
+    """Fit Omori-Utsu (K, c, p) dengan maximum likelihood
+
+    Args:
+        times: waktu aftershock (hari sejak mainshock) dalam (t_start, t_end]
+        t_end: akhir periode pengamatan (hari sejak mainshock)
+
+    Returns:
+        dict K, c, p, log_likelihood, n_events (NaN jika aftershock < min_events)
+    """
+    times = np.asarray(times, dtype=float)
+    n = len(times)
+    result = {'K': np.nan, 'c': np.nan, 'p': np.nan, 'log_likelihood': np.nan, 'n_events': n}
+    if n < min_events or t_end <= t_start:
+        return result
+
+    log_c = np.linspace(*C_LOG10_RANGE, GRID_SIZE)
+    p = np.linspace(*P_RANGE, GRID_SIZE)
+    for _ in range(GRID_REFINEMENTS):
+        c = 10 ** log_c
+        # log L(c, p) dengan K = N / integral: N log K - p sum log(t + c) - N
+        sum_log = np.log(times[None, :] + c[:, None]).sum(axis=1)
+        integral = omori_integral(c[:, None], p[None, :], t_start, t_end)
+        loglik = n * np.log(n / integral) - p[None, :] * sum_log[:, None] - n
+        best_c, best_p = np.unravel_index(np.nanargmax(loglik), loglik.shape)
+        result.update(c=float(c[best_c]), p=float(p[best_p]), log_likelihood=float(loglik[best_c, best_p]))
+
+        # Persempit grid ke dua langkah di sekitar maksimum
+        step_c, step_p = log_c[1] - log_c[0], p[1] - p[0]
+        log_c = np.linspace(log_c[best_c] - 2 * step_c, log_c[best_c] + 2 * step_c, GRID_SIZE)
+        p = np.linspace(max(p[best_p] - 2 * step_p, 0.0), p[best_p] + 2 * step_p, GRID_SIZE)
+
+    result['K'] = float(n / omori_integral(result['c'], result['p'], t_start, t_end))
+    return result
+
+
+def expected_aftershocks(fit, t_start, t_end):
+    """Ekspektasi jumlah aftershock antara t_start dan t_end (hari sejak mainshock)"""
+    if t_end <= t_start:
+        return 0.0
+    if np.isnan(fit['K']):
+        return np.nan
+    return float(fit['K'] * omori_integral(fit['c'], fit['p'], t_start, t_end))
+
+
+def _fit_batch(batch, min_events):
+    """Worker process pool: fit untuk sekumpulan (mainshock id, waktu aftershock, t_end)"""
+    return [(mainshock_id, fit_omori(times, t_end, min_events=min_events)) for mainshock_id, times, t_end in batch]
+
+
+def fit_sequences(sequences, min_events=OMORI_MIN_EVENTS, max_workers=None):
+    """Fit Omori-Utsu untuk banyak sekuens sekaligus
+
+    Sekuens dibagi ke beberapa batch dan dijalankan di process pool (spawn,
+    aman untuk server yang multi-thread) bila sekuens & aftershock-nya banyak.
+
+    Args:
+        sequences: dict {mainshock id: (waktu aftershock, t_end)}
+        max_workers: jumlah process; default os.cpu_count(), 1 = serial
+
+    Returns:
+        dict {mainshock id: dict hasil fit_omori}
+    """
+    tasks = [(mainshock_id, times, t_end) for mainshock_id, (times, t_end) in sequences.items()]
+    max_workers = max_workers or os.cpu_count() or 1
+    parallel = len(tasks) >= PARALLEL_MIN_SEQUENCES and sum(len(times) for _, times, _ in tasks) >= PARALLEL_MIN_EVENTS
+
+    if max_workers > 1 and parallel:
+        # Sekuens terbesar lebih dulu, dibagi round-robin agar beban worker seimbang
+        tasks.sort(key=lambda task: -len(task[1]))
+        batches = [tasks[i::max_workers] for i in range(max_workers)]
+        with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            done = pool.map(_fit_batch, batches, [min_events] * len(batches))
+            return dict(item for batch in done for item in batch)
+    return dict(_fit_batch(tasks, min_events))
+
+
+def aftershock_sequences(df_events, mainshocks):
+    """Waktu aftershock setiap mainshock dari jendela Gardner-Knopoff
+
+    Args:
+        mainshocks: mask baris df_events yang menjadi mainshock
+
+    Returns:
+        DataFrame info mainshock (index = mainshock id) dan dict
+        {mainshock id: (waktu aftershock dalam hari, t_end)}
+    """
+    waktu = pd.to_datetime(df_events['waktu'], utc=True)
+    days = ((waktu - waktu.min()) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+    order = np.argsort(days, kind='stable')
+    days_sorted = days[order]
+    lat = df_events['latitude'].to_numpy(dtype=float)
+    lon = df_events['longitude'].to_numpy(dtype=float)
+    index = build_grid_index(lat, lon)
+
+    # Posisi setiap baris di katalog terurut waktu (untuk memotong rentang waktu)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    rows = np.flatnonzero(mainshocks)
+    mag = df_events['magnitudo'].to_numpy(dtype=float)[rows]
+    window_km, window_days = gardner_knopoff_window(mag)
+    catalog_end = days_sorted[-1]
+
+    info = pd.DataFrame({
+        'waktu': waktu.to_numpy()[rows],
+        'magnitudo': mag,
+        'lokasi': df_events['lokasi'].to_numpy()[rows],
+        'latitude': lat[rows],
+        'longitude': lon[rows],
+        'window_km': window_km,
+        'window_days': window_days,
+        'elapsed_days': catalog_end - days[rows]
+    }, index=event_keys(df_events).take(rows))
+    info.index.name = 'mainshock_id'
+
+    sequences = {}
+    for mainshock_id, row, radius_km, span in zip(info.index, rows, window_km, window_days):
+        hi = np.searchsorted(days_sorted, days[row] + span, side='right')
+        candidates, _ = query_radius(index, lat[row], lon[row], radius_km)
+        candidates = candidates[(rank[candidates] > rank[row]) & (rank[candidates] < hi)]
+        times = np.sort(days[candidates] - days[row])
+        sequences[mainshock_id] = (times, min(span, catalog_end - days[row]))
+    return info, sequences
+
+
+class OmoriModel:
+    """Fit Omori-Utsu per mainshock yang disinkronkan dengan katalog
+
+    Fit di-cache per mainshock id; saat katalog berubah hanya mainshock yang
+    sekuens aftershock-nya berubah (aftershock baru atau pengamatan masih
+    berjalan) yang di-fit ulang, sekaligus di process pool.
+    """
+
+    def __init__(self, min_mag=OMORI_MIN_MAG, min_events=OMORI_MIN_EVENTS, max_workers=None):
+        self.min_mag = min_mag
+        self.min_events = min_events
+        self.max_workers = max_workers
+        self.fits = {}
+        self.signatures = {}
+        self.sequences = {}
+        self.last_refit = 0
+        self._table = pd.DataFrame(columns=OMORI_COLUMNS).set_index('mainshock_id')
+        self._lock = threading.Lock()
+
+    def sync(self, df_events, labels):
+        """Update fit dengan katalog terbaru, return tabel OMORI_COLUMNS (index = mainshock id)
+
+        Args:
+            labels: hasil core.declustering.decluster untuk df_events (katalog penuh)
+        """
+        with self._lock:
+            if df_events is None or df_events.empty:
+                return self._table
+
+            mainshocks = (labels['role'] == ROLE_MAINSHOCK).to_numpy() & (df_events['magnitudo'].to_numpy(dtype=float) >= self.min_mag)
+            info, sequences = aftershock_sequences(df_events, mainshocks)
+
+            signatures = {mainshock_id: (len(times), float(times.sum()), t_end) for mainshock_id, (times, t_end) in sequences.items()}
+            changed = {mainshock_id: sequences[mainshock_id] for mainshock_id in sequences if self.signatures.get(mainshock_id) != signatures[mainshock_id]}
+            self.last_refit = len(changed)
+
+            # Hanya sekuens yang berubah yang di-fit ulang
+            refit = fit_sequences(changed, self.min_events, self.max_workers) if changed else {}
+            self.fits = {mainshock_id: refit.get(mainshock_id, self.fits.get(mainshock_id)) for mainshock_id in sequences}
+            self.signatures, self.sequences = signatures, sequences
+
+            # Info mainshock, elapsed_days & forecast selalu dihitung ulang: waktu
+            # pengamatan terus berjalan walau fit-nya tidak berubah
+            fits = pd.DataFrame.from_dict(self.fits, orient='index', columns=['K', 'c', 'p'])
+            table = info.join(fits)
+            table['n_aftershocks'] = [len(sequences[mainshock_id][0]) for mainshock_id in table.index]
+            elapsed = table['elapsed_days'].to_numpy()
+            table['remaining'] = [
+                expected_aftershocks(self.fits[mainshock_id], t_now, t_window)
+                for mainshock_id, t_now, t_window in zip(table.index, elapsed, table['window_days'])
+            ]
+            table['next_forecast'] = [
+                expected_aftershocks(self.fits[mainshock_id], t_now, t_now + FORECAST_DAYS)
+                for mainshock_id, t_now in zip(table.index, elapsed)
+            ]
+            self._table = table.sort_values(['magnitudo', 'waktu'], ascending=[False, False])[OMORI_COLUMNS[1:]]
+
+            return self._table
+
+    def sequence(self, mainshock_id):
+        """(waktu aftershock, t_end) satu mainshock dari sync terakhir"""
+        return self.sequences.get(mainshock_id)
+
+    def fit(self, mainshock_id):
+        """Hasil fit_omori satu mainshock dari sync terakhir"""
+        return self.fits.get(mainshock_id)
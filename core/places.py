@@ -0,0 +1,31 @@
+# ===========================
+# TITIK REFERENSI (KOTA)
+# ===========================
+# Koordinat pusat kota (lat, lon) untuk pencarian radius / gempa terdekat
+REFERENCE_CITIES = {
+    "Banda Aceh": (5.5483, 95.3238),
+    "Medan": (3.5952, 98.6722),
+    "Padang": (-0.9471, 100.4172),
+    "Bengkulu": (-3.8004, 102.2655),
+    "Palembang": (-2.9761, 104.7754),
+    "Bandar Lampung": (-5.4292, 105.2610),
+    "Jakarta": (-6.2088, 106.8456),
+    "Bandung": (-6.9175, 107.6191),
+    "Semarang": (-6.9667, 110.4167),
+    "Yogyakarta": (-7.7956, 110.3695),
+    "Surabaya": (-7.2575, 112.7521),
+    "Denpasar": (-8.6500, 115.2167),
+    "Mataram": (-8.5833, 116.1167),
+    "Kupang": (-10.1772, 123.6070),
+    "Pontianak": (-0.0263, 109.3425),
+    "Balikpapan": (-1.2379, 116.8529),
+    "Makassar": (-5.1477, 119.4327),
+    "Palu": (-0.8917, 119.8707),
+    "Kendari": (-3.9985, 122.5129),
+    "Gorontalo": (0.5435, 123.0568),
+    "Manado": (1.4748, 124.8421),
+    "Ternate": (0.7833, 127.3667),
+    "Ambon": (-3.6954, 128.1814),
+    "Sorong": (-0.8762, 131.2558),
+    "Jayapura": (-2.5337, 140.7181),
+}
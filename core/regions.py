@@ -0,0 +1,85 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ===========================
+# BATAS PROVINSI (OFFLINE)
+# ===========================
+# Poligon provinsi yang disederhanakan (termasuk perairan di sekitarnya),
+# sehingga gempa di laut tetap masuk ke provinsi terdekat. Poligon dicek
+# berurutan; provinsi kecil (DKI, DIY) ditaruh di awal file agar menang
+# pada daerah yang tumpang tindih.
+PROVINCE_GEOJSON = Path(__file__).resolve().parent.parent / "data" / "provinsi_indonesia.geojson"
+OUTSIDE_PROVINCE = "Luar Wilayah Indonesia"
+
+
+@lru_cache(maxsize=4)
+def load_province_polygons(path=PROVINCE_GEOJSON):
+    """Baca poligon provinsi dari GeoJSON
+
+    Returns:
+        list of (nama_provinsi, [ring (N x 2 array lon/lat)], bbox (west, south, east, north))
+    """
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+
+    polygons = []
+    for feature in features:
+        geometry = feature["geometry"]
+        parts = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        rings = [np.asarray(part[0], dtype=float) for part in parts]
+
+        points = np.vstack(rings)
+        bbox = (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+        polygons.append((feature["properties"]["provinsi"], rings, bbox))
+
+    return polygons
+
+
+def points_in_ring(lat, lon, ring):
+    """Ray casting tervektorisasi: True untuk titik di dalam ring (lon/lat)"""
+    inside = np.zeros(len(lat), dtype=bool)
+    x0, y0 = ring[-1]
+    for x1, y1 in ring:
+        crosses = (y1 > lat) != (y0 > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (x0 - x1) * (lat - y1) / (y0 - y1) + x1
+        inside ^= crosses & (lon < x_cross)
+        x0, y0 = x1, y1
+    return inside
+
+
+def assign_provinces(lat, lon, polygons=None):
+    """Provinsi untuk setiap titik (kolom categorical)
+
+    Titik pertama kali disaring dengan bounding box setiap provinsi, baru
+    kandidatnya dicek dengan point-in-polygon. Titik di luar semua poligon
+    diberi label OUTSIDE_PROVINCE.
+    """
+    polygons = load_province_polygons() if polygons is None else polygons
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+
+    names = [name for name, _, _ in polygons]
+    codes = np.full(len(lat), len(names), dtype=np.int64)
+    unassigned = np.isfinite(lat) & np.isfinite(lon)
+
+    for code, (_, rings, (west, south, east, north)) in enumerate(polygons):
+        candidates = np.flatnonzero(
+            unassigned & (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        )
+        if not len(candidates):
+            continue
+
+        inside = np.zeros(len(candidates), dtype=bool)
+        for ring in rings:
+            inside |= points_in_ring(lat[candidates], lon[candidates], ring)
+
+        codes[candidates[inside]] = code
+        unassigned[candidates[inside]] = False
+
+    categories = names + [OUTSIDE_PROVINCE]
+    return pd.Categorical.from_codes(codes, categories=categories)
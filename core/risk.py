@@ -0,0 +1,608 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ===========================
+# RISK SCORING (VEKTOR, GROUPBY)
+# ===========================
+RISK_THRESHOLDS = [8, 6, 4, 2]
+RISK_LEVELS = ["🔴 VERY HIGH", "🟠 HIGH", "🟡 MEDIUM", "🟢 LOW"]
+RISK_COLORS = ["very-high", "high", "medium", "low"]
+RISK_DEFAULT = ("🔵 VERY LOW", "very-low")
+
+# Input skor per lokasi (sudah dihaluskan / dibobot waktu bila modenya begitu),
+# disimpan di tabel agar ganti model risk cukup membobot ulang kolom ini
+SCORE_INPUT_COLUMNS = ['score_total', 'score_mag_mean', 'score_high_mag']
+
+RISK_COLUMNS = [
+    'lokasi', 'total_gempa', 'excel_count', 'bmkg_count', 'mag_mean', 'mag_max',
+    'high_mag_count', 'kedalaman_mean', 'kedalaman_min', 'risk_score', 'risk_level',
+    'risk_color', 'lat_mean', 'lon_mean', *SCORE_INPUT_COLUMNS
+]
+
+# ===========================
+# MODEL RISK (BOBOT, BATAS, THRESHOLD)
+# ===========================
+# Skor = w_frekuensi * min(jumlah / frequency_per_point, component_cap)
+#      + w_intensitas * magnitudo rata-rata
+#      + w_m5 * min(jumlah M>=5 / high_mag_per_point, component_cap)
+# dibatasi score_cap; thresholds = batas bawah VERY HIGH, HIGH, MEDIUM, LOW.
+DEFAULT_RISK_MODEL = {
+    'weights': {'frequency': 0.35, 'intensity': 0.4, 'high_mag': 0.25},
+    'frequency_per_point': 100,
+    'high_mag_per_point': 10,
+    'component_cap': 10,
+    'score_cap': 10,
+    'thresholds': RISK_THRESHOLDS
+}
+
+RISK_MODELS = {
+    "Standar": DEFAULT_RISK_MODEL,
+    "Frekuensi Tinggi": {
+        **DEFAULT_RISK_MODEL,
+        'weights': {'frequency': 0.6, 'intensity': 0.25, 'high_mag': 0.15},
+        'frequency_per_point': 50
+    },
+    "Gempa Merusak": {
+        **DEFAULT_RISK_MODEL,
+        'weights': {'frequency': 0.15, 'intensity': 0.4, 'high_mag': 0.45},
+        'high_mag_per_point': 5
+    },
+}
+
+
+def risk_model_key(model):
+    """Key hashable dari spesifikasi model (untuk cache)"""
+    model = model or DEFAULT_RISK_MODEL
+    return (
+        tuple(sorted(model['weights'].items())),
+        model['frequency_per_point'], model['high_mag_per_point'],
+        model['component_cap'], model['score_cap'], tuple(model['thresholds'])
+    )
+
+
+def classify_risk(risk_score, thresholds=RISK_THRESHOLDS):
+    """Kategori risiko (label, kelas CSS) dari risk score 0-10"""
+    risk_score = np.asarray(risk_score, dtype=float)
+    conditions = [risk_score >= threshold for threshold in sorted(thresholds, reverse=True)]
+    risk_level = np.select(conditions, RISK_LEVELS, default=RISK_DEFAULT[0])
+    risk_color = np.select(conditions, RISK_COLORS, default=RISK_DEFAULT[1])
+    return risk_level, risk_color
+
+
+def score_from_stats(total_gempa, mag_mean, high_mag_count, model=None):
+    """Risk score dari jumlah gempa, magnitudo rata-rata & jumlah gempa M>=5
+
+    Default (DEFAULT_RISK_MODEL): frekuensi (35%) + magnitudo rata-rata (40%)
+    + jumlah gempa M>=5 (25%), dibatasi maksimal 10.
+    """
+    model = model or DEFAULT_RISK_MODEL
+    weights, cap = model['weights'], model['component_cap']
+
+    frequency_score = np.minimum(np.asarray(total_gempa, dtype=float) / model['frequency_per_point'], cap)
+    intensity_score = np.nan_to_num(np.asarray(mag_mean, dtype=float))
+    high_mag_score = np.minimum(np.asarray(high_mag_count, dtype=float) / model['high_mag_per_point'], cap)
+
+    risk_score = (
+        (frequency_score * weights['frequency']) +
+        (intensity_score * weights['intensity']) +
+        (high_mag_score * weights['high_mag'])
+    )
+    return np.minimum(risk_score, model['score_cap'])
+
+
+def apply_risk_model(risk_df, model=None):
+    """Skor, kategori & ranking ulang dari kolom input skor (tanpa scan gempa)"""
+    if risk_df.empty:
+        return risk_df
+
+    model = model or DEFAULT_RISK_MODEL
+    risk_df = risk_df.copy()
+    risk_df['risk_score'] = score_from_stats(*(risk_df[col] for col in SCORE_INPUT_COLUMNS), model)
+    risk_df['risk_level'], risk_df['risk_color'] = classify_risk(risk_df['risk_score'], model['thresholds'])
+
+    risk_df = risk_df[RISK_COLUMNS].sort_values('risk_score', ascending=False).reset_index(drop=True)
+    risk_df['rank'] = range(1, len(risk_df) + 1)
+
+    return risk_df
+
+
+def rank_locations(risk_df, score_inputs=None, model=None):
+    """Hitung risk score & kategori dari statistik per lokasi, lalu urutkan
+
+    Args:
+        score_inputs: opsional, (jumlah, magnitudo rata-rata, jumlah M>=5) untuk
+                      skor (mis. statistik yang dihaluskan); default dari
+                      kolom risk_df sendiri
+    """
+    if score_inputs is None:
+        score_inputs = (risk_df['total_gempa'], risk_df['mag_mean'], risk_df['high_mag_count'])
+
+    for col, values in zip(SCORE_INPUT_COLUMNS, score_inputs):
+        risk_df[col] = np.asarray(values, dtype=float)
+
+    return apply_risk_model(risk_df, model)
+
+
+def compute_risk_scores(df_data):
+    """Risk score per lokasi dalam satu pass groupby
+
+    Urutan lokasi sebelum diurutkan berdasarkan skor mengikuti kemunculan
+    pertama di df_data (sort=False).
+    """
+    if df_data.empty:
+        return pd.DataFrame()
+
+    events = pd.DataFrame({
+        'lokasi': df_data['lokasi'],
+        'magnitudo': df_data['magnitudo'],
+        'high_mag': df_data['magnitudo'] >= 5,
+        'kedalaman_km': df_data['kedalaman_km'],
+        'excel': df_data['source'] == 'Excel (Historical)',
+        'bmkg': df_data['source'] == 'BMKG Real-time',
+        'latitude': df_data['latitude'],
+        'longitude': df_data['longitude']
+    })
+
+    risk_df = events.groupby('lokasi', sort=False).agg(
+        total_gempa=('magnitudo', 'size'),
+        excel_count=('excel', 'sum'),
+        bmkg_count=('bmkg', 'sum'),
+        mag_mean=('magnitudo', 'mean'),
+        mag_max=('magnitudo', 'max'),
+        high_mag_count=('high_mag', 'sum'),
+        kedalaman_mean=('kedalaman_km', 'mean'),
+        kedalaman_min=('kedalaman_km', 'min'),
+        lat_mean=('latitude', 'mean'),
+        lon_mean=('longitude', 'mean')
+    ).reset_index()
+
+    return rank_locations(risk_df)
+
+
+# ===========================
+# AGREGAT BERJALAN (INKREMENTAL)
+# ===========================
+AGGREGATE_COLUMNS = [
+    'total_gempa', 'excel_count', 'bmkg_count', 'mag_sum', 'mag_count', 'mag_max',
+    'high_mag_count', 'depth_sum', 'depth_count', 'depth_min', 'lat_sum', 'lon_sum'
+]
+SUM_COLUMNS = [
+    'total_gempa', 'excel_count', 'bmkg_count', 'mag_sum', 'mag_count',
+    'high_mag_count', 'depth_sum', 'depth_count', 'lat_sum', 'lon_sum'
+]
+EVENT_KEY_COLUMNS = ['waktu', 'latitude', 'longitude', 'magnitudo', 'lokasi', 'source']
+STATIC_SOURCE = 'Excel (Historical)'
+
+
+def aggregate_events(df_events):
+    """Agregat per lokasi (jumlah, sum, max/min) yang bisa digabung antar batch"""
+    codes, lokasi = pd.factorize(df_events['lokasi'], use_na_sentinel=False)
+    n_lokasi = len(lokasi)
+
+    mag = df_events['magnitudo'].to_numpy(dtype=float)
+    depth = df_events['kedalaman_km'].to_numpy(dtype=float)
+    source = df_events['source']
+
+    def count(mask):
+        return np.bincount(codes[np.asarray(mask)], minlength=n_lokasi)
+
+    def total(values):
+        return np.bincount(codes, weights=np.nan_to_num(values), minlength=n_lokasi)
+
+    aggregates = pd.DataFrame({
+        'total_gempa': np.bincount(codes, minlength=n_lokasi),
+        'excel_count': count(source == 'Excel (Historical)'),
+        'bmkg_count': count(source == 'BMKG Real-time'),
+        'mag_sum': total(mag),
+        'mag_count': count(~np.isnan(mag)),
+        'mag_max': df_events['magnitudo'].groupby(codes).max().to_numpy(),
+        'high_mag_count': count(mag >= 5),
+        'depth_sum': total(depth),
+        'depth_count': count(~np.isnan(depth)),
+        'depth_min': df_events['kedalaman_km'].groupby(codes).min().to_numpy(),
+        'lat_sum': total(df_events['latitude'].to_numpy(dtype=float)),
+        'lon_sum': total(df_events['longitude'].to_numpy(dtype=float))
+    }, index=pd.Index(lokasi, name='lokasi'))
+
+    return aggregates
+
+
+def merge_aggregates(aggregates, batch):
+    """Gabungkan agregat batch baru; hanya lokasi yang ada di batch yang berubah"""
+    if aggregates.empty:
+        return batch.copy()
+
+    positions = aggregates.index.get_indexer(batch.index)
+    existing = positions >= 0
+    rows = positions[existing]
+
+    merged = aggregates.copy()
+    if len(rows):
+        for col, combine in [*((col, np.add) for col in SUM_COLUMNS), ('mag_max', np.fmax), ('depth_min', np.fmin)]:
+            update = batch[col].to_numpy()[existing]
+            values = merged[col].to_numpy()
+            values = values.astype(np.result_type(values, update))
+            values[rows] = combine(values[rows], update)
+            merged[col] = values
+
+    if not existing.all():
+        merged = pd.concat([merged, batch[~existing]])
+
+    return merged
+
+
+def scores_from_aggregates(aggregates):
+    """Risk score per lokasi dari agregat berjalan (kolom sama dengan compute_risk_scores)"""
+    if aggregates.empty:
+        return pd.DataFrame()
+
+    risk_df = pd.DataFrame({
+        'lokasi': aggregates.index,
+        'total_gempa': aggregates['total_gempa'].to_numpy(),
+        'excel_count': aggregates['excel_count'].to_numpy(),
+        'bmkg_count': aggregates['bmkg_count'].to_numpy(),
+        'mag_mean': (aggregates['mag_sum'] / aggregates['mag_count'].replace(0, np.nan)).to_numpy(),
+        'mag_max': aggregates['mag_max'].to_numpy(),
+        'high_mag_count': aggregates['high_mag_count'].to_numpy(),
+        'kedalaman_mean': (aggregates['depth_sum'] / aggregates['depth_count'].replace(0, np.nan)).to_numpy(),
+        'kedalaman_min': aggregates['depth_min'].to_numpy(),
+        'lat_mean': (aggregates['lat_sum'] / aggregates['total_gempa']).to_numpy(),
+        'lon_mean': (aggregates['lon_sum'] / aggregates['total_gempa']).to_numpy()
+    })
+
+    return rank_locations(risk_df)
+
+
+def event_keys(df_events):
+    """Hash per gempa; kejadian identik diberi nomor urut agar tetap terhitung semua"""
+    hashed = pd.util.hash_pandas_object(df_events[EVENT_KEY_COLUMNS], index=False).to_numpy()
+    occurrence = pd.Series(hashed).groupby(hashed).cumcount().to_numpy(dtype=np.uint64)
+    return pd.Index(hashed + occurrence * np.uint64(0x9E3779B97F4A7C15))
+
+
+class RiskAggregates:
+    """Agregat risk per lokasi yang disinkronkan secara inkremental dengan katalog
+
+    Data Excel (historis) diagregasi sekali. Untuk data real-time, setiap
+    sync() hanya memproses gempa yang baru masuk dan yang sudah keluar dari
+    snapshot BMKG, lalu menghitung ulang skor & ranking dari agregat.
+    """
+
+    def __init__(self):
+        self.aggregates = pd.DataFrame(columns=AGGREGATE_COLUMNS)
+        self.static_version = None
+        self.keys = pd.Index([], dtype=np.uint64)
+        self.last_added = 0
+        self.last_removed = 0
+        self._lokasi = pd.Series(dtype=object)
+        self._scores = pd.DataFrame()
+        self._lock = threading.Lock()
+
+    def sync(self, df_events, static_version):
+        """Update agregat dengan isi katalog terbaru, return tabel risk score
+
+        Args:
+            static_version: versi data historis dari loader (mis. core.catalog.files_version
+                file Excel); data historis hanya diagregasi ulang jika versinya berubah
+        """
+        with self._lock:
+            is_static = (df_events['source'] == STATIC_SOURCE).to_numpy()
+            rebuilt = static_version != self.static_version
+            if rebuilt:
+                # Data historis berubah (mis. file Excel baru): bangun ulang dari awal
+                self.aggregates = aggregate_events(df_events[is_static])
+                self.static_version = static_version
+                self.keys = pd.Index([], dtype=np.uint64)
+                self._lokasi = pd.Series(dtype=object)
+
+            df_live = df_events[~is_static]
+            keys = event_keys(df_live)
+            is_new = ~keys.isin(self.keys)
+            removed = self.keys.difference(keys)
+
+            self.last_added, self.last_removed = int(is_new.sum()), len(removed)
+            if not (rebuilt or self.last_added or self.last_removed):
+                return self._scores
+
+            aggregates = self.aggregates
+            if self.last_removed:
+                aggregates = self._remove(aggregates, removed, df_events, is_static, keys)
+            if self.last_added:
+                aggregates = merge_aggregates(aggregates, aggregate_events(df_live[is_new]))
+
+            self.aggregates = aggregates
+            self.keys = keys
+            self._lokasi = pd.Series(df_live['lokasi'].to_numpy(), index=keys)
+            self._scores = scores_from_aggregates(aggregates)
+            return self._scores
+
+    def _remove(self, aggregates, removed, df_events, is_static, keys):
+        """Keluarkan gempa real-time yang sudah tidak ada di snapshot
+
+        Lokasi terdampak dihitung ulang dari baris yang masih ada (data historis
+        + real-time lama), karena max/min tidak bisa dikurangi secara inkremental.
+        """
+        affected = pd.Index(self._lokasi.loc[removed].unique())
+
+        kept = is_static.copy()
+        kept[~is_static] = keys.isin(self.keys)
+        kept &= df_events['lokasi'].isin(affected).to_numpy()
+
+        aggregates = aggregates.drop(index=affected)
+        return merge_aggregates(aggregates, aggregate_events(df_events[kept]))
+
+
+# ===========================
+# RISK PER SEL GRID (SMOOTHING TETANGGA)
+# ===========================
+GRID_RISK_RESOLUTIONS = (0.25, 0.5, 1.0)
+
+# Kernel binomial 3x3: sel sendiri bobot 1, tetangga sisi 0.5, tetangga sudut 0.25
+GRID_SMOOTHING_KERNEL = np.outer([0.5, 1.0, 0.5], [0.5, 1.0, 0.5])
+
+
+def smooth_grid(values, kernel=GRID_SMOOTHING_KERNEL):
+    """Konvolusi 2D array grid dengan kernel kecil (jumlah array yang digeser, tanpa scipy)"""
+    k_rows, k_cols = kernel.shape
+    pad_rows, pad_cols = k_rows // 2, k_cols // 2
+    padded = np.pad(values, ((pad_rows, pad_rows), (pad_cols, pad_cols)))
+
+    n_rows, n_cols = values.shape
+    smoothed = np.zeros(values.shape, dtype=float)
+    for i in range(k_rows):
+        for j in range(k_cols):
+            if kernel[i, j]:
+                smoothed += kernel[i, j] * padded[i:i + n_rows, j:j + n_cols]
+
+    return smoothed
+
+
+def compute_grid_risk_scores(df_data, cell_deg=0.5, kernel=GRID_SMOOTHING_KERNEL):
+    """Risk score per sel grid cell_deg x cell_deg derajat
+
+    Statistik frekuensi, magnitudo & gempa M>=5 setiap sel dihaluskan dengan
+    sel tetangganya (konvolusi kernel) sebelum diberi skor, sehingga zona aktif
+    yang terpotong batas sel tidak kehilangan bobot. Kolom tabel lain (jumlah,
+    kedalaman, sumber) tetap nilai mentah sel.
+
+    Returns:
+        (risk_df, event_cells)
+        risk_df     - kolom sama dengan compute_risk_scores, 'lokasi' = label sel
+        event_cells - label sel untuk setiap baris df_data (None jika koordinat tidak valid)
+    """
+    event_cells = np.full(len(df_data), None, dtype=object)
+
+    lat = df_data['latitude'].to_numpy(dtype=float)
+    lon = df_data['longitude'].to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+
+    if not valid.any():
+        return pd.DataFrame(), event_cells
+
+    lat, lon = lat[valid], lon[valid]
+    mag = df_data['magnitudo'].to_numpy(dtype=float)[valid]
+    depth = df_data['kedalaman_km'].to_numpy(dtype=float)[valid]
+    source = df_data['source'].to_numpy()[valid]
+    lokasi = df_data['lokasi'].to_numpy()[valid]
+
+    # Grid padat hanya seluas bounding box data
+    rows = np.floor(lat / cell_deg).astype(np.int64)
+    cols = np.floor(lon / cell_deg).astype(np.int64)
+    row0, col0 = rows.min(), cols.min()
+    rows, cols = rows - row0, cols - col0
+    shape = (rows.max() + 1, cols.max() + 1)
+    flat = rows * shape[1] + cols
+    n_flat = shape[0] * shape[1]
+
+    def dense(weights=None):
+        return np.bincount(flat, weights=weights, minlength=n_flat).reshape(shape)
+
+    mag_valid = ~np.isnan(mag)
+    count = dense()
+    smooth_count = smooth_grid(count, kernel)
+    smooth_mag_sum = smooth_grid(dense(np.nan_to_num(mag)), kernel)
+    smooth_mag_count = smooth_grid(dense(mag_valid.astype(float)), kernel)
+    smooth_high_mag = smooth_grid(dense((mag >= 5).astype(float)), kernel)
+
+    # Sel yang berisi gempa saja yang masuk tabel
+    cells, inverse = np.unique(flat, return_inverse=True)
+    n_cells = len(cells)
+
+    def per_cell(values):
+        return values.ravel()[cells]
+
+    def cell_sum(weights=None):
+        return np.bincount(inverse, weights=weights, minlength=n_cells)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        smooth_mag_mean = per_cell(smooth_mag_sum) / per_cell(smooth_mag_count)
+        mag_mean = cell_sum(np.nan_to_num(mag)) / cell_sum(mag_valid.astype(float))
+        depth_valid = ~np.isnan(depth)
+        kedalaman_mean = cell_sum(np.nan_to_num(depth)) / cell_sum(depth_valid.astype(float))
+
+    mag_max = np.full(n_cells, -np.inf)
+    np.maximum.at(mag_max, inverse, np.nan_to_num(mag, nan=-np.inf))
+    depth_min = np.full(n_cells, np.inf)
+    np.minimum.at(depth_min, inverse, np.nan_to_num(depth, nan=np.inf))
+
+    # Label sel: koordinat pusat + lokasi (label BMKG) yang paling sering muncul
+    lokasi_codes, lokasi_labels = pd.factorize(lokasi, use_na_sentinel=False)
+    n_labels = len(lokasi_labels)
+    pairs, pair_count = np.unique(inverse * n_labels + lokasi_codes, return_counts=True)
+    pairs = pairs[np.lexsort((-pair_count, pairs // n_labels))]
+    first = np.r_[True, pairs[1:] // n_labels != pairs[:-1] // n_labels]
+    dominant = np.asarray(lokasi_labels, dtype=object)[pairs[first] % n_labels]
+
+    center_lat = ((cells // shape[1] + row0) + 0.5) * cell_deg
+    center_lon = ((cells % shape[1] + col0) + 0.5) * cell_deg
+    labels = np.array([
+        f"Sel {clat:.2f}°, {clon:.2f}° · {label}"
+        for clat, clon, label in zip(center_lat, center_lon, dominant)
+    ], dtype=object)
+
+    total_gempa = np.bincount(inverse, minlength=n_cells)
+    risk_df = pd.DataFrame({
+        'lokasi': labels,
+        'total_gempa': total_gempa,
+        'excel_count': cell_sum((source == 'Excel (Historical)').astype(float)).astype(np.int64),
+        'bmkg_count': cell_sum((source == 'BMKG Real-time').astype(float)).astype(np.int64),
+        'mag_mean': mag_mean,
+        'mag_max': np.where(np.isinf(mag_max), np.nan, mag_max),
+        'high_mag_count': cell_sum((mag >= 5).astype(float)).astype(np.int64),
+        'kedalaman_mean': kedalaman_mean,
+        'kedalaman_min': np.where(np.isinf(depth_min), np.nan, depth_min),
+        'lat_mean': cell_sum(lat) / total_gempa,
+        'lon_mean': cell_sum(lon) / total_gempa
+    })
+
+    score_inputs = (per_cell(smooth_count), smooth_mag_mean, per_cell(smooth_high_mag))
+    event_cells[valid] = labels[inverse]
+
+    return rank_locations(risk_df, score_inputs), event_cells
+
+
+# ===========================
+# RISK TERBOBOT WAKTU (DECAY & JENDELA BERGULIR)
+# ===========================
+DECAY_HALF_LIFE_DAYS = 30
+ROLLING_WINDOWS_DAYS = (7, 30, 90)
+
+
+def build_time_profile(df_data, units=None):
+    """Profil waktu per unit skor untuk skor terbobot waktu
+
+    Gempa diurutkan sekali berdasarkan (unit, umur) lalu statistiknya
+    dijumlahkan kumulatif, sehingga statistik jendela berapa pun cukup diambil
+    dengan selisih dua posisi cumsum per unit. Umur dihitung dalam hari dari
+    gempa terbaru di katalog.
+
+    Args:
+        units: opsional, unit skor setiap gempa (default kolom 'lokasi')
+    """
+    units = df_data['lokasi'].to_numpy() if units is None else np.asarray(units, dtype=object)
+    waktu = pd.to_datetime(df_data['waktu'], errors='coerce')
+    t_ref = waktu.max()
+    age = ((t_ref - waktu) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+    valid = ~np.isnan(age) & ~pd.isna(units)
+
+    codes, labels = pd.factorize(units[valid])
+    n_units = len(labels)
+    age = age[valid]
+
+    mag = df_data['magnitudo'].to_numpy(dtype=float)[valid]
+    lat = df_data['latitude'].to_numpy(dtype=float)[valid]
+    lon = df_data['longitude'].to_numpy(dtype=float)[valid]
+    order = np.lexsort((age, codes))
+    codes, age, mag = codes[order], age[order], mag[order]
+    start = np.r_[0, np.cumsum(np.bincount(codes, minlength=n_units))][:-1]
+
+    def cumulative(values):
+        return np.r_[0.0, np.cumsum(values)]
+
+    span = float(age.max()) if len(age) else 0.0
+    return {
+        'labels': pd.Index(labels),
+        't_ref': t_ref,
+        'span_days': max(span, 1.0),
+        'scale': span + 1.0,
+        'codes': codes,
+        'age': age,
+        'key': codes * (span + 1.0) + age,
+        'start': start,
+        # Koordinat satu gempa per unit (untuk mode grid: menentukan sel unit)
+        'lat': lat[order][start],
+        'lon': lon[order][start],
+        'mag': np.nan_to_num(mag),
+        'mag_valid': (~np.isnan(mag)).astype(float),
+        'high_mag': (mag >= 5).astype(float),
+        'cum_mag': cumulative(np.nan_to_num(mag)),
+        'cum_mag_valid': cumulative(~np.isnan(mag)),
+        'cum_high_mag': cumulative(mag >= 5)
+    }
+
+
+def window_stats(profile, window_days):
+    """Statistik per unit untuk gempa dalam window_days hari terakhir (selisih cumsum)"""
+    n_units = len(profile['labels'])
+    window = min(float(window_days), profile['span_days'])
+    units = np.arange(n_units)
+
+    start = profile['start']
+    cut = np.searchsorted(profile['key'], units * profile['scale'] + window, side='right')
+
+    total = (cut - start).astype(float)
+    mag_sum = profile['cum_mag'][cut] - profile['cum_mag'][start]
+    mag_count = profile['cum_mag_valid'][cut] - profile['cum_mag_valid'][start]
+    high_mag = profile['cum_high_mag'][cut] - profile['cum_high_mag'][start]
+
+    # Normalisasi ke rentang katalog agar skala skor sebanding dengan mode "semua data"
+    factor = profile['span_days'] / max(window, 1.0)
+    return total * factor, mag_sum, mag_count, high_mag * factor
+
+
+def decay_stats(profile, half_life_days=DECAY_HALF_LIFE_DAYS):
+    """Statistik per unit dengan bobot eksponensial 0.5^(umur / half-life)"""
+    n_units = len(profile['labels'])
+    codes = profile['codes']
+    weight = np.exp2(-profile['age'] / half_life_days)
+
+    def weighted(values=None):
+        values = weight if values is None else weight * values
+        return np.bincount(codes, weights=values, minlength=n_units)
+
+    # Jumlah bobot untuk laju konstan 1 gempa/hari sepanjang katalog
+    span = profile['span_days']
+    effective_days = half_life_days / np.log(2) * (1 - np.exp2(-span / half_life_days))
+    factor = span / effective_days
+
+    return weighted() * factor, weighted(profile['mag']), weighted(profile['mag_valid']), weighted(profile['high_mag']) * factor
+
+
+def smooth_unit_stats(profile, cell_deg, stats, kernel=GRID_SMOOTHING_KERNEL):
+    """Haluskan statistik per unit sel grid dengan sel tetangganya (sama seperti compute_grid_risk_scores)"""
+    rows = np.floor(profile['lat'] / cell_deg).astype(np.int64)
+    cols = np.floor(profile['lon'] / cell_deg).astype(np.int64)
+    rows, cols = rows - rows.min(), cols - cols.min()
+    shape = (rows.max() + 1, cols.max() + 1)
+    flat = rows * shape[1] + cols
+
+    return [
+        smooth_grid(np.bincount(flat, weights=values, minlength=shape[0] * shape[1]).reshape(shape), kernel).ravel()[flat]
+        for values in stats
+    ]
+
+
+def time_weighted_scores(risk_df, profile, window_days=None, half_life_days=None, cell_deg=None,
+                         kernel=GRID_SMOOTHING_KERNEL):
+    """Hitung ulang risk score risk_df dengan jendela waktu atau decay
+
+    Kolom statistik tabel tetap nilai semua data; hanya skor, kategori &
+    ranking yang mengikuti horizon waktu.
+
+    Args:
+        cell_deg: ukuran sel untuk tabel mode grid; statistik jendela/decay setiap
+                  sel lalu dihaluskan dengan sel tetangganya seperti skor semua data
+    """
+    if risk_df.empty:
+        return risk_df
+
+    if window_days is not None:
+        total, mag_sum, mag_count, high_mag = window_stats(profile, window_days)
+    else:
+        total, mag_sum, mag_count, high_mag = decay_stats(profile, half_life_days or DECAY_HALF_LIFE_DAYS)
+
+    if cell_deg is not None and len(total):
+        total, mag_sum, mag_count, high_mag = smooth_unit_stats(profile, cell_deg, (total, mag_sum, mag_count, high_mag), kernel)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mag_mean = np.where(mag_count > 0, mag_sum / mag_count, np.nan)
+
+    positions = profile['labels'].get_indexer(risk_df['lokasi'])
+    found = positions >= 0
+
+    def align(values):
+        return np.where(found, values[np.maximum(positions, 0)] if len(values) else 0.0, 0.0)
+
+    return rank_locations(risk_df.drop(columns='rank'), (align(total), align(mag_mean), align(high_mag)))
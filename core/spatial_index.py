@@ -0,0 +1,198 @@
+import numpy as np
+
+# ===========================
+# SPATIAL INDEX (GRID LAT/LON)
+# ===========================
+# Setiap gempa dimasukkan ke sel grid cell_deg x cell_deg derajat. Posisi
+# gempa diurutkan berdasarkan id sel (row-major) sehingga satu baris sel
+# yang berurutan menjadi satu rentang kontigu yang dicari dengan searchsorted.
+DEFAULT_CELL_DEG = 0.5
+EARTH_RADIUS_KM = 6371.0088
+
+
+def build_grid_index(lat, lon, cell_deg=DEFAULT_CELL_DEG):
+    """Bangun grid index dari array latitude/longitude
+
+    Returns:
+        dict berisi posisi baris terurut per sel dan koordinat asli,
+        dipakai oleh fungsi query_* di modul ini.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+
+    n_rows = int(np.ceil(180 / cell_deg))
+    n_cols = int(np.ceil(360 / cell_deg))
+
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    positions = np.flatnonzero(valid)
+
+    rows = _cell_rows(lat[valid], cell_deg, n_rows)
+    cols = _cell_cols(lon[valid], cell_deg, n_cols)
+    cell_id = rows * n_cols + cols
+
+    order = np.argsort(cell_id, kind='stable')
+
+    return {
+        'cell_deg': cell_deg,
+        'n_rows': n_rows,
+        'n_cols': n_cols,
+        'cells': cell_id[order],
+        'positions': positions[order],
+        'lat': lat,
+        'lon': lon
+    }
+
+
+def _cell_rows(lat, cell_deg, n_rows):
+    return np.clip(np.floor((lat + 90) / cell_deg), 0, n_rows - 1).astype(np.int64)
+
+
+def _cell_cols(lon, cell_deg, n_cols):
+    return np.clip(np.floor((lon + 180) / cell_deg), 0, n_cols - 1).astype(np.int64)
+
+
+def _candidates_in_cells(index, row_start, row_end, col_start, col_end):
+    """Posisi gempa di sel [row_start..row_end] x [col_start..col_end]"""
+    n_cols = index['n_cols']
+    rows = np.arange(row_start, row_end + 1, dtype=np.int64)
+    lo = np.searchsorted(index['cells'], rows * n_cols + col_start, side='left')
+    hi = np.searchsorted(index['cells'], rows * n_cols + col_end, side='right')
+
+    if not len(lo) or (hi - lo).sum() == 0:
+        return np.empty(0, dtype=np.int64)
+
+    return np.concatenate([index['positions'][a:b] for a, b in zip(lo, hi) if b > a])
+
+
+def query_bbox(index, south, west, north, east):
+    """Posisi baris gempa di dalam bounding box (derajat), terurut naik
+
+    Longitude di luar [-180, 180] (hasil pan Leaflet) dinormalisasi; box yang
+    melintasi antimeridian dipecah menjadi dua.
+    """
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+    else:
+        west = (west + 180) % 360 - 180
+        east = 180 - (180 - east) % 360
+
+    if west > east:
+        return np.union1d(
+            query_bbox(index, south, west, north, 180.0),
+            query_bbox(index, south, -180.0, north, east)
+        )
+
+    cell_deg, n_rows, n_cols = index['cell_deg'], index['n_rows'], index['n_cols']
+    row_start, row_end = _cell_rows(np.array([south, north]), cell_deg, n_rows)
+    col_start, col_end = _cell_cols(np.array([west, east]), cell_deg, n_cols)
+
+    candidates = _candidates_in_cells(index, row_start, row_end, col_start, col_end)
+
+    lat = index['lat'][candidates]
+    lon = index['lon'][candidates]
+    inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+
+    return np.sort(candidates[inside])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Jarak great-circle (km) antar titik, mendukung broadcasting numpy"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _radius_bbox(lat, lon, radius_km):
+    """Bounding box (derajat) yang pasti memuat lingkaran radius_km di sekitar titik"""
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = np.degrees(angle)
+    south, north = lat - dlat, lat + dlat
+
+    # Dekat kutub (atau radius sangat besar) lingkaran mencakup semua longitude
+    if south <= -90 or north >= 90 or np.sin(angle) >= np.cos(np.radians(lat)):
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+
+    dlon = np.degrees(np.arcsin(np.sin(angle) / np.cos(np.radians(lat))))
+    return south, lon - dlon, north, lon + dlon
+
+
+def query_radius(index, lat, lon, radius_km):
+    """Gempa dalam radius_km dari titik (lat, lon)
+
+    Kandidat diambil dari bounding box lingkaran lalu disaring dengan haversine.
+
+    Returns:
+        (positions, distances_km) terurut dari yang terdekat
+    """
+    candidates = query_bbox(index, *_radius_bbox(lat, lon, radius_km))
+    distances = haversine_km(lat, lon, index['lat'][candidates], index['lon'][candidates])
+
+    inside = distances <= radius_km
+    candidates, distances = candidates[inside], distances[inside]
+
+    order = np.argsort(distances, kind='stable')
+    return candidates[order], distances[order]
+
+
+def query_nearest(index, lat, lon, k=10):
+    """k gempa terdekat dari titik (lat, lon)
+
+    Radius pencarian dimulai dari satu sel grid dan digandakan sampai minimal
+    k gempa ditemukan; k tetangga terdekat pasti berada di dalam radius itu.
+
+    Returns:
+        (positions, distances_km) terurut dari yang terdekat
+    """
+    k = min(int(k), len(index['positions']))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    max_radius = np.pi * EARTH_RADIUS_KM
+    radius_km = np.radians(index['cell_deg']) * EARTH_RADIUS_KM
+    while True:
+        positions, distances = query_radius(index, lat, lon, radius_km)
+        if len(positions) >= k or radius_km >= max_radius:
+            return positions[:k], distances[:k]
+        radius_km = min(radius_km * 2, max_radius)
+
+
+def bounds_from_folium(map_state, padding=0.2):
+    """Ambil (south, west, north, east) dari nilai balik st_folium
+
+    Box diperlebar sebesar `padding` (fraksi) agar pan kecil tidak langsung
+    menghilangkan titik di tepi peta. None jika belum ada state peta.
+    """
+    bounds = (map_state or {}).get('bounds') or {}
+    south_west = bounds.get('_southWest') or {}
+    north_east = bounds.get('_northEast') or {}
+
+    south, west = south_west.get('lat'), south_west.get('lng')
+    north, east = north_east.get('lat'), north_east.get('lng')
+    if None in (south, west, north, east):
+        return None
+
+    pad_lat = (north - south) * padding
+    pad_lon = (east - west) * padding
+
+    return (
+        max(south - pad_lat, -90.0),
+        west - pad_lon,
+        min(north + pad_lat, 90.0),
+        east + pad_lon
+    )
+
+
+def snap_bounds(bounds, zoom):
+    """Bulatkan bounds keluar ke grid tile pada zoom tertentu
+
+    Pan kecil di dalam tile yang sama menghasilkan bounds yang sama, sehingga
+    bisa dipakai sebagai key cache layer peta.
+    """
+    step = 360.0 / 2 ** max(int(zoom), 0)
+    south, west, north, east = bounds
+    return (
+        max(np.floor(south / step) * step, -90.0),
+        np.floor(west / step) * step,
+        min(np.ceil(north / step) * step, 90.0),
+        np.ceil(east / step) * step
+    )
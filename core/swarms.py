@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from core.spatial_index import build_grid_index, query_radius, haversine_km
+
+# ===========================
+# DETEKSI SWARM (ST-DBSCAN)
+# ===========================
+# Dua gempa bertetangga jika jaraknya <= SWARM_EPS_KM dan selisih waktunya
+# <= SWARM_EPS_DAYS. Katalog diurutkan waktu lalu diproses per jendela
+# SWARM_WINDOW_EVENTS gempa: pasangan tetangga setiap jendela dihitung
+# vektor dari rentang waktu kontigu, atau lewat spatial index jendela itu
+# bila rentang waktunya terlalu padat. Memori dibatasi ukuran jendela.
+SWARM_EPS_KM = 25.0
+SWARM_EPS_DAYS = 2.0
+SWARM_MIN_EVENTS = 10
+SWARM_WINDOW_EVENTS = 2000
+
+# Rentang waktu di atas jumlah ini dicari lewat spatial index jendela
+TIME_SLICE_LIMIT = 500
+
+# Sekuens mainshock-aftershock: gempa terbesar jauh di atas gempa terbesar kedua
+SEQUENCE_MAG_GAP = 1.0
+
+SWARM_COLUMNS = [
+    "swarm_id", "jenis", "latitude", "longitude", "radius_km", "start", "end",
+    "duration_hours", "count", "mag_max", "mag_mean", "lokasi_dominan"
+]
+
+
+def _neighbor_pairs(days, lat, lon, eps_km, eps_days, window_events):
+    """Pasangan (i, j), i < j, gempa bertetangga pada katalog terurut waktu"""
+    n = len(days)
+    pairs_i, pairs_j = [], []
+    hi_all = np.searchsorted(days, days + eps_days, side='right')
+
+    for start in range(0, n, window_events):
+        stop = min(start + window_events, n)
+        span_end = hi_all[stop - 1]
+        rows = np.arange(start, stop)
+        counts = hi_all[rows] - rows - 1
+
+        # Rentang waktu padat: kandidat dari spatial index gempa jendela ini
+        dense = counts > TIME_SLICE_LIMIT
+        if dense.any():
+            index = build_grid_index(lat[start:span_end], lon[start:span_end])
+            for i in rows[dense]:
+                candidates, _ = query_radius(index, lat[i], lon[i], eps_km)
+                candidates = candidates + start
+                candidates = candidates[(candidates > i) & (candidates < hi_all[i])]
+                pairs_i.append(np.full(len(candidates), i))
+                pairs_j.append(candidates)
+
+        # Rentang waktu biasa: semua kandidat jendela sekaligus (vektor)
+        rows, counts = rows[~dense], counts[~dense]
+        total = int(counts.sum())
+        if total:
+            first = np.repeat(rows, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            second = first + 1 + offsets
+            near = haversine_km(lat[first], lon[first], lat[second], lon[second]) <= eps_km
+            pairs_i.append(first[near])
+            pairs_j.append(second[near])
+
+    if not pairs_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(pairs_i).astype(np.int64), np.concatenate(pairs_j).astype(np.int64)
+
+
+def _connected_components(n, edges_i, edges_j):
+    """Label komponen terhubung (label = posisi terkecil) dengan propagasi label minimum"""
+    labels = np.arange(n)
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, edges_i, labels[edges_j])
+        np.minimum.at(labels, edges_j, labels[edges_i])
+        labels = labels[labels]  # pointer jumping
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def st_dbscan(days, lat, lon, eps_km=SWARM_EPS_KM, eps_days=SWARM_EPS_DAYS,
+              min_events=SWARM_MIN_EVENTS, window_events=SWARM_WINDOW_EVENTS):
+    """ST-DBSCAN pada katalog terurut waktu
+
+    Gempa inti = punya >= min_events tetangga (termasuk dirinya). Gempa inti
+    yang bertetangga membentuk satu cluster; gempa non-inti ikut cluster gempa
+    inti tetangganya yang paling awal.
+
+    Returns:
+        label cluster per gempa (-1 = bukan bagian swarm)
+    """
+    n = len(days)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    pairs_i, pairs_j = _neighbor_pairs(days, lat, lon, eps_km, eps_days, window_events)
+    neighbors = 1 + np.bincount(pairs_i, minlength=n) + np.bincount(pairs_j, minlength=n)
+    core = neighbors >= min_events
+
+    both_core = core[pairs_i] & core[pairs_j]
+    components = _connected_components(n, pairs_i[both_core], pairs_j[both_core])
+    labels = np.where(core, components, -1)
+
+    # Gempa tepi (border): ambil cluster tetangga inti dengan posisi terkecil
+    border_i = np.concatenate([pairs_i[core[pairs_j] & ~core[pairs_i]], pairs_j[core[pairs_i] & ~core[pairs_j]]])
+    border_core = np.concatenate([pairs_j[core[pairs_j] & ~core[pairs_i]], pairs_i[core[pairs_i] & ~core[pairs_j]]])
+    if len(border_i):
+        order = np.lexsort((border_core, border_i))
+        border_i, border_core = border_i[order], border_core[order]
+        first = np.r_[True, border_i[1:] != border_i[:-1]]
+        labels[border_i[first]] = labels[border_core[first]]
+
+    return labels
+
+
+def detect_swarms(df_events, eps_km=SWARM_EPS_KM, eps_days=SWARM_EPS_DAYS, min_events=SWARM_MIN_EVENTS):
+    """Swarm & sekuens gempa dari katalog hasil process_data
+
+    Returns:
+        (swarm_id per baris df_events (-1 = bukan swarm), DataFrame SWARM_COLUMNS
+        satu baris per swarm, diurutkan dari jumlah gempa terbanyak)
+    """
+    if df_events is None or df_events.empty:
+        return np.empty(0, dtype=np.int64), pd.DataFrame(columns=SWARM_COLUMNS)
+
+    waktu = pd.to_datetime(df_events['waktu'], utc=True)
+    days = ((waktu - waktu.min()) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+    order = np.argsort(days, kind='stable')
+
+    lat = df_events['latitude'].to_numpy(dtype=float)[order]
+    lon = df_events['longitude'].to_numpy(dtype=float)[order]
+    labels_sorted = st_dbscan(days[order], lat, lon, eps_km, eps_days, min_events)
+
+    labels = np.full(len(df_events), -1, dtype=np.int64)
+    labels[order] = labels_sorted
+    in_swarm = labels >= 0
+    if not in_swarm.any():
+        return labels, pd.DataFrame(columns=SWARM_COLUMNS)
+
+    events = pd.DataFrame({
+        'cluster': labels[in_swarm],
+        'waktu': waktu.to_numpy()[in_swarm],
+        'latitude': df_events['latitude'].to_numpy(dtype=float)[in_swarm],
+        'longitude': df_events['longitude'].to_numpy(dtype=float)[in_swarm],
+        'magnitudo': df_events['magnitudo'].to_numpy(dtype=float)[in_swarm],
+        'lokasi': df_events['lokasi'].to_numpy()[in_swarm]
+    })
+    grouped = events.groupby('cluster', sort=False)
+    swarms = grouped.agg(
+        latitude=('latitude', 'mean'),
+        longitude=('longitude', 'mean'),
+        start=('waktu', 'min'),
+        end=('waktu', 'max'),
+        count=('magnitudo', 'size'),
+        mag_max=('magnitudo', 'max'),
+        mag_mean=('magnitudo', 'mean')
+    )
+    swarms['duration_hours'] = (swarms['end'] - swarms['start']) / pd.Timedelta(hours=1)
+
+    # Radius = jarak terjauh gempa dari pusat swarm
+    centers = swarms.loc[events['cluster']]
+    distance = haversine_km(centers['latitude'].to_numpy(), centers['longitude'].to_numpy(), events['latitude'], events['longitude'])
+    swarms['radius_km'] = pd.Series(distance, index=events['cluster']).groupby(level=0).max()
+
+    swarms['lokasi_dominan'] = events.groupby(['cluster', 'lokasi']).size().sort_values(ascending=False, kind='stable').reset_index().drop_duplicates('cluster').set_index('cluster')['lokasi']
+
+    # Sekuens: gempa terbesar jauh di atas gempa terbesar kedua; selain itu swarm
+    second_mag = events.sort_values('magnitudo', ascending=False).groupby('cluster')['magnitudo'].nth(1)
+    second_mag = pd.Series(second_mag.to_numpy(), index=events.loc[second_mag.index, 'cluster'])
+    gap = swarms['mag_max'] - second_mag.reindex(swarms.index)
+    swarms['jenis'] = np.where(gap >= SEQUENCE_MAG_GAP, "Sekuens Mainshock-Aftershock", "Swarm")
+
+    # Nomor swarm berurutan dari yang terbesar
+    swarms = swarms.sort_values(['count', 'start'], ascending=[False, True])
+    swarm_ids = pd.Series(np.arange(1, len(swarms) + 1), index=swarms.index)
+    swarms['swarm_id'] = swarm_ids.to_numpy()
+
+    labels[in_swarm] = swarm_ids.loc[labels[in_swarm]].to_numpy()
+    return labels, swarms[SWARM_COLUMNS].reset_index(drop=True)
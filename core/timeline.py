@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# ===========================
+# TIMELINE MULTI-RESOLUSI
+# ===========================
+# Gempa dihitung sekali ke bucket per jam (UTC) untuk setiap provinsi dengan
+# bincount. Resolusi yang lebih kasar (harian, mingguan, bulanan) hanyalah
+# penjumlahan rentang bucket jam (np.add.reduceat) dengan posisi awal bucket
+# yang sudah dihitung saat build, jadi ganti resolusi/filter tidak pernah
+# mengelompokkan ulang baris katalog.
+TIMELINE_RESOLUTIONS = {
+    "Per Jam": {'freq': 'h', 'rolling': 24, 'rolling_label': '24 jam', 'label_format': '%d %b %Y %H:00'},
+    "Harian": {'freq': 'D', 'rolling': 7, 'rolling_label': '7 hari', 'label_format': '%d %b %Y'},
+    "Mingguan": {'freq': '7D', 'rolling': 4, 'rolling_label': '4 minggu', 'label_format': '%d %b %Y'},
+    "Bulanan": {'freq': 'MS', 'rolling': 3, 'rolling_label': '3 bulan', 'label_format': '%b %Y'},
+}
+DEFAULT_RESOLUTION = "Bulanan"
+
+
+def _bucket_edges(first_hour, last_hour, freq):
+    """Awal setiap bucket resolusi freq yang mencakup rentang [first_hour, last_hour]"""
+    day = first_hour.normalize()
+    if freq == '7D':
+        origin = day - pd.Timedelta(days=day.weekday())  # mulai hari Senin
+    elif freq == 'MS':
+        origin = day - pd.Timedelta(days=day.day - 1)
+    elif freq == 'D':
+        origin = day
+    else:
+        origin = first_hour
+    return pd.date_range(origin, last_hour, freq=freq)
+
+
+def build_timeline(df_events, group_col='provinsi'):
+    """Hitung jumlah gempa per jam per grup (default provinsi) dari katalog hasil process_data
+
+    Returns:
+        dict berisi bucket jam, label grup, matriks jumlah (grup x jam), total
+        semua grup, dan posisi awal bucket untuk setiap resolusi
+    """
+    waktu = pd.to_datetime(df_events['waktu'], utc=True)
+    first_hour = waktu.min().floor('h')
+    last_hour = waktu.max().floor('h')
+    hours = pd.date_range(first_hour, last_hour, freq='h')
+
+    hour_codes = ((waktu.dt.floor('h') - first_hour) // pd.Timedelta(hours=1)).to_numpy(dtype=np.int64)
+    group_codes, groups = pd.factorize(df_events[group_col].astype(str), sort=True)
+
+    n_hours = len(hours)
+    counts = np.bincount(group_codes * n_hours + hour_codes, minlength=len(groups) * n_hours)
+    counts = counts.reshape(len(groups), n_hours).astype(np.int32)
+
+    buckets = {}
+    for name, spec in TIMELINE_RESOLUTIONS.items():
+        edges = _bucket_edges(first_hour, last_hour, spec['freq'])
+        starts = np.maximum((edges - first_hour) // pd.Timedelta(hours=1), 0).to_numpy(dtype=np.int64)
+        buckets[name] = (edges, starts)
+
+    return {
+        'hours': hours,
+        'groups': pd.Index(groups),
+        'counts': counts,
+        'total': counts.sum(axis=0),
+        'buckets': buckets
+    }
+
+
+def timeline_counts(timeline, resolution=DEFAULT_RESOLUTION, group=None, period=None):
+    """Jumlah gempa per bucket resolusi, opsional untuk satu grup dan satu bulan
+
+    Args:
+        group: label grup (provinsi); None atau "Semua" berarti semua grup
+        period: label bulan seperti "Aug 2025"; None atau "Semua" berarti seluruh katalog
+
+    Returns:
+        Series jumlah gempa dengan index waktu awal bucket (UTC)
+    """
+    if group is None or group == "Semua":
+        hourly = timeline['total']
+    else:
+        position = timeline['groups'].get_indexer([group])[0]
+        hourly = timeline['counts'][position] if position >= 0 else np.zeros(len(timeline['hours']), dtype=np.int32)
+
+    edges, starts = timeline['buckets'][resolution]
+    keep = np.ones(len(edges), dtype=bool)
+
+    if period is not None and period != "Semua":
+        # Bulan dipotong di level jam agar bucket mingguan di tepi bulan tidak ikut menghitung bulan lain
+        month_start = pd.to_datetime(period, format='%b %Y').tz_localize('UTC')
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        lo, hi = timeline['hours'].searchsorted([month_start, month_end])
+        in_month = np.zeros_like(hourly)
+        in_month[lo:hi] = hourly[lo:hi]
+        hourly = in_month
+
+        bucket_ends = edges[1:].append(pd.DatetimeIndex([timeline['hours'][-1] + pd.Timedelta(hours=1)]))
+        keep = (bucket_ends > month_start) & (edges < month_end)
+
+    counts = pd.Series(np.add.reduceat(hourly, starts), index=edges, name='jumlah')
+    return counts[keep]
+
+
+def rolling_rate(counts, window):
+    """Rata-rata bergulir jumlah gempa per bucket (jendela window bucket)"""
+    return counts.rolling(window, min_periods=1).mean()
@@ -3,6 +3,16 @@ import pandas as pd
 import requests
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
+from core.binning import build_geohash_levels, cells_to_geojson, decimate_scatter, scatter_extremes, GEOHASH_PRECISIONS, GEOHASH_CELL_SIZE, EXTREME_MAG, EXTREME_DEPTH_KM
+from core.cache import LRUCache
+from core.catalog import catalog_version
+from core.cube import build_cube, cube_mask, cube_marginal, cube_series, cube_summary, lokasi_hour_matrix, peak_hours, MAG_CATEGORIES
+from core.figures import cached_figure, FIGURE_TEMPLATE
+from core.regions import assign_provinces
+from core.timeline import build_timeline, timeline_counts, rolling_rate, TIMELINE_RESOLUTIONS, DEFAULT_RESOLUTION
+from ui.charts import plotly_chart_spec
+from ui.declustering import declustering_toggle
 from datetime import datetime
 
 # ===========================
@@ -338,6 +348,7 @@ def process_data(df):
     df["magnitudo"] = pd.to_numeric(df["magnitudo"], errors='coerce').round(2)
     df["kedalaman_km"] = pd.to_numeric(df["kedalaman_km"], errors='coerce').round(2)
     df['lokasi'] = df['lokasi'].fillna('Unknown').astype(str).str.strip()
+    df['provinsi'] = assign_provinces(df['latitude'], df['longitude'])
     
     df["waktu"] = pd.to_datetime(df["waktu"], utc=True)
     df["bulan"] = df["waktu"].dt.strftime("%b %Y")
@@ -386,6 +397,32 @@ if df is None or df.empty:
     st.error("❌ Gagal memuat data gempa")
     st.stop()
 
+# ===========================
+# BINNING GEOHASH (PER RESOLUSI)
+# ===========================
+@st.cache_resource(max_entries=20)
+def get_geohash_levels(version, filter_spec, _df_filtered):
+    """Statistik sel geohash semua presisi, di-cache per versi katalog & filter"""
+    return build_geohash_levels(_df_filtered)
+
+# ===========================
+# OLAP CUBE (PER VERSI KATALOG)
+# ===========================
+@st.cache_resource(max_entries=5)
+def get_chart_cube(version, _df):
+    """Cube bulan x provinsi x lokasi x sumber x magnitudo x kedalaman x jam, dibangun sekali per versi katalog"""
+    return build_cube(_df)
+
+@st.cache_resource(max_entries=5)
+def get_chart_timeline(version, _df):
+    """Jumlah gempa per jam per provinsi (dasar semua resolusi timeline), dibangun sekali per versi katalog"""
+    return build_timeline(_df)
+
+@st.cache_resource
+def get_figure_cache():
+    """Cache figure Plotly (per id chart, hash agregat & tema) dengan batas ukuran"""
+    return LRUCache(max_bytes=32 * 1024 * 1024)
+
 # ===========================
 # HEADER
 # ===========================
@@ -404,6 +441,9 @@ else:
 
 st.markdown('<p class="header-subtitle">Dashboard Data-Driven untuk Pengambilan Keputusan (Combined: Excel + Real-time BMKG)</p>', unsafe_allow_html=True)
 
+# Toggle declustered: buang foreshock & aftershock (label dari cache per versi katalog)
+df, decluster_spec = declustering_toggle(df)
+
 # ===========================
 # FILTER (SIMPLE - NO SESSION STATE ISSUES)
 # ===========================
@@ -411,7 +451,7 @@ col_f1, col_f2, col_f3 = st.columns([2.5, 2.5, 1.2])
 
 with col_f1:
     st.markdown("**📍 Provinsi/Wilayah**")
-    provinces = ["Semua"] + sorted(df['lokasi'].dropna().unique().tolist())
+    provinces = ["Semua"] + df['provinsi'].cat.remove_unused_categories().cat.categories.tolist()
     selected_province = st.selectbox("Pilih", provinces, label_visibility="collapsed", key="prov_chart")
 
 with col_f2:
@@ -431,11 +471,20 @@ with col_f3:
 df_filtered = df.copy()
 
 if selected_province != "Semua":
-    df_filtered = df_filtered[df_filtered['lokasi'].str.contains(selected_province, case=False, na=False)]
+    df_filtered = df_filtered[df_filtered['provinsi'] == selected_province]
 
 if selected_period != "Semua":
     df_filtered = df_filtered[df_filtered['bulan'] == selected_period]
 
+# Chart agregat & kartu metrik diambil dari irisan cube, bukan dari baris mentah
+cube = get_chart_cube(catalog_version(df), df)
+cube_filter = cube_mask(cube, provinsi=selected_province, bulan=selected_period)
+summary = cube_summary(cube, cube_filter)
+
+# Figure hanya dibangun ulang jika agregat atau tema berubah
+figure_cache = get_figure_cache()
+figure_theme = (FIGURE_TEMPLATE, st.context.theme.type)
+
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
 # ===========================
@@ -446,11 +495,11 @@ st.markdown('<p class="chart-title">📊 Ringkasan Statistik</p>', unsafe_allow_
 col_metrics = st.columns(5)
 
 metrics_data = [
-    ("Total Gempa", f"{len(df_filtered):,}", "🔢"),
-    ("Magnitudo Max", f"{df_filtered['magnitudo'].max():.2f}" if len(df_filtered) > 0 else "0", "⚡"),
-    ("Magnitudo Avg", f"{df_filtered['magnitudo'].mean():.2f}" if len(df_filtered) > 0 else "0", "📈"),
-    ("Kedalaman Avg", f"{df_filtered['kedalaman_km'].mean():.1f} km" if len(df_filtered) > 0 else "0 km", "📍"),
-    ("Gempa > Mag 5", f"{len(df_filtered[df_filtered['magnitudo'] >= 5])}" if len(df_filtered) > 0 else "0", "⚠️")
+    ("Total Gempa", f"{summary['count']:,}", "🔢"),
+    ("Magnitudo Max", f"{summary['mag_max']:.2f}" if summary['count'] > 0 else "0", "⚡"),
+    ("Magnitudo Avg", f"{summary['mag_mean']:.2f}" if summary['count'] > 0 else "0", "📈"),
+    ("Kedalaman Avg", f"{summary['depth_mean']:.1f} km" if summary['count'] > 0 else "0 km", "📍"),
+    ("Gempa > Mag 5", f"{summary['high_mag_count']}" if summary['count'] > 0 else "0", "⚠️")
 ]
 
 for idx, (label, value, emoji) in enumerate(metrics_data):
@@ -464,8 +513,8 @@ for idx, (label, value, emoji) in enumerate(metrics_data):
         """, unsafe_allow_html=True)
 
 # Data source info
-if is_combined and len(df_filtered) > 0:
-    source_counts = df_filtered['source'].value_counts()
+if is_combined and summary['count'] > 0:
+    source_counts = cube_series(cube, cube_filter, 'source').astype(int).sort_values(ascending=False, kind='stable')
     st.info(f"📊 **Data Source:** {', '.join([f'{k}: {v} gempa' for k, v in source_counts.items()])}")
 
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
@@ -474,35 +523,69 @@ st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 # CHART 1: TIMELINE
 # ===========================
 st.markdown('<div class="chart-section">', unsafe_allow_html=True)
-st.markdown('<p class="chart-title">📈 Timeline Aktivitas Gempa Bulanan</p>', unsafe_allow_html=True)
+st.markdown('<p class="chart-title">📈 Timeline Aktivitas Gempa</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Tren jumlah kejadian gempa dari waktu ke waktu (Combined: Excel + BMKG)</p>', unsafe_allow_html=True)
 
-timeline_data = df_filtered.groupby('bulan').size().reset_index(name='jumlah')
-timeline_data['bulan_sort'] = df_filtered.groupby('bulan')['bulan_sort'].first()
-timeline_data = timeline_data.sort_values('bulan_sort')
-
-if len(timeline_data) > 0:
-    fig_timeline = go.Figure()
-    fig_timeline.add_trace(go.Scatter(
-        x=timeline_data['bulan'], y=timeline_data['jumlah'],
-        mode='lines+markers', line=dict(color='#1e3a5f', width=4),
-        marker=dict(size=12, color='#1e3a5f'),
-        fill='tozeroy', fillcolor='rgba(30, 58, 95, 0.15)',
-        hovertemplate='<b>%{x}</b><br>Jumlah: %{y:,.0f}<extra></extra>'
-    ))
-    fig_timeline.update_layout(
-        height=380, showlegend=False, template='plotly_white',
-        font=dict(size=12), xaxis=dict(title='Periode', showgrid=True, gridcolor='#f0f0f0'),
-        yaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
-        margin=dict(l=60, r=40, t=40, b=60)
+col_tl1, col_tl2 = st.columns([3, 1])
+with col_tl1:
+    timeline_resolution = st.radio(
+        "Resolusi",
+        list(TIMELINE_RESOLUTIONS),
+        index=list(TIMELINE_RESOLUTIONS).index(DEFAULT_RESOLUTION),
+        horizontal=True,
+        key="timeline_resolution"
+    )
+resolution_spec = TIMELINE_RESOLUTIONS[timeline_resolution]
+with col_tl2:
+    show_rolling = st.checkbox(f"Laju bergulir ({resolution_spec['rolling_label']})", value=True, key="timeline_rolling")
+
+# Bucket per jam dihitung sekali per versi katalog; resolusi lain = penjumlahan rentang bucket
+timeline = get_chart_timeline(catalog_version(df), df)
+timeline_counts_series = timeline_counts(timeline, timeline_resolution, selected_province, selected_period)
+timeline_data = pd.DataFrame({
+    'periode': timeline_counts_series.index.strftime(resolution_spec['label_format']),
+    'jumlah': timeline_counts_series.to_numpy(),
+    'laju': rolling_rate(timeline_counts_series, resolution_spec['rolling']).to_numpy()
+})
+
+if timeline_data['jumlah'].sum() > 0:
+    def build_timeline_figure():
+        is_dense = len(timeline_data) > 60
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=timeline_data['periode'], y=timeline_data['jumlah'], name='Jumlah',
+            mode='lines' if is_dense else 'lines+markers',
+            line=dict(color='#1e3a5f', width=2 if is_dense else 4),
+            marker=dict(size=12, color='#1e3a5f'),
+            fill='tozeroy', fillcolor='rgba(30, 58, 95, 0.15)',
+            hovertemplate='<b>%{x}</b><br>Jumlah: %{y:,.0f}<extra></extra>'
+        ))
+        if show_rolling:
+            fig.add_trace(go.Scatter(
+                x=timeline_data['periode'], y=timeline_data['laju'],
+                name=f"Laju bergulir {resolution_spec['rolling_label']}",
+                mode='lines', line=dict(color='#dc3545', width=2, dash='dash'),
+                hovertemplate='<b>%{x}</b><br>Rata-rata: %{y:,.2f}<extra></extra>'
+            ))
+        fig.update_layout(
+            height=380, showlegend=show_rolling, template=FIGURE_TEMPLATE,
+            font=dict(size=12), xaxis=dict(title='Periode', showgrid=True, gridcolor='#f0f0f0', rangeslider=dict(visible=is_dense)),
+            yaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, x=0),
+            margin=dict(l=60, r=40, t=40, b=60)
+        )
+        return fig
+    
+    fig_timeline = cached_figure(
+        figure_cache, "timeline", (timeline_data, timeline_resolution, show_rolling), figure_theme, build_timeline_figure
     )
-    st.plotly_chart(fig_timeline, use_container_width=True, config={'displayModeBar': False})
+    plotly_chart_spec(fig_timeline, config={'displayModeBar': False})
     
     st.markdown("""
     <div class="insight-box">
         <div class="insight-title">💡 Insight</div>
         <div class="insight-text">
-        Grafik menunjukkan tren aktivitas seismik bulanan dari data Excel (Aug-Dec 2025) dan real-time BMKG (1 Jan - sekarang). 
+        Grafik menunjukkan tren aktivitas seismik (per jam hingga bulanan, dengan laju bergulir) dari data Excel (Aug-Dec 2025) dan real-time BMKG (1 Jan - sekarang). 
         Bulan dengan aktivitas tinggi memerlukan persiapan khusus untuk mitigasi dan edukasi masyarakat tentang keselamatan gempa.
         </div>
     </div>
@@ -520,45 +603,48 @@ st.markdown('<div class="chart-section">', unsafe_allow_html=True)
 st.markdown('<p class="chart-title">📊 Distribusi Magnitudo Gempa</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Sebaran gempa berdasarkan kategori magnitudo (Data Combined)</p>', unsafe_allow_html=True)
 
-def categorize_magnitude(mag):
-    if mag < 3: return "1-2 (Kecil)"
-    elif mag < 4: return "3-4 (Ringan)"
-    elif mag < 5: return "4-5 (Menengah)"
-    else: return "5+ (Besar)"
-
-df_filtered['mag_kategori'] = df_filtered['magnitudo'].apply(categorize_magnitude)
-mag_dist = df_filtered['mag_kategori'].value_counts().reindex(["1-2 (Kecil)", "3-4 (Ringan)", "4-5 (Menengah)", "5+ (Besar)"], fill_value=0)
+mag_dist = pd.Series(cube_marginal(cube, cube_filter, ['mag_kategori']).astype(int), index=MAG_CATEGORIES)
 
 col_mag1, col_mag2 = st.columns(2)
 
 with col_mag1:
     st.markdown('**Bar Chart - Jumlah Gempa**')
     colors = ['#28a745', '#ffc107', '#fd7e14', '#dc3545']
-    fig_bar = go.Figure(data=[go.Bar(
-        x=mag_dist.index, y=mag_dist.values, marker=dict(color=colors),
-        text=mag_dist.values, textposition='auto',
-        hovertemplate='<b>%{x}</b><br>Jumlah: %{y:,.0f}<extra></extra>'
-    )])
-    fig_bar.update_layout(
-        height=360, showlegend=False, template='plotly_white', font=dict(size=11),
-        xaxis=dict(title='Kategori Magnitudo', showgrid=False),
-        yaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
-        margin=dict(l=50, r=30, t=30, b=60)
-    )
-    st.plotly_chart(fig_bar, use_container_width=True, config={'displayModeBar': False})
+    
+    def build_mag_bar():
+        fig = go.Figure(data=[go.Bar(
+            x=mag_dist.index, y=mag_dist.values, marker=dict(color=colors),
+            text=mag_dist.values, textposition='auto',
+            hovertemplate='<b>%{x}</b><br>Jumlah: %{y:,.0f}<extra></extra>'
+        )])
+        fig.update_layout(
+            height=360, showlegend=False, template=FIGURE_TEMPLATE, font=dict(size=11),
+            xaxis=dict(title='Kategori Magnitudo', showgrid=False),
+            yaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
+            margin=dict(l=50, r=30, t=30, b=60)
+        )
+        return fig
+    
+    fig_bar = cached_figure(figure_cache, "mag_bar", (mag_dist,), figure_theme, build_mag_bar)
+    plotly_chart_spec(fig_bar, config={'displayModeBar': False})
 
 with col_mag2:
     st.markdown('**Pie Chart - Persentase**')
-    fig_pie = go.Figure(data=[go.Pie(
-        labels=mag_dist.index, values=mag_dist.values, marker=dict(colors=colors),
-        textposition='inside', textinfo='label+percent',
-        hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
-    )])
-    fig_pie.update_layout(
-        height=360, showlegend=True, template='plotly_white', font=dict(size=11),
-        margin=dict(l=30, r=30, t=30, b=30)
-    )
-    st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
+    
+    def build_mag_pie():
+        fig = go.Figure(data=[go.Pie(
+            labels=mag_dist.index, values=mag_dist.values, marker=dict(colors=colors),
+            textposition='inside', textinfo='label+percent',
+            hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
+        )])
+        fig.update_layout(
+            height=360, showlegend=True, template=FIGURE_TEMPLATE, font=dict(size=11),
+            margin=dict(l=30, r=30, t=30, b=30)
+        )
+        return fig
+    
+    fig_pie = cached_figure(figure_cache, "mag_pie", (mag_dist,), figure_theme, build_mag_pie)
+    plotly_chart_spec(fig_pie, config={'displayModeBar': False})
 
 st.markdown("""
 <div class="insight-box">
@@ -581,22 +667,27 @@ st.markdown('<div class="chart-section">', unsafe_allow_html=True)
 st.markdown('<p class="chart-title">🗺️ Top 10 Daerah Paling Rawan Gempa</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Wilayah dengan aktivitas seismik tertinggi (Excel + BMKG Combined)</p>', unsafe_allow_html=True)
 
-top_daerah = df_filtered['lokasi'].value_counts().head(10)
+lokasi_counts = cube_series(cube, cube_filter, 'lokasi').astype(int).sort_values(ascending=False, kind='stable')
+top_daerah = lokasi_counts.head(10)
 
-fig_top = go.Figure(data=[go.Bar(
-    x=top_daerah.values, y=top_daerah.index, orientation='h',
-    marker=dict(color='#1e3a5f'), text=top_daerah.values, textposition='auto',
-    hovertemplate='<b>%{y}</b><br>Jumlah: %{x:,.0f}<extra></extra>'
-)])
+def build_top_daerah():
+    fig = go.Figure(data=[go.Bar(
+        x=top_daerah.values, y=top_daerah.index, orientation='h',
+        marker=dict(color='#1e3a5f'), text=top_daerah.values, textposition='auto',
+        hovertemplate='<b>%{y}</b><br>Jumlah: %{x:,.0f}<extra></extra>'
+    )])
+    
+    fig.update_layout(
+        height=420, showlegend=False, template=FIGURE_TEMPLATE, font=dict(size=11),
+        xaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
+        yaxis=dict(title='Daerah', categoryorder='total ascending'),
+        margin=dict(l=180, r=40, t=30, b=50)
+    )
+    return fig
 
-fig_top.update_layout(
-    height=420, showlegend=False, template='plotly_white', font=dict(size=11),
-    xaxis=dict(title='Jumlah Gempa', showgrid=True, gridcolor='#f0f0f0'),
-    yaxis=dict(title='Daerah', categoryorder='total ascending'),
-    margin=dict(l=180, r=40, t=30, b=50)
-)
+fig_top = cached_figure(figure_cache, "top_daerah", (top_daerah,), figure_theme, build_top_daerah)
 
-st.plotly_chart(fig_top, use_container_width=True, config={'displayModeBar': False})
+plotly_chart_spec(fig_top, config={'displayModeBar': False})
 
 st.markdown("""
 <div class="insight-box">
@@ -611,6 +702,81 @@ st.markdown("""
 st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
+# ===========================
+# CHART 3B: GRID WILAYAH (GEOHASH)
+# ===========================
+st.markdown('<div class="chart-section">', unsafe_allow_html=True)
+st.markdown('<p class="chart-title">🧭 Peta Grid Wilayah (Geohash)</p>', unsafe_allow_html=True)
+st.markdown('<p class="chart-subtitle">Agregasi per sel geohash - satu area tidak terpecah oleh variasi nama lokasi</p>', unsafe_allow_html=True)
+
+if len(df_filtered) > 0:
+    col_gh1, col_gh2 = st.columns(2)
+    with col_gh1:
+        gh_precision = st.select_slider(
+            "Resolusi",
+            options=list(GEOHASH_PRECISIONS),
+            value=3,
+            format_func=lambda p: f"Geohash {p} (~{GEOHASH_CELL_SIZE[p]})",
+            key="geohash_precision"
+        )
+    with col_gh2:
+        gh_metric = st.radio(
+            "Warna berdasarkan",
+            ["Jumlah Gempa", "Magnitudo Maks", "Energi (log10 J)"],
+            horizontal=True,
+            key="geohash_metric"
+        )
+    
+    gh_levels = get_geohash_levels(catalog_version(df), (selected_province, selected_period), df_filtered)
+    gh_cells = gh_levels[gh_precision]
+    
+    gh_values = {
+        "Jumlah Gempa": gh_cells['count'],
+        "Magnitudo Maks": gh_cells['mag_max'],
+        "Energi (log10 J)": np.log10(gh_cells['energy_sum'].clip(lower=1))
+    }[gh_metric]
+    
+    def build_geohash_grid():
+        fig = go.Figure(go.Choroplethmap(
+            geojson=cells_to_geojson(gh_cells),
+            locations=gh_cells['geohash'],
+            z=gh_values,
+            colorscale='YlOrRd',
+            marker=dict(opacity=0.7, line=dict(width=0.5, color='#1e3a5f')),
+            colorbar=dict(title=gh_metric),
+            customdata=gh_cells[['count', 'mag_max', 'depth_mean', 'lokasi_dominan']],
+            hovertemplate='<b>%{location}</b><br>%{customdata[3]}<br>Jumlah: %{customdata[0]:,}<br>'
+                          'Mag Max: %{customdata[1]:.2f}<br>Kedalaman Avg: %{customdata[2]:.1f} km<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            height=480, margin=dict(l=0, r=0, t=10, b=0),
+            map=dict(
+                style='open-street-map', zoom=3.5,
+                center=dict(lat=df_filtered['latitude'].mean(), lon=df_filtered['longitude'].mean())
+            )
+        )
+        return fig
+    
+    # Sel geohash ditentukan oleh versi katalog, filter & presisi; tidak perlu di-hash ulang
+    fig_grid = cached_figure(
+        figure_cache, "geohash_grid",
+        (catalog_version(df), selected_province, selected_period, gh_precision, gh_metric),
+        figure_theme, build_geohash_grid
+    )
+    
+    plotly_chart_spec(fig_grid, config={'displayModeBar': False})
+    
+    # Statistik region per sel
+    st.markdown("**📋 Top 10 Sel Paling Aktif**")
+    top_cells = gh_cells.nlargest(10, 'count')[['geohash', 'lokasi_dominan', 'count', 'mag_max', 'depth_mean', 'energy_sum']].copy()
+    top_cells['energy_sum'] = np.log10(top_cells['energy_sum'].clip(lower=1))
+    top_cells.columns = ['Geohash', 'Lokasi Dominan', 'Jumlah Gempa', 'Magnitudo Maks', 'Kedalaman Avg (km)', 'Energi (log10 J)']
+    st.dataframe(top_cells.round(2), use_container_width=True, hide_index=True)
+
+st.markdown('</div>', unsafe_allow_html=True)
+st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+
 # ===========================
 # CHART 4: SCATTER PLOT
 # ===========================
@@ -618,23 +784,49 @@ st.markdown('<div class="chart-section">', unsafe_allow_html=True)
 st.markdown('<p class="chart-title">📐 Relasi Kedalaman vs Magnitudo</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Analisis hubungan antara kedalaman dan kekuatan gempa</p>', unsafe_allow_html=True)
 
-fig_scatter = px.scatter(
-    df_filtered, x='kedalaman_km', y='magnitudo',
-    color='magnitudo', size='magnitudo',
-    hover_data={'lokasi': True, 'tanggal': True, 'kedalaman_km': ':.1f', 'magnitudo': ':.2f'},
-    color_continuous_scale='Viridis', labels={'kedalaman_km': 'Kedalaman (km)', 'magnitudo': 'Magnitudo'},
-    template='plotly_white'
+# Render WebGL; di atas budget titik, gempa biasa disampling per sel 2D
+# sementara gempa ekstrem (M >= 5 atau sangat dalam) tetap ditampilkan semua
+scatter_index, scatter_weight = decimate_scatter(
+    df_filtered['kedalaman_km'], df_filtered['magnitudo'],
+    scatter_extremes(df_filtered['magnitudo'], df_filtered['kedalaman_km'])
 )
+df_scatter = df_filtered.iloc[scatter_index].assign(mewakili=np.round(scatter_weight, 1))
+is_downsampled = len(df_scatter) < len(df_filtered)
+
+def build_scatter():
+    fig = px.scatter(
+        df_scatter, x='kedalaman_km', y='magnitudo',
+        color='magnitudo', size='magnitudo',
+        hover_data={'lokasi': True, 'tanggal': True, 'kedalaman_km': ':.1f', 'magnitudo': ':.2f', 'mewakili': is_downsampled},
+        color_continuous_scale='Viridis', labels={'kedalaman_km': 'Kedalaman (km)', 'magnitudo': 'Magnitudo', 'mewakili': 'Mewakili (gempa)'},
+        template=FIGURE_TEMPLATE, render_mode='webgl'
+    )
+    
+    fig.update_layout(
+        height=420, font=dict(size=11),
+        xaxis=dict(title='Kedalaman (km)', showgrid=True, gridcolor='#f0f0f0'),
+        yaxis=dict(title='Magnitudo', showgrid=True, gridcolor='#f0f0f0'),
+        hovermode='closest', coloraxis_colorbar=dict(title='Magnitudo'),
+        margin=dict(l=60, r=80, t=30, b=60)
+    )
+    return fig
 
-fig_scatter.update_layout(
-    height=420, font=dict(size=11),
-    xaxis=dict(title='Kedalaman (km)', showgrid=True, gridcolor='#f0f0f0'),
-    yaxis=dict(title='Magnitudo', showgrid=True, gridcolor='#f0f0f0'),
-    hovermode='closest', coloraxis_colorbar=dict(title='Magnitudo'),
-    margin=dict(l=60, r=80, t=30, b=60)
+fig_scatter = cached_figure(
+    figure_cache, "scatter",
+    (df_scatter[['kedalaman_km', 'magnitudo', 'lokasi', 'tanggal', 'mewakili']],),
+    figure_theme, build_scatter
 )
 
-st.plotly_chart(fig_scatter, use_container_width=True, config={'displayModeBar': False})
+plotly_chart_spec(fig_scatter, config={'displayModeBar': False})
+
+if is_downsampled:
+    st.caption(
+        f"⚡ Menampilkan {len(df_scatter):,} dari {len(df_filtered):,} gempa (sampling per sel kepadatan). "
+        f"Semua gempa M ≥ {EXTREME_MAG:g} atau kedalaman ≥ {EXTREME_DEPTH_KM} km ditampilkan."
+    )
+
+depth_counts = cube_series(cube, cube_filter, 'depth_kategori').astype(int)
+st.caption("Kategori kedalaman: " + " · ".join(f"{label}: {count:,}" for label, count in depth_counts.items()))
 
 st.markdown("""
 <div class="insight-box">
@@ -656,47 +848,50 @@ st.markdown('<div class="chart-section">', unsafe_allow_html=True)
 st.markdown('<p class="chart-title">🕐 Distribusi Waktu Gempa Per Daerah</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Jam puncak terjadinya gempa di setiap daerah (Data historis + real-time)</p>', unsafe_allow_html=True)
 
-if len(df_filtered) > 0:
-    # Calculate hour for each earthquake
-    df_filtered_copy = df_filtered.copy()
-    df_filtered_copy['jam'] = pd.to_datetime(df_filtered_copy['waktu']).dt.hour
-    
+# Matriks lokasi x jam (UTC) dihitung sekali dari cube; jam puncak = argmax per baris.
+# Dipakai ulang oleh chart 5, chart 6, detail per daerah, dan heatmap lengkap.
+jam_matrix = lokasi_hour_matrix(cube, cube_filter)
+jam_peak = peak_hours(jam_matrix)
+
+if summary['count'] > 0:
     # Get top 15 locations for readability
-    top_15_daerah = df_filtered_copy['lokasi'].value_counts().head(15).index
-    df_top_15 = df_filtered_copy[df_filtered_copy['lokasi'].isin(top_15_daerah)]
+    top_15_daerah = jam_matrix.index[:15]
     
     # Find most common hour for each location
-    jam_per_daerah = df_top_15.groupby('lokasi')['jam'].agg(lambda x: x.value_counts().idxmax()).reset_index()
-    jam_per_daerah.columns = ['lokasi', 'jam_terbanyak']
+    jam_per_daerah = jam_peak.loc[top_15_daerah].rename_axis('lokasi').reset_index()
     jam_per_daerah = jam_per_daerah.sort_values('jam_terbanyak')
     
     # Create bar chart
-    fig_jam = go.Figure(data=[go.Bar(
-        y=jam_per_daerah['lokasi'],
-        x=jam_per_daerah['jam_terbanyak'],
-        orientation='h',
-        marker=dict(
-            color=jam_per_daerah['jam_terbanyak'],
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Jam (0-23)")
-        ),
-        text=[f"{int(jam):02d}:00" for jam in jam_per_daerah['jam_terbanyak']],
-        textposition='auto',
-        hovertemplate='<b>%{y}</b><br>Jam Puncak: %{text}<extra></extra>'
-    )])
+    def build_peak_hours():
+        fig = go.Figure(data=[go.Bar(
+            y=jam_per_daerah['lokasi'],
+            x=jam_per_daerah['jam_terbanyak'],
+            orientation='h',
+            marker=dict(
+                color=jam_per_daerah['jam_terbanyak'],
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Jam (0-23)")
+            ),
+            text=[f"{int(jam):02d}:00" for jam in jam_per_daerah['jam_terbanyak']],
+            textposition='auto',
+            hovertemplate='<b>%{y}</b><br>Jam Puncak: %{text}<extra></extra>'
+        )])
+        
+        fig.update_layout(
+            height=420,
+            showlegend=False,
+            font=dict(size=11),
+            xaxis=dict(title='Jam (0-23)', showgrid=True, gridwidth=1, gridcolor='#f0f0f0', range=[0, 24]),
+            yaxis=dict(title='Daerah'),
+            template=FIGURE_TEMPLATE,
+            margin=dict(l=150, r=80, t=30, b=50)
+        )
+        return fig
     
-    fig_jam.update_layout(
-        height=420,
-        showlegend=False,
-        font=dict(size=11),
-        xaxis=dict(title='Jam (0-23)', showgrid=True, gridwidth=1, gridcolor='#f0f0f0', range=[0, 24]),
-        yaxis=dict(title='Daerah'),
-        template='plotly_white',
-        margin=dict(l=150, r=80, t=30, b=50)
-    )
+    fig_jam = cached_figure(figure_cache, "jam_puncak", (jam_per_daerah,), figure_theme, build_peak_hours)
     
-    st.plotly_chart(fig_jam, use_container_width=True, config={'displayModeBar': False})
+    plotly_chart_spec(fig_jam, config={'displayModeBar': False})
     
     # Insights
     col_jam1, col_jam2 = st.columns(2)
@@ -740,50 +935,38 @@ st.markdown('<div class="chart-section">', unsafe_allow_html=True)
 st.markdown('<p class="chart-title">🕐 Analisis Waktu Gempa Per Daerah (Detail)</p>', unsafe_allow_html=True)
 st.markdown('<p class="chart-subtitle">Rata-rata jam terjadinya gempa dan statistik waktu di setiap lokasi</p>', unsafe_allow_html=True)
 
-if len(df_filtered) > 0:
-    # Extract jam dari waktu gempa
-    df_filtered_copy = df_filtered.copy()
-    df_filtered_copy['jam'] = pd.to_datetime(df_filtered_copy['waktu']).dt.hour
-    
+if summary['count'] > 0:
     # Get all unique locations
-    all_locations = sorted(df_filtered_copy['lokasi'].unique())
-    
-    # Filter untuk tampilan - top 15 untuk chart
-    top_15_daerah = df_filtered_copy['lokasi'].value_counts().head(15).index
-    df_top_15 = df_filtered_copy[df_filtered_copy['lokasi'].isin(top_15_daerah)]
-    
-    # Hitung jam paling sering gempa di setiap daerah
-    jam_per_daerah = df_top_15.groupby('lokasi')['jam'].agg(lambda x: x.value_counts().idxmax()).reset_index()
-    jam_per_daerah.columns = ['lokasi', 'jam_terbanyak']
-    jam_per_daerah = jam_per_daerah.sort_values('jam_terbanyak')
-    
-    # Buat bar chart horizontal dengan key unik
-    fig_jam = go.Figure(data=[go.Bar(
-        y=jam_per_daerah['lokasi'],
-        x=jam_per_daerah['jam_terbanyak'],
-        orientation='h',
-        marker=dict(
-            color=jam_per_daerah['jam_terbanyak'],
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Jam (0-23)")
-        ),
-        text=[f"{int(jam):02d}:00" for jam in jam_per_daerah['jam_terbanyak']],
-        textposition='auto',
-        hovertemplate='<b>%{y}</b><br>Jam Puncak: %{text}<extra></extra>'
-    )])
+    all_locations = sorted(jam_matrix.index)
     
-    fig_jam.update_layout(
-        height=420,
-        showlegend=False,
-        template='plotly_white',
-        font=dict(size=11),
-        xaxis=dict(title='Jam (0-23)', showgrid=True, gridwidth=1, gridcolor='#f0f0f0', range=[0, 24]),
-        yaxis=dict(title='Daerah'),
-        margin=dict(l=150, r=80, t=30, b=50)
-    )
+    # Chart jam puncak top 15 sama dengan chart 5 (figure dari cache)
+    plotly_chart_spec(fig_jam, config={'displayModeBar': False}, key="waktu_chart_1")
     
-    st.plotly_chart(fig_jam, use_container_width=True, config={'displayModeBar': False}, key="waktu_chart_1")
+    # HEATMAP LENGKAP LOKASI x JAM
+    with st.expander(f"🗓️ Heatmap Lokasi x Jam (semua {len(jam_matrix)} daerah)"):
+        def build_hour_heatmap():
+            fig = go.Figure(data=[go.Heatmap(
+                z=jam_matrix.to_numpy(),
+                x=[f"{jam:02d}:00" for jam in jam_matrix.columns],
+                y=jam_matrix.index,
+                colorscale='YlOrRd',
+                colorbar=dict(title="Jumlah"),
+                hovertemplate='<b>%{y}</b><br>Jam %{x}<br>Jumlah Gempa: %{z}<extra></extra>'
+            )])
+            
+            fig.update_layout(
+                height=max(350, 18 * len(jam_matrix) + 80),
+                template=FIGURE_TEMPLATE,
+                font=dict(size=10),
+                xaxis=dict(title='Jam (0-23)', side='top'),
+                yaxis=dict(autorange='reversed'),
+                margin=dict(l=150, r=40, t=50, b=30)
+            )
+            return fig
+        
+        fig_jam_heatmap = cached_figure(figure_cache, "jam_heatmap", (jam_matrix,), figure_theme, build_hour_heatmap)
+        
+        plotly_chart_spec(fig_jam_heatmap, config={'displayModeBar': False}, key="waktu_heatmap")
     
     # DETAIL STATISTIK WAKTU PER DAERAH
     st.markdown('<p class="chart-subtitle" style="margin-top: 1.5rem; margin-bottom: 1rem;">📊 Statistik Waktu Gempa Detail Per Daerah</p>', unsafe_allow_html=True)
@@ -795,17 +978,17 @@ if len(df_filtered) > 0:
         key="select_daerah_waktu"
     )
     
-    # Filter data untuk daerah yang dipilih
-    df_selected_daerah = df_filtered_copy[df_filtered_copy['lokasi'] == selected_daerah_waktu]
+    # Distribusi jam untuk daerah yang dipilih (baris matriks lokasi x jam)
+    jam_counts = jam_matrix.loc[selected_daerah_waktu]
+    jam_counts = jam_counts[jam_counts > 0]
+    total_daerah = int(jam_counts.sum())
     
-    if len(df_selected_daerah) > 0:
+    if total_daerah > 0:
         # Hitung statistik waktu
-        jam_counts = df_selected_daerah['jam'].value_counts().sort_index()
-        jam_mean = df_selected_daerah['jam'].mean()
-        jam_median = df_selected_daerah['jam'].median()
-        jam_mode = df_selected_daerah['jam'].mode()[0] if len(df_selected_daerah['jam'].mode()) > 0 else 0
+        jam_mean = (jam_counts.index * jam_counts).sum() / total_daerah
+        jam_mode = jam_peak.loc[selected_daerah_waktu]
         jam_max_freq = jam_counts.max()
-        jam_max_freq_hour = jam_counts.idxmax()
+        jam_max_freq_hour = jam_mode
         
         # Tampilkan statistik dalam metric cards
         col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
@@ -841,7 +1024,7 @@ if len(df_filtered) > 0:
             st.markdown(f"""
             <div class="metric-card">
                 <div style="font-size: 1.8em; margin-bottom: 0.3rem;">🔢</div>
-                <div class="metric-value">{len(df_selected_daerah)}</div>
+                <div class="metric-value">{total_daerah}</div>
                 <div class="metric-label">Total Gempa</div>
             </div>
             """, unsafe_allow_html=True)
@@ -849,31 +1032,35 @@ if len(df_filtered) > 0:
         # Chart distribusi jam untuk daerah yang dipilih
         st.markdown('<p class="chart-subtitle" style="margin-top: 1.5rem; margin-bottom: 1rem;">Distribusi Gempa Per Jam di {}</p>'.format(selected_daerah_waktu), unsafe_allow_html=True)
         
-        fig_jam_detail = go.Figure(data=[go.Bar(
-            x=jam_counts.index,
-            y=jam_counts.values,
-            marker=dict(
-                color=jam_counts.index,
-                colorscale='Viridis',
-                showscale=True,
-                colorbar=dict(title="Jam")
-            ),
-            text=jam_counts.values,
-            textposition='auto',
-            hovertemplate='<b>Jam %{x}:00</b><br>Jumlah Gempa: %{y}<extra></extra>'
-        )])
+        def build_hour_detail():
+            fig = go.Figure(data=[go.Bar(
+                x=jam_counts.index,
+                y=jam_counts.values,
+                marker=dict(
+                    color=jam_counts.index,
+                    colorscale='Viridis',
+                    showscale=True,
+                    colorbar=dict(title="Jam")
+                ),
+                text=jam_counts.values,
+                textposition='auto',
+                hovertemplate='<b>Jam %{x}:00</b><br>Jumlah Gempa: %{y}<extra></extra>'
+            )])
+            
+            fig.update_layout(
+                height=350,
+                showlegend=False,
+                template=FIGURE_TEMPLATE,
+                font=dict(size=11),
+                xaxis=dict(title='Jam (0-23)', showgrid=True, gridwidth=1, gridcolor='#f0f0f0'),
+                yaxis=dict(title='Jumlah Gempa', showgrid=True, gridwidth=1, gridcolor='#f0f0f0'),
+                margin=dict(l=60, r=80, t=30, b=50)
+            )
+            return fig
         
-        fig_jam_detail.update_layout(
-            height=350,
-            showlegend=False,
-            template='plotly_white',
-            font=dict(size=11),
-            xaxis=dict(title='Jam (0-23)', showgrid=True, gridwidth=1, gridcolor='#f0f0f0'),
-            yaxis=dict(title='Jumlah Gempa', showgrid=True, gridwidth=1, gridcolor='#f0f0f0'),
-            margin=dict(l=60, r=80, t=30, b=50)
-        )
+        fig_jam_detail = cached_figure(figure_cache, "jam_detail", (jam_counts,), figure_theme, build_hour_detail)
         
-        st.plotly_chart(fig_jam_detail, use_container_width=True, config={'displayModeBar': False}, key="waktu_chart_2")
+        plotly_chart_spec(fig_jam_detail, config={'displayModeBar': False}, key="waktu_chart_2")
         
         # Insight untuk daerah yang dipilih
         col_insight_1, col_insight_2 = st.columns(2)
@@ -884,7 +1071,7 @@ if len(df_filtered) > 0:
                 <div class="insight-title">💡 Insight Waktu Gempa {selected_daerah_waktu}</div>
                 <div class="insight-text">
                 • <b>Jam Puncak:</b> Pukul {int(jam_mode):02d}:00 (kemungkinan tertinggi gempa terjadi)<br>
-                • <b>Total Gempa:</b> {len(df_selected_daerah)} kejadian dalam periode ini<br>
+                • <b>Total Gempa:</b> {total_daerah} kejadian dalam periode ini<br>
                 • <b>Rata-rata:</b> Gempa terjadi rata-rata pada pukul {int(jam_mean):02d}:00<br>
                 • <b>Frekuensi Puncak:</b> {jam_max_freq} gempa pada pukul {int(jam_max_freq_hour):02d}:00
                 </div>
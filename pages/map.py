@@ -3,6 +3,15 @@ import pandas as pd
 import requests
 import folium
 from streamlit_folium import st_folium
+from core.catalog import catalog_version
+from core.clustering import build_cluster_levels, index_cluster_levels, get_visible_clusters
+from core.cache import LRUCache
+from core.map_layers import build_cluster_layer, build_swarm_layer, cached_layer
+from core.places import REFERENCE_CITIES
+from core.regions import assign_provinces
+from core.swarms import detect_swarms, SWARM_EPS_KM, SWARM_EPS_DAYS, SWARM_MIN_EVENTS
+from core.spatial_index import build_grid_index, query_bbox, query_radius, bounds_from_folium, snap_bounds
+from ui.declustering import declustering_toggle
 from datetime import datetime, timedelta
 
 # ===========================
@@ -259,6 +268,7 @@ def process_data(df):
     df["magnitudo"] = pd.to_numeric(df["magnitudo"], errors='coerce').round(2)
     df["kedalaman_km"] = pd.to_numeric(df["kedalaman_km"], errors='coerce').round(2)
     df['lokasi'] = df['lokasi'].fillna('Unknown').astype(str).str.strip()
+    df['provinsi'] = assign_provinces(df['latitude'], df['longitude'])
     
     df["waktu"] = pd.to_datetime(df["waktu"], utc=True)
     df["tanggal"] = df["waktu"].dt.strftime("%d-%m-%Y")
@@ -306,6 +316,35 @@ if df is None or df.empty:
     st.error("❌ Gagal memuat data gempa")
     st.stop()
 
+# ===========================
+# CLUSTERING PETA (PER LEVEL ZOOM)
+# ===========================
+@st.cache_resource(max_entries=20)
+def get_map_index(version, filter_spec, _df_map):
+    """Cluster per level zoom + spatial index, di-cache per versi katalog & filter"""
+    cluster_levels = build_cluster_levels(_df_map)
+    level_indexes = index_cluster_levels(cluster_levels)
+    event_index = build_grid_index(_df_map['latitude'], _df_map['longitude'])
+    return cluster_levels, level_indexes, event_index
+
+
+@st.cache_resource(max_entries=20)
+def get_swarms(version, filter_spec, _df_map):
+    """Swarm/sekuens gempa (ST-DBSCAN) pada data peta, di-cache per versi katalog & filter"""
+    return detect_swarms(_df_map)
+
+
+@st.cache_resource(max_entries=5)
+def get_catalog_index(version, _df):
+    """Spatial index seluruh katalog untuk filter radius, sekali per versi katalog"""
+    return build_grid_index(_df['latitude'], _df['longitude'])
+
+
+@st.cache_resource
+def get_map_cache():
+    """Cache script layer peta (per versi katalog, filter, zoom & viewport) dengan batas ukuran"""
+    return LRUCache(max_bytes=64 * 1024 * 1024)
+
 # ===========================
 # HEADER
 # ===========================
@@ -324,6 +363,9 @@ else:
 
 st.markdown('<p class="header-subtitle">Visualisasi Interaktif Lokasi & Aktivitas Gempa Real-time</p>', unsafe_allow_html=True)
 
+# Toggle declustered: buang foreshock & aftershock (label dari cache per versi katalog)
+df, decluster_spec = declustering_toggle(df)
+
 # ===========================
 # FILTER SECTION - COMPACT
 # ===========================
@@ -331,7 +373,7 @@ st.markdown('<p class="filter-header">🔍 FILTER PETA</p>', unsafe_allow_html=T
 
 col1, col2, col3 = st.columns(3, gap="medium")
 
-provinces = sorted(df['lokasi'].dropna().unique().tolist())
+provinces = ["Semua"] + df['provinsi'].cat.remove_unused_categories().cat.categories.tolist()
 min_date_picker = df['waktu'].min().date()
 max_date_picker = df['waktu'].max().date()
 
@@ -388,6 +430,16 @@ with col3:
             date_to = st.date_input("Sampai:", key="periode_to", label_visibility="collapsed", min_value=min_date_picker, max_value=max_date_picker)
         selected_periode_display = f"{date_from.strftime('%d-%m-%Y')} - {date_to.strftime('%d-%m-%Y')}"
 
+# FILTER 4 (OPSIONAL): RADIUS DARI KOTA
+with st.expander("📍 Filter Radius dari Kota (opsional)", expanded=False):
+    col_radius1, col_radius2, col_radius3 = st.columns([0.6, 1.2, 1.2])
+    with col_radius1:
+        use_radius = st.checkbox("Aktifkan", key="radius_enabled")
+    with col_radius2:
+        radius_city = st.selectbox("Kota:", list(REFERENCE_CITIES), key="radius_city", disabled=not use_radius)
+    with col_radius3:
+        radius_km = st.number_input("Radius (km):", min_value=1.0, max_value=2000.0, value=100.0, step=10.0, key="radius_km", disabled=not use_radius)
+
 # Info tentang data range
 st.info(f"📅 **Data tersedia:** {min_date_picker} hingga {max_date_picker}")
 
@@ -421,7 +473,8 @@ df_map = df.copy()
 
 if st.session_state.show_map:
     # Filter Provinsi
-    df_map = df_map[df_map['lokasi'].str.contains(selected_province, case=False, na=False)]
+    if selected_province != "Semua":
+        df_map = df_map[df_map['provinsi'] == selected_province]
     
     # Filter Magnitudo
     df_map = df_map[(df_map['magnitudo'] >= mag_min) & (df_map['magnitudo'] <= mag_max)]
@@ -434,6 +487,15 @@ if st.session_state.show_map:
         date_from_ts = pd.Timestamp(date_from, tz='UTC')
         date_to_ts = pd.Timestamp(date_to, tz='UTC') + pd.Timedelta(days=1)
         df_map = df_map[(df_map['waktu'] >= date_from_ts) & (df_map['waktu'] < date_to_ts)]
+    
+    # Filter Radius (haversine, via spatial index katalog)
+    if use_radius:
+        radius_positions, _ = query_radius(get_catalog_index(catalog_version(df), df), *REFERENCE_CITIES[radius_city], radius_km)
+        df_map = df_map[df_map.index.isin(df.index[radius_positions])]
+
+filter_spec = (selected_province, mag_min, mag_max, selected_periode_display)
+if use_radius:
+    filter_spec += (f"{radius_city} {radius_km:g}km",)
 
 # ===========================
 # DISPLAY RESULTS
@@ -498,44 +560,61 @@ else:
         map_center = [df_map['latitude'].mean(), df_map['longitude'].mean()]
         m = folium.Map(location=map_center, zoom_start=5, tiles="OpenStreetMap")
         
-        def get_color(mag):
-            if mag < 3:
-                return "green"
-            elif mag < 4:
-                return "yellow"
-            elif mag < 5:
-                return "orange"
-            else:
-                return "red"
-        
-        # Add Markers
-        for idx, row in df_map.iterrows():
-            color = get_color(row['magnitudo'])
-            popup_text = f"""
-            <b>Gempa Bumi</b><br>
-            Waktu: {row['waktu_display']}<br>
-            Magnitudo: <b>{row['magnitudo']}</b><br>
-            Kedalaman: {row['kedalaman_km']} km<br>
-            Lokasi: <b>{row['lokasi']}</b>
-            """
-            
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=5 + (row['magnitudo'] * 0.5),
-                popup=folium.Popup(popup_text, max_width=250),
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.7,
-                weight=2
+        if use_radius:
+            folium.Circle(
+                location=REFERENCE_CITIES[radius_city],
+                radius=radius_km * 1000,
+                color="#1e3a5f",
+                weight=2,
+                fill=False,
+                tooltip=f"{radius_km:g} km dari {radius_city}"
             ).add_to(m)
         
+        # Viewport terakhir dari st_folium (zoom & bounds)
+        map_key = "peta_gempa_" + "_".join(str(x) for x in filter_spec)
+        map_state = st.session_state.get(map_key)
+        map_zoom = (map_state or {}).get('zoom') or 5
+        view_bounds = bounds_from_folium(map_state, padding=0)
+        layer_bounds = snap_bounds(view_bounds, map_zoom) if view_bounds is not None else None
+        
+        # Data layer: hanya cluster & titik di dalam viewport untuk zoom saat ini
+        version = catalog_version(df)
+        cluster_levels, level_indexes, event_index = get_map_index(version, filter_spec, df_map)
+        
+        data_layer = folium.FeatureGroup(name="Gempa")
+        cached_layer(
+            get_map_cache(),
+            ("peta", version, filter_spec, map_zoom, layer_bounds),
+            lambda: build_cluster_layer(
+                get_visible_clusters(cluster_levels, map_zoom, layer_bounds, level_indexes), df_map
+            )
+        ).add_to(data_layer)
+        
+        # Layer swarm (ST-DBSCAN ruang-waktu) opsional di atas data layer
+        show_swarms = st.checkbox(
+            "🌀 Tampilkan swarm & sekuens gempa", key="show_swarms",
+            help=f"ST-DBSCAN: minimal {SWARM_MIN_EVENTS} gempa saling berdekatan (≤ {SWARM_EPS_KM:g} km, ≤ {SWARM_EPS_DAYS:g} hari)"
+        )
+        map_layers = [data_layer]
+        if show_swarms:
+            _, swarms = get_swarms(version, filter_spec, df_map)
+            swarm_layer = folium.FeatureGroup(name="Swarm")
+            cached_layer(
+                get_map_cache(),
+                ("swarm", version, filter_spec),
+                lambda: build_swarm_layer(swarms)
+            ).add_to(swarm_layer)
+            map_layers.append(swarm_layer)
+            st.caption(f"🌀 {len(swarms)} swarm/sekuens terdeteksi pada data peta (lingkaran = sebaran gempa dari pusat swarm)")
+        
         # Detailed Legend with Explanations
         legend_html = '''<div style="position: fixed; bottom: 50px; right: 50px; width: 220px;
 background-color: white; border:2px solid #1e3a5f; z-index:9999; font-size:12px; 
 padding: 12px; border-radius: 5px; box-shadow: 0 0 15px rgba(0,0,0,0.3);">
 <p style="margin: 0 0 10px 0; font-weight: bold; color: #1e3a5f; border-bottom: 2px solid #1e3a5f; padding-bottom: 8px;">LEGENDA MAGNITUDO</p>
 
+<p style="margin: 7px 0; font-size: 11px; color: #555;">Lingkaran berangka = cluster (jumlah gempa), warna = magnitudo maksimal</p>
+
 <p style="margin: 7px 0; padding: 5px; background-color: #f0f0f0; border-radius: 3px;">
 <span style="display: inline-block; width: 12px; height: 12px; background-color: green; border-radius: 50%; margin-right: 8px; vertical-align: middle;"></span>
 <b>Magnitudo < 3</b><br>
@@ -559,13 +638,26 @@ padding: 12px; border-radius: 5px; box-shadow: 0 0 15px rgba(0,0,0,0.3);">
 <b>Magnitudo > 5</b><br>
 <span style="margin-left: 20px; font-size: 11px; color: #555;">Gempa Besar - Sangat Terasa</span>
 </p>
-</div>'''
+</div>
+<style>
+.cluster-label {background: transparent; border: none; box-shadow: none; font-weight: bold; color: #1e3a5f;}
+.cluster-label::before {display: none;}
+</style>'''
         m.get_root().html.add_child(folium.Element(legend_html))
         
         # Display Map
         col_empty1, col_map, col_empty2 = st.columns([0.05, 0.9, 0.05])
         with col_map:
-            st_folium(m, width=1000, height=520)
+            if view_bounds is not None:
+                n_in_view = len(query_bbox(event_index, *view_bounds))
+                st.caption(f"🔎 {n_in_view:,} gempa di area peta saat ini (zoom {map_zoom})")
+            
+            # Base map tetap, hanya data layer yang di-render ulang saat pan/zoom
+            st_folium(
+                m, width=1000, height=520, key=map_key,
+                feature_group_to_add=map_layers,
+                returned_objects=["zoom", "bounds"]
+            )
         
         st.markdown("---")
         
@@ -5,6 +5,18 @@ import requests
 import folium
 from folium.plugins import HeatMap
 from streamlit_folium import st_folium
+from core.anomaly import RateAnomalyDetector, rate_alerts, ANOMALY_WINDOW_DAYS, ANOMALY_Z_ALERT, CUSUM_DAYS
+from core.binning import heatmap_grid, build_geohash_levels, GEOHASH_PRECISIONS, GEOHASH_CELL_SIZE
+from core.cache import LRUCache
+from core.catalog import catalog_version, files_version
+from core.figures import cached_figure, FIGURE_TEMPLATE
+from core.gutenberg_richter import GutenbergRichterModel, exceedance_probabilities, exceedance_column, MIN_EVENTS, EXCEEDANCE_MAGNITUDES, EXCEEDANCE_HORIZONS_DAYS
+from core.map_layers import cached_layer
+from core.regions import assign_provinces
+from core.risk import RiskAggregates, compute_grid_risk_scores, build_time_profile, time_weighted_scores, apply_risk_model, risk_model_key, GRID_RISK_RESOLUTIONS, DECAY_HALF_LIFE_DAYS, ROLLING_WINDOWS_DAYS, RISK_MODELS, DEFAULT_RISK_MODEL
+from core.spatial_index import build_grid_index, query_bbox, bounds_from_folium, snap_bounds
+from ui.charts import plotly_chart_spec
+from ui.declustering import declustering_toggle
 import plotly.graph_objects as go
 from datetime import datetime
 
@@ -110,7 +122,7 @@ st.markdown("""
         padding: 1.2rem;
         border-bottom: 1px solid #e0e0e0;
         display: grid;
-        grid-template-columns: 0.5fr 2.5fr 1fr 1.2fr;
+        grid-template-columns: 0.5fr 2.5fr 1fr 1fr 1.2fr;
         gap: 1rem;
         align-items: center;
         transition: background-color 0.2s;
@@ -137,6 +149,12 @@ st.markdown("""
         font-size: 1em;
     }
     
+    .risk-bvalue {
+        font-size: 0.9em;
+        color: #555;
+        text-align: center;
+    }
+    
     .risk-score {
         font-weight: 700;
         font-size: 1.3em;
@@ -331,21 +349,21 @@ st.markdown("""
 # LOAD DATA - EXCEL + BMKG COMBINED (SAME AS APP.PY)
 # ===========================
 
+EXCEL_FILES = [
+    "data/DataGempaAgustus2025.xlsx",
+    "data/DataGempaDesember2025.xlsx",
+    "data/DataGempaJuni2025.xlsx",
+    "data/DataGempaNovember2025.xlsx",
+    "data/DataGempaOktober2025.xlsx",
+    "data/DataGempaSeptember2025.xlsx"
+]
+
 @st.cache_data
-def load_data_excel():
-    """Load data dari 6 file Excel (Aug-Dec 2025)"""
+def load_data_excel(version):
+    """Load data dari 6 file Excel (Aug-Dec 2025); version (files_version) membuat cache dimuat ulang saat file berubah"""
     try:
-        files = [
-            "data/DataGempaAgustus2025.xlsx",
-            "data/DataGempaDesember2025.xlsx",
-            "data/DataGempaJuni2025.xlsx",
-            "data/DataGempaNovember2025.xlsx",
-            "data/DataGempaOktober2025.xlsx",
-            "data/DataGempaSeptember2025.xlsx"
-        ]
-        
         dfs = []
-        for file in files:
+        for file in EXCEL_FILES:
             try:
                 df_temp = pd.read_excel(file, header=1)
                 dfs.append(df_temp)
@@ -462,6 +480,7 @@ def process_data(df):
     df["magnitudo"] = pd.to_numeric(df["magnitudo"], errors='coerce').round(2)
     df["kedalaman_km"] = pd.to_numeric(df["kedalaman_km"], errors='coerce').round(2)
     df['lokasi'] = df['lokasi'].fillna('Unknown').astype(str).str.strip()
+    df['provinsi'] = assign_provinces(df['latitude'], df['longitude'])
     
     df["waktu"] = pd.to_datetime(df["waktu"], utc=True)
     df["bulan"] = df["waktu"].dt.strftime("%b %Y")
@@ -473,10 +492,10 @@ def process_data(df):
     return df
 
 
-def load_data():
+def load_data(excel_version):
     """Load data combined: Excel (Aug-Dec 2025) + BMKG (1 Jan - hari ini)"""
     
-    df_excel = load_data_excel()
+    df_excel = load_data_excel(excel_version)
     df_bmkg = load_data_bmkg()
     
     if df_excel is not None and df_bmkg is not None:
@@ -503,7 +522,8 @@ def load_data():
 
 
 # Load data
-df, data_source, is_combined = load_data()
+excel_version = files_version(EXCEL_FILES)
+df, data_source, is_combined = load_data(excel_version)
 
 if df is None or df.empty:
     st.error("❌ Gagal memuat data gempa")
@@ -512,73 +532,108 @@ if df is None or df.empty:
 # ===========================
 # RISK SCORING ALGORITHM
 # ===========================
-@st.cache_data
-def calculate_risk_scores(df_data):
-    """Calculate risk scores for each location with data source breakdown"""
-    if df_data.empty:
-        return pd.DataFrame()
-    
-    risk_scores = []
-    
-    for lokasi in df_data['lokasi'].unique():
-        df_lokasi = df_data[df_data['lokasi'] == lokasi]
-        
-        # Calculate metrics
-        total_gempa = len(df_lokasi)
-        mag_mean = df_lokasi['magnitudo'].mean()
-        mag_max = df_lokasi['magnitudo'].max()
-        high_mag_count = len(df_lokasi[df_lokasi['magnitudo'] >= 5])
-        kedalaman_mean = df_lokasi['kedalaman_km'].mean()
-        kedalaman_min = df_lokasi['kedalaman_km'].min()
-        
-        # Data source breakdown
-        source_breakdown = df_lokasi['source'].value_counts().to_dict()
-        excel_count = source_breakdown.get('Excel (Historical)', 0)
-        bmkg_count = source_breakdown.get('BMKG Real-time', 0)
-        
-        # Risk score calculation
-        frequency_score = min(total_gempa / 100, 10)
-        intensity_score = mag_mean if not pd.isna(mag_mean) else 0
-        high_mag_score = min(high_mag_count / 10, 10)
-        
-        risk_score = (frequency_score * 0.35) + (intensity_score * 0.4) + (high_mag_score * 0.25)
-        risk_score = min(risk_score, 10)
-        
-        # Risk level classification
-        if risk_score >= 8:
-            risk_level, risk_color = "🔴 VERY HIGH", "very-high"
-        elif risk_score >= 6:
-            risk_level, risk_color = "🟠 HIGH", "high"
-        elif risk_score >= 4:
-            risk_level, risk_color = "🟡 MEDIUM", "medium"
-        elif risk_score >= 2:
-            risk_level, risk_color = "🟢 LOW", "low"
-        else:
-            risk_level, risk_color = "🔵 VERY LOW", "very-low"
-        
-        risk_scores.append({
-            'lokasi': lokasi,
-            'total_gempa': total_gempa,
-            'excel_count': excel_count,
-            'bmkg_count': bmkg_count,
-            'mag_mean': mag_mean,
-            'mag_max': mag_max,
-            'high_mag_count': high_mag_count,
-            'kedalaman_mean': kedalaman_mean,
-            'kedalaman_min': kedalaman_min,
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'risk_color': risk_color,
-            'lat_mean': df_lokasi['latitude'].mean(),
-            'lon_mean': df_lokasi['longitude'].mean()
-        })
-    
-    risk_df = pd.DataFrame(risk_scores).sort_values('risk_score', ascending=False).reset_index(drop=True)
-    risk_df['rank'] = range(1, len(risk_df) + 1)
-    
-    return risk_df
-
-risk_df = calculate_risk_scores(df)
+@st.cache_resource
+def get_risk_aggregates(decluster_spec):
+    """Agregat risk per lokasi (terpisah untuk katalog penuh & declustered), di-update inkremental saat snapshot BMKG berubah"""
+    return RiskAggregates()
+
+
+@st.cache_resource
+def get_anomaly_detector(decluster_spec):
+    """Detektor anomali laju gempa per provinsi (penuh / declustered), di-update inkremental saat snapshot BMKG berubah"""
+    return RateAnomalyDetector()
+
+# Mode skor: per lokasi (label BMKG) atau per sel grid tetap
+RISK_MODES = {"Per Lokasi": None, **{f"Grid Sel {cell_deg:g}°": cell_deg for cell_deg in GRID_RISK_RESOLUTIONS}}
+
+@st.cache_resource(max_entries=20)
+def get_grid_risk(version, cell_deg, _df_events):
+    """Risk score per sel grid + label sel setiap gempa, di-cache per versi katalog & resolusi"""
+    return compute_grid_risk_scores(_df_events, cell_deg)
+
+
+def get_mode_scores(mode):
+    """(tabel risk score, unit skor setiap gempa) untuk mode skor yang dipilih"""
+    cell_deg = RISK_MODES[mode]
+    if cell_deg is None:
+        return risk_df, df['lokasi'].to_numpy()
+    return get_grid_risk(catalog_version(df), cell_deg, df)
+
+
+# Horizon waktu: semua data, decay eksponensial, atau jendela bergulir
+RISK_HORIZONS = {
+    "Semua Data": None,
+    f"Decay (half-life {DECAY_HALF_LIFE_DAYS} hari)": {'half_life_days': DECAY_HALF_LIFE_DAYS},
+    **{f"{days} Hari Terakhir": {'window_days': days} for days in ROLLING_WINDOWS_DAYS}
+}
+
+@st.cache_resource(max_entries=20)
+def get_time_profile(version, mode, _df_events, _event_units):
+    """Profil waktu (cumsum per unit skor), di-cache per versi katalog & mode skor"""
+    return build_time_profile(_df_events, _event_units)
+
+
+def apply_horizon(mode_risk_df, mode, horizon):
+    """Skor ulang tabel mode skor sesuai horizon waktu (agregat mentah tidak dihitung ulang)"""
+    params = RISK_HORIZONS[horizon]
+    if params is None:
+        return mode_risk_df
+    _, event_units = get_mode_scores(mode)
+    profile = get_time_profile(catalog_version(df), mode, df, event_units)
+    return time_weighted_scores(mode_risk_df, profile, cell_deg=RISK_MODES[mode], **params)
+
+
+@st.cache_resource(max_entries=20)
+def get_horizon_scores(version, mode, horizon):
+    """Tabel risk (dengan kolom input skor) per mode & horizon, di-cache per versi katalog"""
+    mode_risk_df, _ = get_mode_scores(mode)
+    return apply_horizon(mode_risk_df, mode, horizon)
+
+
+@st.cache_resource(max_entries=50)
+def get_model_scores(version, mode, horizon, model_key, _model):
+    """Skor model risk: hanya membobot ulang input skor yang ter-cache, tanpa scan gempa"""
+    return apply_risk_model(get_horizon_scores(version, mode, horizon), _model)
+
+
+def filter_risk_scores(mode, location, risk_level, horizon, model):
+    """Tabel risk score hasil filter, dari skor ter-cache katalog yang sedang ditampilkan"""
+    risk_filtered = get_model_scores(catalog_version(df), mode, horizon, risk_model_key(model), model).copy()
+    if location != "Semua":
+        risk_filtered = risk_filtered[risk_filtered['lokasi'] == location]
+    if risk_level != "Semua":
+        risk_filtered = risk_filtered[risk_filtered['risk_level'] == risk_level]
+    return risk_filtered
+
+
+@st.cache_resource(max_entries=20)
+def get_gutenberg_richter(mode, decluster_spec):
+    """Fit G-R (Mc, b-value, a-value) per unit skor, di-update inkremental saat snapshot BMKG berubah"""
+    return GutenbergRichterModel()
+
+@st.cache_resource(max_entries=20)
+def get_heatmap_grid(version, filter_spec, weighting, _df_heatmap):
+    """Grid heatmap 0.05° berbobot + spatial index sel, di-cache per versi katalog & filter"""
+    grid = heatmap_grid(_df_heatmap, weighting=weighting)
+    return grid, build_grid_index(grid['latitude'], grid['longitude'])
+
+
+@st.cache_resource(max_entries=20)
+def get_geohash_levels(version, filter_spec, _df_events):
+    """Statistik sel geohash semua presisi, di-cache per versi katalog & filter"""
+    return build_geohash_levels(_df_events)
+
+
+@st.cache_resource
+def get_map_cache():
+    """Cache script layer heatmap (per versi katalog, filter, zoom & viewport) dengan batas ukuran"""
+    return LRUCache(max_bytes=64 * 1024 * 1024)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Cache figure Plotly (per id chart, hash agregat & tema) dengan batas ukuran"""
+    return LRUCache(max_bytes=16 * 1024 * 1024)
 
 # ===========================
 # HEADER
@@ -598,16 +653,35 @@ else:
 
 st.markdown('<p class="header-subtitle">Sistem Evaluasi Risiko Gempa untuk Pengambilan Keputusan Mitigasi Bencana</p>', unsafe_allow_html=True)
 
+# Toggle declustered: buang foreshock & aftershock (label dari cache per versi katalog)
+df, decluster_spec = declustering_toggle(df)
+
+# Agregat inkremental terpisah per katalog (penuh / declustered per metode). Data historis
+# hanya diagregasi ulang saat file Excel berubah; pada katalog declustered gempa Excel yang
+# tersisa bergantung label seluruh katalog, jadi versi katalog ikut menjadi versi data historis
+catalog_spec = decluster_spec or "Katalog Penuh"
+static_token = excel_version if decluster_spec is None else (excel_version, catalog_version(df))
+risk_df = get_risk_aggregates(decluster_spec).sync(df, static_token)
+anomalies = get_anomaly_detector(decluster_spec).sync(df, static_token).evaluate()
+
 # ===========================
 # FILTER & SEARCH
 # ===========================
 st.markdown('<div class="section">', unsafe_allow_html=True)
 
-col_f1, col_f2, col_f3 = st.columns([2.5, 2.5, 1.2])
+col_f0, col_f1, col_f2, col_f3 = st.columns([1.8, 2.5, 2.5, 1.2])
+
+with col_f0:
+    st.markdown("**🧮 Mode Skor**")
+    selected_mode = st.selectbox(
+        "Mode Skor", list(RISK_MODES), label_visibility="collapsed", key="risk_mode",
+        help="Grid Sel: skor per sel lat/lon tetap, dihaluskan dengan sel tetangga"
+    )
+    mode_risk_df, _ = get_mode_scores(selected_mode)
 
 with col_f1:
     st.markdown("**📍 Pilih Lokasi**")
-    unique_locs = sorted([str(x) for x in risk_df['lokasi'].unique()])
+    unique_locs = sorted([str(x) for x in mode_risk_df['lokasi'].unique()])
     locations = ["Semua"] + unique_locs
     selected_location = st.selectbox("Lokasi", locations, label_visibility="collapsed", key="risk_loc")
 
@@ -620,31 +694,263 @@ with col_f3:
     st.markdown("**🔍**")
     search_button = st.button("🔍 CARI", use_container_width=True, type="primary")
 
+selected_horizon = st.radio(
+    "⏱️ Horizon Waktu",
+    list(RISK_HORIZONS),
+    horizontal=True,
+    key="risk_horizon",
+    help="Decay: bobot gempa berkurang setengah setiap half-life. Jendela: hanya gempa N hari terakhir "
+         "(dinormalisasi ke rentang katalog). Diukur dari gempa terbaru di katalog."
+)
+
+col_m1, col_m2 = st.columns([1.8, 6.2])
+
+with col_m1:
+    selected_model_name = st.selectbox(
+        "⚙️ Model Risk", [*RISK_MODELS, "Kustom"], key="risk_model",
+        help="Bobot komponen, batas skor & threshold kategori risiko"
+    )
+
+with col_m2:
+    if selected_model_name == "Kustom":
+        with st.expander("⚙️ Atur Model Risk Kustom", expanded=True):
+            col_w1, col_w2, col_w3 = st.columns(3)
+            weight_frequency = col_w1.slider("Bobot Frekuensi", 0.0, 1.0, DEFAULT_RISK_MODEL['weights']['frequency'], 0.05, key="model_w_frequency")
+            weight_intensity = col_w2.slider("Bobot Magnitudo Rata-rata", 0.0, 1.0, DEFAULT_RISK_MODEL['weights']['intensity'], 0.05, key="model_w_intensity")
+            weight_high_mag = col_w3.slider("Bobot Gempa M≥5", 0.0, 1.0, DEFAULT_RISK_MODEL['weights']['high_mag'], 0.05, key="model_w_high_mag")
+            
+            col_c1, col_c2, col_c3 = st.columns(3)
+            frequency_per_point = col_c1.number_input("Gempa per 1 poin frekuensi", 1, 10000, DEFAULT_RISK_MODEL['frequency_per_point'], key="model_frequency_per_point")
+            high_mag_per_point = col_c2.number_input("Gempa M≥5 per 1 poin", 1, 1000, DEFAULT_RISK_MODEL['high_mag_per_point'], key="model_high_mag_per_point")
+            component_cap = col_c3.number_input("Batas skor per komponen", 1, 100, DEFAULT_RISK_MODEL['component_cap'], key="model_component_cap")
+            
+            col_t = st.columns(4)
+            thresholds = [
+                col.number_input(f"Batas bawah {label}", 0.0, float(DEFAULT_RISK_MODEL['score_cap']), float(default), 0.5, key=f"model_threshold_{idx}")
+                for idx, (col, label, default) in enumerate(zip(col_t, ["VERY HIGH", "HIGH", "MEDIUM", "LOW"], DEFAULT_RISK_MODEL['thresholds']))
+            ]
+        
+        selected_model = {
+            **DEFAULT_RISK_MODEL,
+            'weights': {'frequency': weight_frequency, 'intensity': weight_intensity, 'high_mag': weight_high_mag},
+            'frequency_per_point': frequency_per_point,
+            'high_mag_per_point': high_mag_per_point,
+            'component_cap': component_cap,
+            'thresholds': sorted(thresholds, reverse=True)
+        }
+    else:
+        selected_model = RISK_MODELS[selected_model_name]
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # Apply Filters
 if search_button:
-    risk_filtered = risk_df.copy()
-    if selected_location != "Semua":
-        risk_filtered = risk_filtered[risk_filtered['lokasi'] == selected_location]
-    if selected_risk_level != "Semua":
-        risk_filtered = risk_filtered[risk_filtered['risk_level'] == selected_risk_level]
+    model_key = risk_model_key(selected_model)
+    risk_filtered = filter_risk_scores(selected_mode, selected_location, selected_risk_level, selected_horizon, selected_model)
     
     st.session_state.search_performed = True
     st.session_state.filtered_data = risk_filtered
+    st.session_state.risk_page = 1
+    st.session_state.risk_model_spec = selected_model
+    st.session_state.risk_filter_spec = (selected_mode, selected_location, selected_risk_level, selected_horizon,
+                                         f"{selected_model_name}-{abs(hash(model_key)) % 10 ** 8:08d}", catalog_spec)
 else:
     if 'search_performed' not in st.session_state:
         st.session_state.search_performed = False
         st.session_state.filtered_data = pd.DataFrame()
+        st.session_state.risk_model_spec = DEFAULT_RISK_MODEL
+        st.session_state.risk_filter_spec = ("Per Lokasi", "Semua", "Semua", "Semua Data", "Standar", catalog_spec)
+    elif st.session_state.risk_filter_spec[-1] != catalog_spec:
+        # Toggle declustered berubah sejak pencarian: hitung ulang hasil dengan filter yang sama dari katalog yang ditampilkan
+        mode, location, risk_level, horizon = st.session_state.risk_filter_spec[:4]
+        if st.session_state.search_performed:
+            st.session_state.filtered_data = filter_risk_scores(mode, location, risk_level, horizon, st.session_state.risk_model_spec)
+        st.session_state.risk_filter_spec = (*st.session_state.risk_filter_spec[:-1], catalog_spec)
 
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
+# ===========================
+# RISK TABLE (PAGINATION & DETAIL PANEL)
+# ===========================
+RISK_PAGE_SIZES = [25, 50, 100]
+
+
+def gr_summary(row):
+    """Teks ringkas b-value, detail fit G-R & probabilitas untuk satu baris risk"""
+    if pd.isna(row['b_value']):
+        return "b = –", f"Data tidak cukup (butuh ≥ {MIN_EVENTS} gempa di atas Mc)", "–"
+    
+    b_text = f"b = {row['b_value']:.2f}<br><span style=\"font-size: 0.8em; color: #999;\">95% CI {row['b_ci_low']:.2f}–{row['b_ci_high']:.2f}</span>"
+    gr_text = (f"b = <b>{row['b_value']:.2f}</b> (95% CI {row['b_ci_low']:.2f}–{row['b_ci_high']:.2f}), "
+               f"a = <b>{row['a_value']:.2f}</b>, Mc = <b>{row['mc']:.1f}</b> ({int(row['mc_events'])} gempa ≥ Mc)")
+    prob_text = ", ".join(
+        f"M≥{mag:g} {days} hari: <b>{row[exceedance_column(mag, days)]:.0%}</b>"
+        for mag in EXCEEDANCE_MAGNITUDES for days in EXCEEDANCE_HORIZONS_DAYS
+    )
+    return b_text, gr_text, prob_text
+
+
+def risk_row_html(row):
+    """Satu baris tabel risk (HTML), di-render bersama satu halaman dalam satu markdown"""
+    b_text, _, _ = gr_summary(row)
+    return f"""
+    <div class="risk-row">
+        <div class="risk-rank">#{int(row['rank'])}</div>
+        <div class="risk-location">{row['lokasi']}</div>
+        <div class="risk-score score-{row['risk_color']}">{row['risk_score']:.2f}/10</div>
+        <div class="risk-bvalue">{b_text}</div>
+        <div class="badge badge-{row['risk_color']}">{row['risk_level']}</div>
+    </div>
+    """
+
+
+def render_risk_detail(row):
+    """Detail lengkap & rekomendasi mitigasi, hanya untuk lokasi yang dibuka"""
+    _, gr_text, prob_text = gr_summary(row)
+    
+    st.markdown('<div class="detail-card">', unsafe_allow_html=True)
+    st.markdown(f'<p class="detail-title">{row["lokasi"]} - Risk Score {row["risk_score"]:.2f}/10 {row["risk_level"]}</p>', unsafe_allow_html=True)
+    
+    col_d1, col_d2 = st.columns(2)
+    
+    with col_d1:
+        st.markdown(f"""
+        <div class="detail-row">
+            <div class="detail-label">🔢 Total Gempa:</div>
+            <div class="detail-value"><b>{int(row['total_gempa'])}</b> kejadian</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">📊 Data Source:</div>
+            <div class="detail-value">
+                <span class="source-badge source-excel">Excel: {int(row['excel_count'])}</span>
+                <span class="source-badge source-bmkg">BMKG: {int(row['bmkg_count'])}</span>
+            </div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">📈 Magnitudo Rata-rata:</div>
+            <div class="detail-value"><b>{row['mag_mean']:.2f}</b> Skala Richter</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">⚡ Magnitudo Maksimal:</div>
+            <div class="detail-value"><b>{row['mag_max']:.2f}</b> Skala Richter</div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col_d2:
+        st.markdown(f"""
+        <div class="detail-row">
+            <div class="detail-label">🔴 Gempa > Mag 5:</div>
+            <div class="detail-value"><b>{int(row['high_mag_count'])}</b> kejadian (Sangat Berbahaya)</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">📍 Kedalaman Rata-rata:</div>
+            <div class="detail-value"><b>{row['kedalaman_mean']:.1f}</b> km</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">🎯 Kedalaman Minimum:</div>
+            <div class="detail-value"><b>{row['kedalaman_min']:.1f}</b> km (Superfisial)</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">📐 Gutenberg-Richter:</div>
+            <div class="detail-value">{gr_text}</div>
+        </div>
+        <div class="detail-row">
+            <div class="detail-label">🎲 Peluang Gempa Besar:</div>
+            <div class="detail-value">{prob_text}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # DETAILED RECOMMENDATIONS
+    st.markdown('<div class="rec-section">', unsafe_allow_html=True)
+    st.markdown('<p class="rec-title">🎯 Rekomendasi Mitigasi Bencana Gempa</p>', unsafe_allow_html=True)
+    
+    if row['risk_color'] == 'very-high':
+        st.markdown("""
+        <p class="rec-category">🔴 PRIORITAS TERTINGGI - Wilayah Dengan Risiko Sangat Tinggi</p>
+        <p class="rec-text">Lokasi ini menunjukkan aktivitas seismik yang sangat intensif dengan frekuensi tinggi dan potensi gempa besar yang signifikan. Tindakan mitigasi dan preparedness harus dilakukan segera dan berkelanjutan:</p>
+        <div class="rec-item">• <b>Sistem Peringatan Dini (Early Warning System):</b> Implementasi sistem monitoring gempa real-time yang terintegrasi dengan sensor lokal. Sistem harus mampu mendeteksi gempa dalam hitungan detik dan mengirimkan peringatan ke masyarakat melalui berbagai channel (SMS, sirene, aplikasi mobile).</div>
+        <div class="rec-item">• <b>Infrastruktur Tahan Gempa:</b> Bangun dan perkuat shelter tahan gempa serta ruang evakuasi aman di setiap desa/kelurahan. Standar konstruksi harus mengikuti SNI 1726 dan memiliki kapasitas mencukupi untuk seluruh populasi.</div>
+        <div class="rec-item">• <b>Program Edukasi Keselamatan Gempa:</b> Jalankan program edukasi intensif di sekolah, kantor, dan komunitas. Materi mencakup cara berlindung saat gempa, rencana evakuasi keluarga, dan pengenalan zona aman.</div>
+        <div class="rec-item">• <b>Penguatan Infrastruktur Kritis:</b> Perkuat bangunan pemerintah, rumah sakit, kantor polisi, dan fasilitas publik lainnya agar tetap berfungsi pasca gempa untuk koordinasi tanggap darurat.</div>
+        <div class="rec-item">• <b>Simulasi Evakuasi Rutin:</b> Lakukan simulasi gempa dan evakuasi setiap bulan di sekolah, kantor, dan komunitas untuk memastikan semua orang paham prosedur dan dapat melakukannya dalam keadaan darurat.</div>
+        <div class="rec-item">• <b>Tim Respons Darurat 24/7:</b> Bentuk dan latih tim respons darurat yang siaga sepanjang waktu dengan peralatan dan logistik lengkap untuk respons cepat pasca gempa.</div>
+        <div class="rec-item">• <b>Koordinasi dengan BMKG & TNI:</b> Jalin koordinasi kuat dengan Badan Meteorologi, Klimatologi, dan Geofisika (BMKG) dan TNI untuk monitoring, respons, dan rehabilitasi.</div>
+        """, unsafe_allow_html=True)
+    
+    elif row['risk_color'] == 'high':
+        st.markdown("""
+        <p class="rec-category">🟠 PRIORITAS TINGGI - Wilayah Dengan Risiko Tinggi</p>
+        <p class="rec-text">Lokasi ini memiliki aktivitas seismik yang signifikan dengan potensi kerusakan sedang hingga berat. Tindakan preventif dan preparedness harus diperkuat:</p>
+        <div class="rec-item">• <b>Perbaikan Sistem Peringatan Gempa:</b> Tingkatkan efektivitas sistem peringatan gempa yang ada dengan memperbanyak sensor dan meningkatkan aksesibilitas informasi peringatan.</div>
+        <div class="rec-item">• <b>Rehabilitasi Bangunan Tidak Tahan Gempa:</b> Identifikasi dan rehabilitasi bangunan lama yang tidak memenuhi standar tahan gempa, terutama sekolah dan rumah sakit.</div>
+        <div class="rec-item">• <b>Program Edukasi untuk Institusi:</b> Lakukan program edukasi keselamatan gempa khusus untuk sekolah, kantor, dan institusi publik dengan frekuensi minimal 1 tahun sekali.</div>
+        <div class="rec-item">• <b>Pelatihan Respons Darurat:</b> Selenggarakan pelatihan respons darurat untuk staff BPBD, polisi, petugas kesehatan, dan relawan minimal 2 kali per tahun.</div>
+        <div class="rec-item">• <b>Pemetaan Risiko Detail:</b> Buat pemetaan risiko detail per blok/kelurahan untuk menentukan zona evakuasi dan lokasi shelter yang optimal.</div>
+        <div class="rec-item">• <b>Monitoring Berkelanjutan:</b> Jalin kerja sama dengan BMKG untuk monitoring aktivitas seismik berkelanjutan dan update informasi risiko secara berkala.</div>
+        """, unsafe_allow_html=True)
+    
+    elif row['risk_color'] == 'medium':
+        st.markdown("""
+        <p class="rec-category">🟡 PRIORITAS SEDANG - Wilayah Dengan Risiko Sedang</p>
+        <p class="rec-text">Lokasi ini memiliki aktivitas seismik dengan potensi kerusakan ringan hingga sedang. Tindakan preparedness dasar perlu diterapkan:</p>
+        <div class="rec-item">• <b>Penguatan Kode Bangunan:</b> Pastikan pembangunan baru mengikuti standar tahan gempa SNI 1726. Lakukan edukasi kepada kontraktor dan pemilik bangunan tentang pentingnya standar konstruksi.</div>
+        <div class="rec-item">• <b>Program Edukasi Dasar:</b> Jalankan program edukasi keselamatan gempa dasar di sekolah dan komunitas minimal 1 tahun sekali.</div>
+        <div class="rec-item">• <b>Pelatihan Respons Tahunan:</b> Lakukan pelatihan respons darurat untuk pemerintah lokal, polisi, dan relawan minimal 1 tahun sekali.</div>
+        <div class="rec-item">• <b>Identifikasi Zona Evakuasi:</b> Tentukan zona aman dan zona evakuasi untuk diketahui masyarakat luas melalui peta dan tanda-tanda di lapangan.</div>
+        <div class="rec-item">• <b>Kesiapan Logistik Dasar:</b> Siapkan logistik darurat dasar (tenda, obat, makanan) untuk respons cepat pasca gempa.</div>
+        """, unsafe_allow_html=True)
+    
+    else:
+        st.markdown("""
+        <p class="rec-category">🟢 PRIORITAS MONITOR - Wilayah Dengan Risiko Rendah</p>
+        <p class="rec-text">Lokasi ini memiliki aktivitas seismik rendah namun tetap perlu monitoring dan preparedness dasar:</p>
+        <div class="rec-item">• <b>Monitoring Berkelanjutan:</b> Tetap melakukan monitoring aktivitas seismik melalui data BMKG untuk early detection jika ada peningkatan aktivitas.</div>
+        <div class="rec-item">• <b>Program Edukasi Awareness:</b> Jalankan program edukasi awareness umum tentang gempa bumi dan keselamatan dasar, minimal 1 tahun sekali.</div>
+        <div class="rec-item">• <b>Persiapan Keselamatan Umum:</b> Siapkan kit keselamatan dasar (first aid, lampu darurat, air minum) di rumah dan kantor.</div>
+        <div class="rec-item">• <b>Update Rencana Darurat:</b> Tinjau dan update rencana darurat sesuai dengan data seismik terbaru dari BMKG.</div>
+        <div class="rec-item">• <b>Koordinasi Lokal:</b> Jalin koordinasi dengan pemerintah lokal dan BMKG untuk mendapatkan update informasi gempa terbaru.</div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# ===========================
+# ANOMALI LAJU SEISMISITAS
+# ===========================
+st.markdown('<div class="section">', unsafe_allow_html=True)
+st.markdown('<p class="section-title">📈 Anomali Laju Seismisitas</p>', unsafe_allow_html=True)
+st.markdown(f'<p class="section-subtitle">Jumlah gempa {ANOMALY_WINDOW_DAYS} hari terakhir per provinsi dibanding laju normalnya (Poisson z-score & CUSUM {CUSUM_DAYS} hari)</p>', unsafe_allow_html=True)
+
+anomaly_alerts = rate_alerts(anomalies)
+if anomaly_alerts.empty:
+    st.success(f"✅ Tidak ada provinsi dengan lonjakan aktivitas seismik dalam {ANOMALY_WINDOW_DAYS} hari terakhir")
+else:
+    st.warning(f"⚠️ {len(anomaly_alerts)} provinsi menunjukkan peningkatan aktivitas seismik (🔴 z ≥ {ANOMALY_Z_ALERT:g})")
+
+with st.expander("📋 Laju Seismisitas Semua Provinsi", expanded=not anomaly_alerts.empty):
+    display_df = anomalies.round(2).rename(columns={
+        'wilayah': 'Provinsi', 'recent_count': f'Gempa {ANOMALY_WINDOW_DAYS} Hari', 'expected': 'Normal (Ekspektasi)',
+        'baseline_rate': 'Laju Baseline / Hari', 'rate_ratio': 'Rasio Laju', 'z_score': 'Z-Score',
+        'cusum': 'CUSUM', 'status': 'Status'
+    })
+    st.dataframe(display_df, use_container_width=True, hide_index=True, height=320)
+
+st.markdown('</div>', unsafe_allow_html=True)
+
 # ===========================
 # SHOW RESULTS ONLY IF SEARCH PERFORMED
 # ===========================
 if st.session_state.search_performed and not st.session_state.filtered_data.empty:
     risk_filtered = st.session_state.filtered_data
     
+    # b-value Gutenberg-Richter & probabilitas Poisson per unit skor, ditampilkan di samping risk score
+    risk_mode = st.session_state.risk_filter_spec[0]
+    _, event_units = get_mode_scores(risk_mode)
+    gr_table = get_gutenberg_richter(risk_mode, decluster_spec).sync(df, event_units)
+    gr_table = gr_table.join(exceedance_probabilities(gr_table, days_span))
+    risk_filtered = risk_filtered.join(gr_table.drop(columns='gr_events'), on='lokasi')
+    
     # ===========================
     # STATISTICS
     # ===========================
@@ -653,22 +959,19 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
     
     col_metrics = st.columns(5)
     
-    high_risk_count = len(risk_filtered[risk_filtered['risk_score'] >= 8])
-    high_plus_count = len(risk_filtered[risk_filtered['risk_score'] >= 6])
+    high_risk_count = int((risk_filtered['risk_color'] == 'very-high').sum())
+    high_plus_count = int(risk_filtered['risk_color'].isin(['very-high', 'high']).sum())
     total_locations = len(risk_filtered)
     avg_risk = risk_filtered['risk_score'].mean()
     highest_risk_loc = risk_filtered.iloc[0]['lokasi']
     highest_risk_score = risk_filtered.iloc[0]['risk_score']
     
-    # Determine color untuk highest risk
-    if highest_risk_score >= 8:
-        score_color = "#dc3545"
-    elif highest_risk_score >= 6:
-        score_color = "#fd7e14"
-    elif highest_risk_score >= 4:
-        score_color = "#ffc107"
-    else:
-        score_color = "#28a745"
+    # Determine color untuk highest risk (kategori mengikuti threshold model risk)
+    score_color = {
+        'very-high': "#dc3545",
+        'high': "#fd7e14",
+        'medium': "#ffc107"
+    }.get(risk_filtered.iloc[0]['risk_color'], "#28a745")
     
     metrics_data = [
         ("Total Lokasi", f"{total_locations}", "📍"),
@@ -710,12 +1013,14 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
     st.markdown('<p class="section-title">📋 Risk Score Legend</p>', unsafe_allow_html=True)
     
     col_legend = st.columns(5)
+    risk_model = st.session_state.risk_model_spec
+    bounds = [float(risk_model['score_cap']), *sorted(risk_model['thresholds'], reverse=True), 0.0]
     legend_items = [
-        ("🔴 VERY HIGH", "8.0 - 10.0", "#dc3545"),
-        ("🟠 HIGH", "6.0 - 7.9", "#fd7e14"),
-        ("🟡 MEDIUM", "4.0 - 5.9", "#ffc107"),
-        ("🟢 LOW", "2.0 - 3.9", "#28a745"),
-        ("🔵 VERY LOW", "0.0 - 1.9", "#0dcaf0")
+        (label, f"{low:.1f} - {high if idx == 0 else high - 0.1:.1f}", color)
+        for idx, (label, high, low, color) in enumerate(zip(
+            ["🔴 VERY HIGH", "🟠 HIGH", "🟡 MEDIUM", "🟢 LOW", "🔵 VERY LOW"], bounds[:-1], bounds[1:],
+            ["#dc3545", "#fd7e14", "#ffc107", "#28a745", "#0dcaf0"]
+        ))
     ]
     
     for idx, (label, range_val, color) in enumerate(legend_items):
@@ -740,119 +1045,59 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
     
     st.markdown('<div class="risk-table-header">⚠️ RISK ASSESSMENT - DATA DETAIL (Excel + BMKG Combined)</div>', unsafe_allow_html=True)
     
-    for idx, row in risk_filtered.iterrows():
-        score_class = f"score-{row['risk_color']}"
-        badge_class = f"badge badge-{row['risk_color']}"
-        
-        st.markdown(f"""
-        <div class="risk-row">
-            <div class="risk-rank">#{int(row['rank'])}</div>
-            <div class="risk-location">{row['lokasi']}</div>
-            <div class="risk-score {score_class}">{row['risk_score']:.2f}/10</div>
-            <div class="{badge_class}">{row['risk_level']}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # DETAIL EXPANDER
-        with st.expander(f"📌 Detail Lengkap - {row['lokasi']}", expanded=False):
-            st.markdown('<div class="detail-card">', unsafe_allow_html=True)
-            st.markdown(f'<p class="detail-title">{row["lokasi"]} - Risk Score {row["risk_score"]:.2f}/10 {row["risk_level"]}</p>', unsafe_allow_html=True)
-            
-            col_d1, col_d2 = st.columns(2)
-            
-            with col_d1:
-                st.markdown(f"""
-                <div class="detail-row">
-                    <div class="detail-label">🔢 Total Gempa:</div>
-                    <div class="detail-value"><b>{int(row['total_gempa'])}</b> kejadian</div>
-                </div>
-                <div class="detail-row">
-                    <div class="detail-label">📊 Data Source:</div>
-                    <div class="detail-value">
-                        <span class="source-badge source-excel">Excel: {int(row['excel_count'])}</span>
-                        <span class="source-badge source-bmkg">BMKG: {int(row['bmkg_count'])}</span>
-                    </div>
-                </div>
-                <div class="detail-row">
-                    <div class="detail-label">📈 Magnitudo Rata-rata:</div>
-                    <div class="detail-value"><b>{row['mag_mean']:.2f}</b> Skala Richter</div>
-                </div>
-                <div class="detail-row">
-                    <div class="detail-label">⚡ Magnitudo Maksimal:</div>
-                    <div class="detail-value"><b>{row['mag_max']:.2f}</b> Skala Richter</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col_d2:
-                st.markdown(f"""
-                <div class="detail-row">
-                    <div class="detail-label">🔴 Gempa > Mag 5:</div>
-                    <div class="detail-value"><b>{int(row['high_mag_count'])}</b> kejadian (Sangat Berbahaya)</div>
-                </div>
-                <div class="detail-row">
-                    <div class="detail-label">📍 Kedalaman Rata-rata:</div>
-                    <div class="detail-value"><b>{row['kedalaman_mean']:.1f}</b> km</div>
-                </div>
-                <div class="detail-row">
-                    <div class="detail-label">🎯 Kedalaman Minimum:</div>
-                    <div class="detail-value"><b>{row['kedalaman_min']:.1f}</b> km (Superfisial)</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # DETAILED RECOMMENDATIONS
-            st.markdown('<div class="rec-section">', unsafe_allow_html=True)
-            st.markdown('<p class="rec-title">🎯 Rekomendasi Mitigasi Bencana Gempa</p>', unsafe_allow_html=True)
-            
-            if row['risk_score'] >= 8:
-                st.markdown("""
-                <p class="rec-category">🔴 PRIORITAS TERTINGGI - Wilayah Dengan Risiko Sangat Tinggi</p>
-                <p class="rec-text">Lokasi ini menunjukkan aktivitas seismik yang sangat intensif dengan frekuensi tinggi dan potensi gempa besar yang signifikan. Tindakan mitigasi dan preparedness harus dilakukan segera dan berkelanjutan:</p>
-                <div class="rec-item">• <b>Sistem Peringatan Dini (Early Warning System):</b> Implementasi sistem monitoring gempa real-time yang terintegrasi dengan sensor lokal. Sistem harus mampu mendeteksi gempa dalam hitungan detik dan mengirimkan peringatan ke masyarakat melalui berbagai channel (SMS, sirene, aplikasi mobile).</div>
-                <div class="rec-item">• <b>Infrastruktur Tahan Gempa:</b> Bangun dan perkuat shelter tahan gempa serta ruang evakuasi aman di setiap desa/kelurahan. Standar konstruksi harus mengikuti SNI 1726 dan memiliki kapasitas mencukupi untuk seluruh populasi.</div>
-                <div class="rec-item">• <b>Program Edukasi Keselamatan Gempa:</b> Jalankan program edukasi intensif di sekolah, kantor, dan komunitas. Materi mencakup cara berlindung saat gempa, rencana evakuasi keluarga, dan pengenalan zona aman.</div>
-                <div class="rec-item">• <b>Penguatan Infrastruktur Kritis:</b> Perkuat bangunan pemerintah, rumah sakit, kantor polisi, dan fasilitas publik lainnya agar tetap berfungsi pasca gempa untuk koordinasi tanggap darurat.</div>
-                <div class="rec-item">• <b>Simulasi Evakuasi Rutin:</b> Lakukan simulasi gempa dan evakuasi setiap bulan di sekolah, kantor, dan komunitas untuk memastikan semua orang paham prosedur dan dapat melakukannya dalam keadaan darurat.</div>
-                <div class="rec-item">• <b>Tim Respons Darurat 24/7:</b> Bentuk dan latih tim respons darurat yang siaga sepanjang waktu dengan peralatan dan logistik lengkap untuk respons cepat pasca gempa.</div>
-                <div class="rec-item">• <b>Koordinasi dengan BMKG & TNI:</b> Jalin koordinasi kuat dengan Badan Meteorologi, Klimatologi, dan Geofisika (BMKG) dan TNI untuk monitoring, respons, dan rehabilitasi.</div>
-                """, unsafe_allow_html=True)
-            
-            elif row['risk_score'] >= 6:
-                st.markdown("""
-                <p class="rec-category">🟠 PRIORITAS TINGGI - Wilayah Dengan Risiko Tinggi</p>
-                <p class="rec-text">Lokasi ini memiliki aktivitas seismik yang signifikan dengan potensi kerusakan sedang hingga berat. Tindakan preventif dan preparedness harus diperkuat:</p>
-                <div class="rec-item">• <b>Perbaikan Sistem Peringatan Gempa:</b> Tingkatkan efektivitas sistem peringatan gempa yang ada dengan memperbanyak sensor dan meningkatkan aksesibilitas informasi peringatan.</div>
-                <div class="rec-item">• <b>Rehabilitasi Bangunan Tidak Tahan Gempa:</b> Identifikasi dan rehabilitasi bangunan lama yang tidak memenuhi standar tahan gempa, terutama sekolah dan rumah sakit.</div>
-                <div class="rec-item">• <b>Program Edukasi untuk Institusi:</b> Lakukan program edukasi keselamatan gempa khusus untuk sekolah, kantor, dan institusi publik dengan frekuensi minimal 1 tahun sekali.</div>
-                <div class="rec-item">• <b>Pelatihan Respons Darurat:</b> Selenggarakan pelatihan respons darurat untuk staff BPBD, polisi, petugas kesehatan, dan relawan minimal 2 kali per tahun.</div>
-                <div class="rec-item">• <b>Pemetaan Risiko Detail:</b> Buat pemetaan risiko detail per blok/kelurahan untuk menentukan zona evakuasi dan lokasi shelter yang optimal.</div>
-                <div class="rec-item">• <b>Monitoring Berkelanjutan:</b> Jalin kerja sama dengan BMKG untuk monitoring aktivitas seismik berkelanjutan dan update informasi risiko secara berkala.</div>
-                """, unsafe_allow_html=True)
-            
-            elif row['risk_score'] >= 4:
-                st.markdown("""
-                <p class="rec-category">🟡 PRIORITAS SEDANG - Wilayah Dengan Risiko Sedang</p>
-                <p class="rec-text">Lokasi ini memiliki aktivitas seismik dengan potensi kerusakan ringan hingga sedang. Tindakan preparedness dasar perlu diterapkan:</p>
-                <div class="rec-item">• <b>Penguatan Kode Bangunan:</b> Pastikan pembangunan baru mengikuti standar tahan gempa SNI 1726. Lakukan edukasi kepada kontraktor dan pemilik bangunan tentang pentingnya standar konstruksi.</div>
-                <div class="rec-item">• <b>Program Edukasi Dasar:</b> Jalankan program edukasi keselamatan gempa dasar di sekolah dan komunitas minimal 1 tahun sekali.</div>
-                <div class="rec-item">• <b>Pelatihan Respons Tahunan:</b> Lakukan pelatihan respons darurat untuk pemerintah lokal, polisi, dan relawan minimal 1 tahun sekali.</div>
-                <div class="rec-item">• <b>Identifikasi Zona Evakuasi:</b> Tentukan zona aman dan zona evakuasi untuk diketahui masyarakat luas melalui peta dan tanda-tanda di lapangan.</div>
-                <div class="rec-item">• <b>Kesiapan Logistik Dasar:</b> Siapkan logistik darurat dasar (tenda, obat, makanan) untuk respons cepat pasca gempa.</div>
-                """, unsafe_allow_html=True)
-            
-            else:
-                st.markdown("""
-                <p class="rec-category">🟢 PRIORITAS MONITOR - Wilayah Dengan Risiko Rendah</p>
-                <p class="rec-text">Lokasi ini memiliki aktivitas seismik rendah namun tetap perlu monitoring dan preparedness dasar:</p>
-                <div class="rec-item">• <b>Monitoring Berkelanjutan:</b> Tetap melakukan monitoring aktivitas seismik melalui data BMKG untuk early detection jika ada peningkatan aktivitas.</div>
-                <div class="rec-item">• <b>Program Edukasi Awareness:</b> Jalankan program edukasi awareness umum tentang gempa bumi dan keselamatan dasar, minimal 1 tahun sekali.</div>
-                <div class="rec-item">• <b>Persiapan Keselamatan Umum:</b> Siapkan kit keselamatan dasar (first aid, lampu darurat, air minum) di rumah dan kantor.</div>
-                <div class="rec-item">• <b>Update Rencana Darurat:</b> Tinjau dan update rencana darurat sesuai dengan data seismik terbaru dari BMKG.</div>
-                <div class="rec-item">• <b>Koordinasi Lokal:</b> Jalin koordinasi dengan pemerintah lokal dan BMKG untuk mendapatkan update informasi gempa terbaru.</div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+    # Hanya baris di halaman aktif yang di-render; detail di-render untuk satu lokasi yang dibuka
+    col_p1, col_p2, col_p3 = st.columns([1.2, 1.2, 3])
+    with col_p1:
+        page_size = st.selectbox("Baris per halaman", RISK_PAGE_SIZES, key="risk_page_size")
+    n_pages = max(1, -(-len(risk_filtered) // page_size))
+    if st.session_state.get("risk_page", 1) > n_pages:
+        st.session_state.risk_page = n_pages
+    with col_p2:
+        page = st.number_input(f"Halaman (dari {n_pages})", min_value=1, max_value=n_pages, step=1, key="risk_page")
+    
+    page_start = (int(page) - 1) * page_size
+    page_rows = risk_filtered.iloc[page_start:page_start + page_size]
+    with col_p3:
+        st.caption(f"Menampilkan #{page_start + 1:,}–{page_start + len(page_rows):,} dari {len(risk_filtered):,} lokasi")
+    
+    st.markdown("".join(risk_row_html(row) for row in page_rows.to_dict('records')), unsafe_allow_html=True)
+    
+    # DETAIL PANEL
+    page_records = {f"#{int(row['rank'])} - {row['lokasi']}": row for row in page_rows.to_dict('records')}
+    selected_detail = st.selectbox(
+        "📌 Detail Lengkap",
+        list(page_records),
+        index=None,
+        placeholder="Pilih lokasi di halaman ini untuk melihat detail & rekomendasi mitigasi",
+        key="risk_detail"
+    )
+    if selected_detail is not None:
+        render_risk_detail(page_records[selected_detail])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    
+    # ===========================
+    # PROBABILITAS GEMPA BESAR (POISSON)
+    # ===========================
+    st.markdown('<div class="section">', unsafe_allow_html=True)
+    st.markdown('<p class="section-title">🎲 Probabilitas Gempa Besar</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-subtitle">Peluang minimal satu gempa di atas magnitudo tertentu, dari laju Gutenberg-Richter (model Poisson)</p>', unsafe_allow_html=True)
+    
+    prob_columns = {
+        exceedance_column(mag, days): f"P(M≥{mag:g}, {days} hari)"
+        for mag in EXCEEDANCE_MAGNITUDES for days in EXCEEDANCE_HORIZONS_DAYS
+    }
+    display_df = risk_filtered[['rank', 'lokasi', 'risk_score', 'b_value', *prob_columns]].dropna(subset=['b_value'])
+    display_df = display_df.sort_values(exceedance_column(EXCEEDANCE_MAGNITUDES[0], EXCEEDANCE_HORIZONS_DAYS[0]), ascending=False)
+    display_df[list(prob_columns)] = (display_df[list(prob_columns)] * 100).round(1).astype(str) + "%"
+    display_df = display_df.round(2).rename(columns={
+        'rank': 'Rank', 'lokasi': 'Lokasi', 'risk_score': 'Risk Score', 'b_value': 'b-value', **prob_columns
+    })
+    
+    st.caption(f"{len(display_df):,} dari {len(risk_filtered):,} wilayah memiliki cukup data untuk fit G-R (≥ {MIN_EVENTS} gempa di atas Mc); laju dinormalisasi ke rentang katalog {days_span} hari")
+    st.dataframe(display_df, use_container_width=True, hide_index=True, height=320)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -872,15 +1117,68 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
             tiles="OpenStreetMap"
         )
         
-        df_for_heatmap = df[df['lokasi'].isin(risk_filtered['lokasi'].tolist())]
-        heat_data = [[row['latitude'], row['longitude'], row['magnitudo']/10] 
-                     for _, row in df_for_heatmap.iterrows()]
+        # Gempa dipetakan ke unit skor (lokasi / sel grid) sesuai mode saat CARI
+        _, event_units = get_mode_scores(st.session_state.risk_filter_spec[0])
+        df_for_heatmap = df[pd.Series(event_units).isin(risk_filtered['lokasi'].tolist()).to_numpy()]
         
-        HeatMap(heat_data, min_opacity=0.3, radius=35, blur=20, max_zoom=1).add_to(m)
+        heat_weighting = st.radio(
+            "Bobot Heatmap",
+            ["Magnitudo", "Energi"],
+            horizontal=True,
+            key="heat_weighting",
+            help="Bobot per sel grid 0.05°: jumlah magnitudo atau jumlah energi seismik, relatif terhadap sel terberat"
+        ).lower()
+        
+        # Hanya sel grid di dalam viewport terakhir (via spatial index)
+        heatmap_key = "heatmap_risiko_" + "_".join(st.session_state.risk_filter_spec)
+        heat_state = st.session_state.get(heatmap_key)
+        heat_zoom = (heat_state or {}).get('zoom') or 5
+        heat_bounds = bounds_from_folium(heat_state, padding=0)
+        if heat_bounds is not None:
+            heat_bounds = snap_bounds(heat_bounds, heat_zoom)
+        
+        version = catalog_version(df)
+        
+        def build_heat_layer():
+            heat_grid, heat_index = get_heatmap_grid(version, st.session_state.risk_filter_spec, heat_weighting, df_for_heatmap)
+            if heat_bounds is not None:
+                heat_grid = heat_grid.iloc[query_bbox(heat_index, *heat_bounds)]
+            
+            heat_data = heat_grid[['latitude', 'longitude', 'weight']].to_numpy().round(4).tolist()
+            return HeatMap(heat_data, min_opacity=0.3, radius=35, blur=20, max_zoom=1)
+        
+        heat_layer = folium.FeatureGroup(name="Heatmap")
+        cached_layer(
+            get_map_cache(),
+            ("heatmap", version, st.session_state.risk_filter_spec, heat_weighting, heat_zoom, heat_bounds),
+            build_heat_layer
+        ).add_to(heat_layer)
         
         col_empty1, col_map, col_empty2 = st.columns([0.05, 0.9, 0.05])
         with col_map:
-            st_folium(m, width=1000, height=520)
+            # Base map tetap, hanya layer heatmap yang di-render ulang saat pan/zoom
+            st_folium(
+                m, width=1000, height=520, key=heatmap_key,
+                feature_group_to_add=heat_layer,
+                returned_objects=["zoom", "bounds"]
+            )
+        
+        # Statistik per sel geohash (tidak bergantung pada variasi nama lokasi)
+        with st.expander("🧭 Statistik Grid Wilayah (Geohash)", expanded=False):
+            gh_precision = st.select_slider(
+                "Resolusi",
+                options=list(GEOHASH_PRECISIONS),
+                value=3,
+                format_func=lambda p: f"Geohash {p} (~{GEOHASH_CELL_SIZE[p]})",
+                key="risk_geohash_precision"
+            )
+            gh_cells = get_geohash_levels(version, st.session_state.risk_filter_spec, df_for_heatmap)[gh_precision]
+            
+            gh_table = gh_cells.sort_values('energy_sum', ascending=False)[['geohash', 'lokasi_dominan', 'count', 'mag_max', 'depth_mean', 'energy_sum']].copy()
+            gh_table['energy_sum'] = np.log10(gh_table['energy_sum'].clip(lower=1))
+            gh_table.columns = ['Geohash', 'Lokasi Dominan', 'Jumlah Gempa', 'Magnitudo Maks', 'Kedalaman Avg (km)', 'Energi (log10 J)']
+            st.caption(f"{len(gh_table):,} sel berisi gempa, terurut berdasarkan energi seismik total")
+            st.dataframe(gh_table.round(2), use_container_width=True, hide_index=True, height=320)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -898,6 +1196,7 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
     with col_chart1:
         st.markdown('**📊 Bar Chart - Jumlah Daerah**')
         risk_dist = risk_filtered['risk_level'].value_counts()
+        figure_theme = (FIGURE_TEMPLATE, st.context.theme.type)
         colors_map = {
             '🔴 VERY HIGH': '#dc3545',
             '🟠 HIGH': '#fd7e14',
@@ -906,33 +1205,41 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
             '🔵 VERY LOW': '#0dcaf0'
         }
         
-        fig_bar = go.Figure(data=[go.Bar(
-            x=risk_dist.index,
-            y=risk_dist.values,
-            marker=dict(color=[colors_map.get(x, '#1e3a5f') for x in risk_dist.index]),
-            text=risk_dist.values,
-            textposition='auto',
-            hovertemplate='<b>%{x}</b><br>Jumlah Daerah: %{y}<extra></extra>'
-        )])
-        fig_bar.update_layout(height=360, showlegend=False, template='plotly_white',
-            font=dict(size=11), xaxis=dict(title='Kategori Risiko', showgrid=False),
-            yaxis=dict(title='Jumlah Daerah', showgrid=True, gridcolor='#f0f0f0'),
-            margin=dict(l=50, r=30, t=30, b=60))
-        st.plotly_chart(fig_bar, use_container_width=True, config={'displayModeBar': False})
+        def build_risk_bar():
+            fig = go.Figure(data=[go.Bar(
+                x=risk_dist.index,
+                y=risk_dist.values,
+                marker=dict(color=[colors_map.get(x, '#1e3a5f') for x in risk_dist.index]),
+                text=risk_dist.values,
+                textposition='auto',
+                hovertemplate='<b>%{x}</b><br>Jumlah Daerah: %{y}<extra></extra>'
+            )])
+            fig.update_layout(height=360, showlegend=False, template=FIGURE_TEMPLATE,
+                font=dict(size=11), xaxis=dict(title='Kategori Risiko', showgrid=False),
+                yaxis=dict(title='Jumlah Daerah', showgrid=True, gridcolor='#f0f0f0'),
+                margin=dict(l=50, r=30, t=30, b=60))
+            return fig
+        
+        fig_bar = cached_figure(get_figure_cache(), "risk_bar", (risk_dist,), figure_theme, build_risk_bar)
+        plotly_chart_spec(fig_bar, config={'displayModeBar': False})
     
     with col_chart2:
         st.markdown('**🥧 Pie Chart - Persentase**')
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=risk_dist.index,
-            values=risk_dist.values,
-            marker=dict(colors=[colors_map.get(x, '#1e3a5f') for x in risk_dist.index]),
-            textposition='inside',
-            textinfo='label+percent',
-            hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
-        )])
-        fig_pie.update_layout(height=360, showlegend=True, template='plotly_white',
-            font=dict(size=11), margin=dict(l=30, r=30, t=30, b=30))
-        st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
+        def build_risk_pie():
+            fig = go.Figure(data=[go.Pie(
+                labels=risk_dist.index,
+                values=risk_dist.values,
+                marker=dict(colors=[colors_map.get(x, '#1e3a5f') for x in risk_dist.index]),
+                textposition='inside',
+                textinfo='label+percent',
+                hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
+            )])
+            fig.update_layout(height=360, showlegend=True, template=FIGURE_TEMPLATE,
+                font=dict(size=11), margin=dict(l=30, r=30, t=30, b=30))
+            return fig
+        
+        fig_pie = cached_figure(get_figure_cache(), "risk_pie", (risk_dist,), figure_theme, build_risk_pie)
+        plotly_chart_spec(fig_pie, config={'displayModeBar': False})
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -948,7 +1255,8 @@ if st.session_state.search_performed and not st.session_state.filtered_data.empt
     
     with col_export1:
         csv_risk = risk_filtered[['rank', 'lokasi', 'risk_score', 'risk_level', 'total_gempa', 
-                                   'excel_count', 'bmkg_count', 'mag_mean', 'high_mag_count', 'kedalaman_mean']].to_csv(index=False)
+                                   'excel_count', 'bmkg_count', 'mag_mean', 'high_mag_count', 'kedalaman_mean',
+                                   'mc', 'b_value', 'b_ci_low', 'b_ci_high', 'a_value', *prob_columns]].to_csv(index=False)
         st.download_button("📊 Download Risk Scoring CSV", csv_risk, f"risk_scoring_{datetime.now().strftime('%Y%m%d')}.csv", "text/csv", use_container_width=True)
     
     with col_export2:
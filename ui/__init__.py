@@ -0,0 +1 @@
+"""Komponen Streamlit bersama (widget & cache) yang dipakai semua halaman aplikasi gempa"""
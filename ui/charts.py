@@ -0,0 +1,57 @@
+import json
+
+import plotly.io as pio
+import streamlit as st
+
+try:
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:     # API internal Streamlit berubah: render lewat st.plotly_chart
+    PlotlyChartProto = None
+
+# ===========================
+# RENDER CHART DARI SPESIFIKASI JSON
+# ===========================
+# st.plotly_chart selalu men-serialisasi ulang figure (to_dict + to_json) di
+# setiap rerun. Figure dari core.figures.cached_figure sudah berupa spesifikasi
+# JSON, jadi spesifikasi itu langsung dikirim ke browser sebagai elemen
+# plotly_chart yang sama (tema Streamlit, lebar penuh, tanpa seleksi).
+DEFAULT_CHART_HEIGHT = 450      # tinggi default plotly.js bila layout.height kosong
+SELECTION_MODES = ("points", "box", "lasso")
+
+
+def plotly_chart_spec(figure, config=None, key=None):
+    """Tampilkan figure hasil core.figures.cached_figure selebar container
+
+    Args:
+        figure: dict {'spec': JSON figure, 'height': layout.height atau None}
+        config: config plotly.js (mis. {'displayModeBar': False})
+        key: key elemen, wajib jika figure yang sama ditampilkan lebih dari sekali
+    """
+    if PlotlyChartProto is None:
+        st.plotly_chart(pio.from_json(figure['spec']), width="stretch", config=config, key=key)
+        return
+
+    height = int(figure['height']) if figure['height'] else DEFAULT_CHART_HEIGHT
+    proto = PlotlyChartProto()
+    proto.theme = "streamlit"
+    proto.form_id = current_form_id(st._main)
+    proto.spec = figure['spec']
+    proto.config = json.dumps(config or {})
+    proto.id = compute_and_register_element_id(
+        "plotly_chart",
+        user_key=key,
+        key_as_main_identity=False,
+        dg=st._main,
+        plotly_spec=proto.spec,
+        plotly_config=proto.config,
+        selection_mode=SELECTION_MODES,
+        is_selection_activated=False,
+        theme="streamlit",
+        width="stretch",
+        height="content",
+        alt=None,
+    )
+    st._main._enqueue("plotly_chart", proto, layout_config=LayoutConfig(width="stretch", height=height))
@@ -0,0 +1,37 @@
+import streamlit as st
+
+from core.catalog import catalog_version
+from core.declustering import decluster, mainshock_mask, DECLUSTER_METHODS
+
+# ===========================
+# DECLUSTERING (MAINSHOCK SAJA)
+# ===========================
+@st.cache_resource(max_entries=10)
+def get_decluster_labels(version, method, _df):
+    """Label mainshock/foreshock/aftershock, dihitung sekali per versi katalog & metode (dipakai bersama semua halaman)"""
+    return decluster(_df, method)
+
+
+def declustering_toggle(df_events):
+    """Toggle 🧹 Declustered + pilihan metode di bawah header halaman
+
+    Returns:
+        (katalog yang ditampilkan (mainshock saja jika toggle aktif), metode
+        declustering yang aktif atau None)
+    """
+    col_dc1, col_dc2 = st.columns([1.2, 4])
+    with col_dc1:
+        declustered = st.toggle("🧹 Declustered", key="declustered", help="Tampilkan mainshock saja; foreshock & aftershock dibuang")
+    with col_dc2:
+        method = st.radio(
+            "Metode declustering", DECLUSTER_METHODS, horizontal=True,
+            key="decluster_method", label_visibility="collapsed", disabled=not declustered
+        )
+
+    if not declustered:
+        return df_events, None
+
+    labels = get_decluster_labels(catalog_version(df_events), method, df_events)
+    df_main = df_events[mainshock_mask(labels)].reset_index(drop=True)
+    st.caption(f"🧹 {method}: {len(df_main):,} mainshock dari {len(df_events):,} gempa ({len(df_events) - len(df_main):,} foreshock/aftershock dibuang)")
+    return df_main, method